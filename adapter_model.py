@@ -1,3 +1,4 @@
+import numpy as np
 import torch
 import torch.nn as nn
 
@@ -32,9 +33,18 @@ class ResumeMLPAdapter(nn.Module):
         # Projects combined input down to output_dim linearly
         self.skip_projection = nn.Linear(combined_dim, output_dim)
         
+        # Device of the parameters, kept current by _apply so forward() never looks it up
+        self.device = self.skip_projection.weight.device
+        
         # Initialize weights (optional, PyTorch defaults are usually fine for random init)
         self._init_weights()
 
+    def _apply(self, fn, *args, **kwargs):
+        # Runs for .to()/.cuda()/.cpu(); the only ways the parameters change device
+        module = super(ResumeMLPAdapter, self)._apply(fn, *args, **kwargs)
+        self.device = self.skip_projection.weight.device
+        return module
+
     def _init_weights(self):
         for m in self.modules():
             if isinstance(m, nn.Linear):
@@ -47,24 +57,24 @@ class ResumeMLPAdapter(nn.Module):
         Forward pass.
         
         Args:
-            resume_emb (torch.Tensor): Tensor of shape (batch, input_dim) or (input_dim,)
-            jd_emb (torch.Tensor): Tensor of shape (batch, input_dim) or (input_dim,)
+            resume_emb (torch.Tensor or numpy.ndarray): Shape (batch, input_dim) or (input_dim,).
+                float32 arrays are wrapped with torch.from_numpy, without a copy.
+            jd_emb (torch.Tensor or numpy.ndarray): Shape (batch, input_dim) or (input_dim,)
             use_skip_connection (bool): If True, uses the linear skip projection (useful for untrained models).
             
         Returns:
             torch.Tensor: Transformed embedding.
         """
-        # Determine device from module parameters
-        device = next(self.parameters()).device
-
-        # Ensure inputs are tensors and move to device
+        # Ensure inputs are tensors (zero-copy for float32 arrays) and on the parameters' device
         if not isinstance(resume_emb, torch.Tensor):
-            resume_emb = torch.tensor(resume_emb, dtype=torch.float32)
+            resume_emb = torch.from_numpy(np.asarray(resume_emb, dtype=np.float32))
         if not isinstance(jd_emb, torch.Tensor):
-            jd_emb = torch.tensor(jd_emb, dtype=torch.float32)
+            jd_emb = torch.from_numpy(np.asarray(jd_emb, dtype=np.float32))
             
-        resume_emb = resume_emb.to(device)
-        jd_emb = jd_emb.to(device)
+        if resume_emb.device != self.device:
+            resume_emb = resume_emb.to(self.device)
+        if jd_emb.device != self.device:
+            jd_emb = jd_emb.to(self.device)
             
         # Add batch dimension if missing
         if resume_emb.dim() == 1:
@@ -80,3 +90,82 @@ class ResumeMLPAdapter(nn.Module):
             return self.skip_projection(combined)
         else:
             return self.network(combined)
+
+
+class LowRankLinear(nn.Module):
+    def __init__(self, in_features, out_features, rank):
+        """
+        Linear layer factorized as W ~= up @ down, with rank << min(in_features, out_features).
+
+        Costs rank * (in_features + out_features) multiply-accumulates per row instead of
+        in_features * out_features.
+        
+        Args:
+            in_features (int): Input dimension.
+            out_features (int): Output dimension.
+            rank (int): Inner dimension of the factorization.
+        """
+        super(LowRankLinear, self).__init__()
+        self.rank = rank
+        self.down = nn.Linear(in_features, rank, bias=False)
+        self.up = nn.Linear(rank, out_features)
+
+    @classmethod
+    def from_linear(cls, linear, rank):
+        """Best rank-`rank` approximation of a dense nn.Linear (truncated SVD)."""
+        weight = linear.weight.detach()
+        U, S, Vh = torch.linalg.svd(weight, full_matrices=False)
+        root = S[:rank].sqrt()
+        layer = cls(weight.shape[1], weight.shape[0], rank)
+        with torch.no_grad():
+            layer.down.weight.copy_(root.unsqueeze(1) * Vh[:rank])
+            layer.up.weight.copy_(U[:, :rank] * root.unsqueeze(0))
+            layer.up.bias.copy_(linear.bias.detach())
+        return layer
+
+    def forward(self, x):
+        return self.up(self.down(x))
+
+
+class LowRankResumeMLPAdapter(ResumeMLPAdapter):
+    def __init__(self, input_dim=4096, hidden_dim=2048, output_dim=4096, rank=256):
+        """
+        ResumeMLPAdapter with every Linear of the MLP path factorized to `rank`.
+
+        Same forward interface and state_dict layout apart from the factorized
+        layers (`network.<i>.down.weight`, `network.<i>.up.weight/bias`). The
+        skip projection stays dense: it is only the untrained-model fallback.
+        
+        Args:
+            input_dim (int): Dimension of a single embedding.
+            hidden_dim (int): Dimension of hidden layers.
+            output_dim (int): Dimension of the output vector.
+            rank (int): Rank of each factorized layer.
+        """
+        super(LowRankResumeMLPAdapter, self).__init__(input_dim, hidden_dim, output_dim)
+        self.rank = rank
+        for i, layer in enumerate(self.network):
+            if isinstance(layer, nn.Linear):
+                self.network[i] = LowRankLinear(layer.in_features, layer.out_features, rank)
+        self._init_weights()
+
+    @classmethod
+    def from_dense(cls, model, rank):
+        """
+        Factorize a trained ResumeMLPAdapter by truncated SVD of each MLP layer.
+
+        Args:
+            model (ResumeMLPAdapter): Trained dense adapter.
+            rank (int): Rank to keep per layer.
+
+        Returns:
+            LowRankResumeMLPAdapter: In eval mode.
+        """
+        hidden_dim = model.network[0].out_features
+        output_dim = model.network[-1].out_features
+        low_rank = cls(model.input_dim, hidden_dim, output_dim, rank)
+        for i, layer in enumerate(model.network):
+            if isinstance(layer, nn.Linear):
+                low_rank.network[i] = LowRankLinear.from_linear(layer, rank)
+        low_rank.skip_projection.load_state_dict(model.skip_projection.state_dict())
+        return low_rank.eval()
@@ -0,0 +1,167 @@
+"""
+Torch-free NumPy runtime for the trained ResumeMLPAdapter.
+
+Importing torch costs ~2 s and ~500 MB RSS at app start-up, only to run a
+three-layer MLP in eval mode. `export_numpy` writes the checkpoint's weights
+to one raw float32 file and `NumpyAdapter` runs the same forward pass (MLP
+and skip-projection paths) with NumPy matmuls over a read-only memory map,
+so the serving path never imports torch.
+
+File layout (`mlp_model.f32`): an 8-byte little-endian header length, a JSON
+header {"tensors": {name: {"shape", "offset"}}, "source_mtime": ...}, then
+the float32 tensors, each 64-byte aligned. Low-rank checkpoints
+(LowRankResumeMLPAdapter) export and run the same way, layer by layer.
+"""
+import json
+import os
+import struct
+
+import numpy as np
+
+ALIGNMENT = 64
+# Linear layers of ResumeMLPAdapter's MLP path; Dropout (network.2) is the identity in eval mode
+MLP_LAYERS = ("network.0", "network.3", "network.5")
+SKIP_LAYER = "skip_projection"
+
+
+def numpy_weights_path(model_path):
+    return os.path.splitext(model_path)[0] + ".f32"
+
+
+def save_weights(path, tensors, **meta):
+    """Write float32 arrays to `path` in the memory-mappable layout above."""
+    header = {"tensors": {}, **meta}
+    offset = 0
+    for name, array in tensors.items():
+        header["tensors"][name] = {"shape": list(array.shape), "offset": offset}
+        offset += -(-array.size * 4 // ALIGNMENT) * ALIGNMENT
+    encoded = json.dumps(header).encode("utf-8")
+    encoded += b" " * (-(8 + len(encoded)) % ALIGNMENT)  # Data starts aligned too
+
+    with open(path, "wb") as f:
+        f.write(struct.pack("<Q", len(encoded)))
+        f.write(encoded)
+        start = f.tell()
+        for name, array in tensors.items():
+            f.seek(start + header["tensors"][name]["offset"])
+            f.write(np.ascontiguousarray(array, dtype="<f4").tobytes())
+
+
+def load_weights(path):
+    """Memory-map the tensors of a file written by `save_weights`; returns (tensors, header)."""
+    with open(path, "rb") as f:
+        (length,) = struct.unpack("<Q", f.read(8))
+        header = json.loads(f.read(length))
+    data = np.memmap(path, dtype="<f4", mode="r", offset=8 + length)
+    tensors = {}
+    for name, entry in header["tensors"].items():
+        start = entry["offset"] // 4
+        tensors[name] = data[start:start + int(np.prod(entry["shape"]))].reshape(entry["shape"])
+    return tensors, header
+
+
+def export_numpy(model_path, out_path=None):
+    """
+    Convert a trained state dict to the NumPy runtime's weight file.
+
+    Args:
+        model_path (str): Trained checkpoint (e.g. "mlp_model.pth"). Needs torch.
+        out_path (str): Destination; defaults to `numpy_weights_path(model_path)`.
+
+    Returns:
+        str: Path written.
+    """
+    import torch
+
+    out_path = out_path or numpy_weights_path(model_path)
+    state_dict = torch.load(model_path, map_location="cpu")
+    tensors = {name: tensor.detach().float().numpy() for name, tensor in state_dict.items()
+               if name.startswith(MLP_LAYERS + (SKIP_LAYER,))}
+    save_weights(out_path, tensors, source_mtime=os.path.getmtime(model_path))
+    return out_path
+
+
+class NumpyAdapter:
+    def __init__(self, tensors):
+        """
+        NumPy forward pass of ResumeMLPAdapter (eval mode).
+
+        Args:
+            tensors (dict[str, numpy.ndarray]): float32 arrays keyed like the
+                torch state_dict, dense or low-rank; memory maps are fine.
+        """
+        self.layers = [self._layer(tensors, name) for name in MLP_LAYERS]
+        self.skip = self._layer(tensors, SKIP_LAYER)
+        down, weight, _ = self.layers[0]
+        self.low_rank = down is not None
+        self.input_dim = (down if self.low_rank else weight).shape[1] // 2
+        self.output_dim = self.layers[-1][1].shape[0]
+        self.variant = "numpy (low-rank)" if self.low_rank else "numpy"
+
+    @staticmethod
+    def _layer(tensors, name):
+        """(down, weight, bias); `down` is None for a dense layer, `weight` is `up` for a LowRankLinear."""
+        if f"{name}.weight" in tensors:
+            return None, tensors[f"{name}.weight"], tensors[f"{name}.bias"]
+        return tensors[f"{name}.down.weight"], tensors[f"{name}.up.weight"], tensors[f"{name}.up.bias"]
+
+    @staticmethod
+    def _linear(x, layer):
+        down, weight, bias = layer
+        if down is not None:
+            x = x @ down.T
+        return x @ weight.T + bias
+
+    @classmethod
+    def load(cls, path):
+        tensors, _ = load_weights(path)
+        return cls(tensors)
+
+    def eval(self):
+        return self  # Stateless; kept so callers can treat it like the torch module
+
+    def __call__(self, resume_emb, jd_emb, use_skip_connection=True):
+        return self.forward(resume_emb, jd_emb, use_skip_connection)
+
+    def forward(self, resume_emb, jd_emb, use_skip_connection=True):
+        """
+        Same contract as ResumeMLPAdapter.forward, on NumPy arrays.
+
+        Args:
+            resume_emb (numpy.ndarray): (batch, input_dim) or (input_dim,).
+            jd_emb (numpy.ndarray): (batch, input_dim) or (input_dim,).
+            use_skip_connection (bool): Use the linear skip projection.
+
+        Returns:
+            numpy.ndarray: float32 output of shape (batch, output_dim).
+        """
+        resume_emb = np.asarray(resume_emb, dtype=np.float32)
+        jd_emb = np.asarray(jd_emb, dtype=np.float32)
+        if resume_emb.ndim == 1:
+            resume_emb = resume_emb[None, :]
+        if jd_emb.ndim == 1:
+            jd_emb = jd_emb[None, :]
+        combined = np.concatenate((resume_emb, jd_emb), axis=1)
+
+        if use_skip_connection:
+            return self._linear(combined, self.skip)
+        hidden = np.maximum(self._linear(combined, self.layers[0]), 0.0)
+        hidden = np.maximum(self._linear(hidden, self.layers[1]), 0.0)
+        return self._linear(hidden, self.layers[2])
+
+
+def load_numpy_adapter(model_path):
+    """
+    NumpyAdapter for a checkpoint if its exported weights exist and are current.
+
+    Returns:
+        NumpyAdapter or None: None when there is no export or it predates `model_path`.
+    """
+    path = numpy_weights_path(model_path)
+    if not os.path.exists(path):
+        return None
+    tensors, header = load_weights(path)
+    if os.path.exists(model_path) and header.get("source_mtime") != os.path.getmtime(model_path):
+        print(f"{path} is older than {model_path}; re-run export_adapter.py.")
+        return None
+    return NumpyAdapter(tensors)
@@ -0,0 +1,206 @@
+"""
+In-process micro-batching server for ResumeMLPAdapter.
+
+Requests from concurrent Streamlit sessions or batch jobs are queued and
+collected into micro-batches (up to `max_batch_size`, waiting at most
+`max_wait_ms` for stragglers), run through one forward pass, and resolved
+through per-request futures. With a tiny MLP, per-call Python and dispatch
+overhead dominates batch-size-1 calls; batching amortizes it.
+
+Works with the torch adapter (ResumeMLPAdapter or an adapter_variants
+FastAdapter) and with the torch-free NumpyAdapter; torch is only imported
+when the model is a torch module.
+"""
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, InvalidStateError
+
+import numpy as np
+
+# Latencies kept for the percentile counters
+LATENCY_WINDOW = 2048
+
+
+class _Request:
+    __slots__ = ("resume", "jd", "use_skip_connection", "future", "enqueued")
+
+    def __init__(self, resume, jd, use_skip_connection):
+        self.resume = resume
+        self.jd = jd
+        self.use_skip_connection = use_skip_connection
+        self.future = Future()
+        self.enqueued = time.perf_counter()
+
+
+def _as_row(vector):
+    """A 1-D float32 array from a numpy array, list or tensor of shape (dim,) or (1, dim)."""
+    if hasattr(vector, "detach"):  # torch.Tensor, without importing torch
+        vector = vector.detach().cpu().numpy()
+    return np.asarray(vector, dtype=np.float32).reshape(-1)
+
+
+def _resolve(future, result=None, exception=None):
+    """Settle `future`, ignoring one that was already settled elsewhere."""
+    try:
+        if exception is not None:
+            future.set_exception(exception)
+        else:
+            future.set_result(result)
+    except InvalidStateError:
+        pass
+
+
+def _batch_forward(model):
+    """A (resume, jd, use_skip) -> numpy callable over stacked float32 batches."""
+    if not hasattr(model, "parameters"):
+        return model  # NumpyAdapter already takes and returns arrays
+    import torch
+
+    def forward(resume, jd, use_skip_connection):
+        # from_numpy/.numpy() share memory; the model moves inputs only if it is not on CPU
+        with torch.no_grad():
+            output = model(torch.from_numpy(resume), torch.from_numpy(jd), use_skip_connection=use_skip_connection)
+        return output.cpu().numpy()
+
+    return forward
+
+
+class AdapterServer:
+    def __init__(self, model, max_batch_size=32, max_wait_ms=2.0):
+        """
+        Serve `model` from a background thread in micro-batches.
+
+        Args:
+            model: ResumeMLPAdapter, FastAdapter or NumpyAdapter; put into eval mode here.
+            max_batch_size (int): Most requests fused into one forward pass.
+            max_wait_ms (float): How long the first request of a batch waits
+                for more to arrive. Only paid when requests are sparse; under
+                load batches fill before the timer runs out.
+        """
+        self.model = model.eval()
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max_wait_ms
+        self.input_dim = model.input_dim
+        self._forward = _batch_forward(self.model)
+
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._latencies = deque(maxlen=LATENCY_WINDOW)
+        self._started = time.perf_counter()
+        self.requests = 0
+        self.batches = 0
+        self.errors = 0
+        self.busy_s = 0.0
+
+        self._closed = False
+        self._worker = threading.Thread(target=self._serve, name="adapter-server", daemon=True)
+        self._worker.start()
+
+    def submit(self, resume_emb, jd_emb, use_skip_connection=False):
+        """
+        Queue one request.
+
+        Returns:
+            concurrent.futures.Future: Resolves to a float32 array of shape (1, output_dim).
+        """
+        if self._closed:
+            raise RuntimeError("AdapterServer is closed.")
+        resume, jd = _as_row(resume_emb), _as_row(jd_emb)
+        # Checked here so one malformed request cannot fail the whole batch it lands in
+        if resume.shape[0] != self.input_dim or jd.shape[0] != self.input_dim:
+            raise ValueError(f"Expected embeddings of size {self.input_dim}, "
+                             f"got {resume.shape[0]} and {jd.shape[0]}.")
+        request = _Request(resume, jd, use_skip_connection)
+        self._queue.put(request)
+        return request.future
+
+    def infer(self, resume_emb, jd_emb, use_skip_connection=False, timeout=None):
+        """Blocking `submit`; a drop-in for `model(resume_emb, jd_emb, use_skip_connection)` on one pair."""
+        return self.submit(resume_emb, jd_emb, use_skip_connection).result(timeout=timeout)
+
+    def _collect(self):
+        """Block for one request, then gather more until the batch is full or the wait expires."""
+        first = self._queue.get()
+        if first is None:
+            return None
+        batch = [first]
+        deadline = time.perf_counter() + self.max_wait_ms / 1000.0
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            try:
+                request = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if request is None:
+                self._queue.put(None)  # Re-post the stop signal for the outer loop
+                break
+            batch.append(request)
+        return batch
+
+    def _serve(self):
+        while True:
+            batch = self._collect()
+            if batch is None:
+                return
+            # Requests cancelled while queued are dropped; the rest can no longer be cancelled
+            batch = [r for r in batch if r.future.set_running_or_notify_cancel()]
+            try:
+                # One forward pass per mode present in the batch (normally just one)
+                for use_skip in (False, True):
+                    group = [r for r in batch if r.use_skip_connection == use_skip]
+                    if group:
+                        self._run(group, use_skip)
+            except Exception as e:
+                # Keep serving: a dead worker would leave every later infer() waiting forever
+                unresolved = [r for r in batch if not r.future.done()]
+                with self._lock:
+                    self.errors += len(unresolved)
+                for r in unresolved:
+                    _resolve(r.future, exception=e)
+
+    def _run(self, group, use_skip):
+        start = time.perf_counter()
+        try:
+            resume = np.stack([r.resume for r in group])
+            jd = np.stack([r.jd for r in group])
+            output = self._forward(resume, jd, use_skip)
+        except Exception as e:
+            with self._lock:
+                self.errors += len(group)
+            for r in group:
+                _resolve(r.future, exception=e)
+            return
+
+        done = time.perf_counter()
+        with self._lock:
+            self.requests += len(group)
+            self.batches += 1
+            self.busy_s += done - start
+            self._latencies.extend(done - r.enqueued for r in group)
+        for i, r in enumerate(group):
+            _resolve(r.future, output[i:i + 1])
+
+    def metrics(self):
+        """Throughput, batch size and end-to-end latency (queue wait + forward) counters."""
+        with self._lock:
+            latencies = np.array(self._latencies, dtype=np.float64)
+            elapsed = time.perf_counter() - self._started
+            return {
+                "requests": self.requests,
+                "batches": self.batches,
+                "errors": self.errors,
+                "mean_batch_size": self.requests / self.batches if self.batches else 0.0,
+                "requests_per_s": self.requests / elapsed if elapsed > 0 else 0.0,
+                "busy_fraction": self.busy_s / elapsed if elapsed > 0 else 0.0,
+                "p50_ms": float(np.percentile(latencies, 50) * 1000) if len(latencies) else None,
+                "p99_ms": float(np.percentile(latencies, 99) * 1000) if len(latencies) else None,
+            }
+
+    def close(self):
+        """Stop the worker after the requests already queued are served."""
+        if not self._closed:
+            self._closed = True
+            self._queue.put(None)
+            self._worker.join()
@@ -0,0 +1,293 @@
+"""
+Faster CPU inference variants of the trained ResumeMLPAdapter.
+
+The app keeps the adapter on CPU (VRAM is reserved for Gemma), so CPU cost
+per call is what matters. `export_variants` turns a trained `mlp_model.pth`
+into:
+  - traced: TorchScript trace of the fp32 MLP path, frozen (constant-folded)
+  - int8:   dynamic int8 quantization of every Linear, then traced and frozen
+and optionally measures `torch.compile` (runtime only; nothing is written).
+Each variant must pass an accuracy guard (cosine to the fp32 output on a
+held-out set) and is benchmarked; results go to a JSON manifest next to the
+checkpoint. `load_adapter` reads the manifest and serves the fastest
+variant that passed, falling back to fp32.
+
+Only the trained path (`use_skip_connection=False`) is exported; the skip
+projection is an untrained-model fallback and always runs in fp32.
+"""
+import json
+import os
+import time
+import warnings
+
+import numpy as np
+import torch
+import torch.nn as nn
+
+from adapter_model import LowRankResumeMLPAdapter, ResumeMLPAdapter
+
+VARIANTS = ("fp32", "traced", "int8", "compiled")
+DEFAULT_MIN_COSINE = 0.999  # Worst-row cosine to fp32 a variant must reach to be served
+BENCH_BATCH_SIZES = (1, 32)
+
+
+def manifest_path(model_path):
+    return os.path.splitext(model_path)[0] + ".variants.json"
+
+
+def variant_path(model_path, variant):
+    return f"{os.path.splitext(model_path)[0]}.{variant}.pt"
+
+
+def adapter_from_state_dict(state_dict):
+    """Build a ResumeMLPAdapter (dense or low-rank) sized from a checkpoint's weight shapes and load it."""
+    if "network.0.down.weight" in state_dict:
+        rank, combined_dim = state_dict["network.0.down.weight"].shape
+        hidden_dim = state_dict["network.0.up.weight"].shape[0]
+        output_dim = state_dict["network.5.up.weight"].shape[0]
+        model = LowRankResumeMLPAdapter(input_dim=combined_dim // 2, hidden_dim=hidden_dim,
+                                        output_dim=output_dim, rank=rank)
+    else:
+        hidden_dim, combined_dim = state_dict["network.0.weight"].shape
+        output_dim = state_dict["network.5.weight"].shape[0]
+        model = ResumeMLPAdapter(input_dim=combined_dim // 2, hidden_dim=hidden_dim, output_dim=output_dim)
+    model.load_state_dict(state_dict)
+    return model.eval()
+
+
+class _MLPPath(nn.Module):
+    """The trained path alone, with a fixed (batch, dim) signature that traces cleanly."""
+
+    def __init__(self, network):
+        super().__init__()
+        self.network = network
+
+    def forward(self, resume_emb, jd_emb):
+        return self.network(torch.cat((resume_emb, jd_emb), dim=1))
+
+
+def _example_inputs(input_dim):
+    return torch.randn(1, input_dim), torch.randn(1, input_dim)
+
+
+def _trace(module, input_dim):
+    # torch.jit is deprecated in favor of torch.export, but is still the only
+    # serialized format that runs dynamically quantized Linear layers.
+    with warnings.catch_warnings(), torch.no_grad():
+        warnings.simplefilter("ignore")
+        return torch.jit.freeze(torch.jit.trace(module.eval(), _example_inputs(input_dim)))
+
+
+def build_variant(model, variant):
+    """
+    Build one fast variant of the trained path.
+
+    Args:
+        model (ResumeMLPAdapter): Trained fp32 adapter (CPU).
+        variant (str): "traced", "int8" or "compiled".
+
+    Returns:
+        Callable (resume, jd) -> output on 2-D float32 tensors.
+    """
+    path = _MLPPath(model.network).eval()
+    if variant == "traced":
+        return _trace(path, model.input_dim)
+    if variant == "int8":
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            quantized = torch.ao.quantization.quantize_dynamic(path, {nn.Linear}, dtype=torch.qint8)
+        return _trace(quantized, model.input_dim)
+    if variant == "compiled":
+        compiled = torch.compile(path)
+        with torch.no_grad():
+            compiled(*_example_inputs(model.input_dim))  # Compile now rather than on the first request
+        return compiled
+    raise ValueError(f"Unknown adapter variant '{variant}'. Choose from {VARIANTS}.")
+
+
+def _save_script(module, path):
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        torch.jit.save(module, path)
+
+
+def _load_script(path):
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        return torch.jit.load(path, map_location="cpu")
+
+
+def accuracy_check(reference, candidate, resume_emb, jd_emb, min_cosine=DEFAULT_MIN_COSINE):
+    """
+    Compare a variant's outputs with fp32 on a held-out set.
+
+    Args:
+        reference: fp32 callable (resume, jd) -> output.
+        candidate: Variant callable with the same signature.
+        resume_emb (torch.Tensor): Held-out resume embeddings, (N, input_dim).
+        jd_emb (torch.Tensor): Held-out JD embeddings, (N, input_dim).
+        min_cosine (float): Worst-row cosine required to pass.
+
+    Returns:
+        dict: mean/min cosine to fp32, max absolute error, and `passed`.
+    """
+    with torch.no_grad():
+        expected = reference(resume_emb, jd_emb)
+        actual = candidate(resume_emb, jd_emb)
+    cosines = nn.functional.cosine_similarity(actual, expected, dim=1)
+    return {
+        "mean_cosine": float(cosines.mean()),
+        "min_cosine": float(cosines.min()),
+        "max_abs_error": float((actual - expected).abs().max()),
+        "passed": bool(cosines.min() >= min_cosine),
+    }
+
+
+def benchmark(fn, input_dim, batch_sizes=BENCH_BATCH_SIZES, iterations=200, warmup=10):
+    """
+    Latency and throughput of `fn` at each batch size.
+
+    Returns:
+        dict: {"b<size>_p50_ms", "b<size>_p99_ms", "b<size>_rows_per_s"} per batch size.
+    """
+    results = {}
+    with torch.no_grad():
+        for batch_size in batch_sizes:
+            resume, jd = torch.randn(batch_size, input_dim), torch.randn(batch_size, input_dim)
+            for _ in range(warmup):
+                fn(resume, jd)
+            times = np.empty(iterations)
+            for i in range(iterations):
+                start = time.perf_counter()
+                fn(resume, jd)
+                times[i] = time.perf_counter() - start
+            results[f"b{batch_size}_p50_ms"] = float(np.percentile(times, 50) * 1000)
+            results[f"b{batch_size}_p99_ms"] = float(np.percentile(times, 99) * 1000)
+            results[f"b{batch_size}_rows_per_s"] = float(batch_size / times.mean())
+    return results
+
+
+def export_variants(model_path, resume_emb, jd_emb, variants=("traced", "int8"),
+                    min_cosine=DEFAULT_MIN_COSINE, iterations=200):
+    """
+    Export, guard and benchmark variants of a trained checkpoint.
+
+    Args:
+        model_path (str): Trained fp32 state dict (e.g. "mlp_model.pth").
+        resume_emb (torch.Tensor): Held-out resume embeddings for the guard.
+        jd_emb (torch.Tensor): Held-out JD embeddings for the guard.
+        variants (tuple[str]): Variants to build; "compiled" is measured only.
+        min_cosine (float): Accuracy guard threshold.
+        iterations (int): Timed calls per batch size.
+
+    Returns:
+        dict: The manifest written to `manifest_path(model_path)`.
+    """
+    model = adapter_from_state_dict(torch.load(model_path, map_location="cpu"))
+    reference = _MLPPath(model.network).eval()
+    manifest = {
+        "source": os.path.basename(model_path),
+        "source_mtime": os.path.getmtime(model_path),
+        "input_dim": model.input_dim,
+        "min_cosine": min_cosine,
+        "variants": {"fp32": {"path": None, "passed": True, **benchmark(reference, model.input_dim, iterations=iterations)}},
+    }
+    for variant in variants:
+        fn = build_variant(model, variant)
+        path = None
+        if variant != "compiled":
+            path = variant_path(model_path, variant)
+            _save_script(fn, path)
+            fn = _load_script(path)  # Guard and time what will actually be served
+        entry = {"path": os.path.basename(path) if path else None}
+        entry.update(accuracy_check(reference, fn, resume_emb, jd_emb, min_cosine))
+        entry.update(benchmark(fn, model.input_dim, iterations=iterations))
+        manifest["variants"][variant] = entry
+
+    with open(manifest_path(model_path), "w") as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+def fastest_variant(manifest, allow_compile=False, metric="b1_p50_ms"):
+    """Name of the guarded variant with the lowest `metric`, or "fp32"."""
+    candidates = {
+        name: entry for name, entry in manifest.get("variants", {}).items()
+        if entry.get("passed") and (allow_compile or name != "compiled")
+    }
+    if not candidates:
+        return "fp32"
+    return min(candidates, key=lambda name: candidates[name][metric])
+
+
+class FastAdapter(nn.Module):
+    def __init__(self, base, fast=None, variant="fp32"):
+        """
+        ResumeMLPAdapter drop-in whose trained path runs on an exported variant.
+
+        Args:
+            base (ResumeMLPAdapter): fp32 model; serves the skip projection and is the fallback.
+            fast: Variant callable (resume, jd) -> output on 2-D float32 CPU tensors, or None.
+            variant (str): Name of the variant in use.
+        """
+        super().__init__()
+        self.base = base.eval()
+        self.fast = fast
+        self.variant = variant
+        self.input_dim = base.input_dim
+
+    @property
+    def skip_projection(self):
+        return self.base.skip_projection
+
+    def forward(self, resume_emb, jd_emb, use_skip_connection=True):
+        if use_skip_connection or self.fast is None:
+            return self.base(resume_emb, jd_emb, use_skip_connection=use_skip_connection)
+        resume_emb = torch.as_tensor(resume_emb, dtype=torch.float32)
+        jd_emb = torch.as_tensor(jd_emb, dtype=torch.float32)
+        if resume_emb.dim() == 1:
+            resume_emb = resume_emb.unsqueeze(0)
+        if jd_emb.dim() == 1:
+            jd_emb = jd_emb.unsqueeze(0)
+        return self.fast(resume_emb, jd_emb)
+
+
+def load_adapter(model_path, variant="auto", allow_compile=False):
+    """
+    Load a trained adapter, serving its fastest exported variant.
+
+    Args:
+        model_path (str): Trained fp32 state dict (e.g. "mlp_model.pth").
+        variant (str): "auto" picks the fastest variant in the manifest that
+            passed the accuracy guard; or force one of VARIANTS.
+        allow_compile (bool): Let "auto" pick torch.compile, which adds
+            compile time to start-up.
+
+    Returns:
+        FastAdapter: Callable like ResumeMLPAdapter; `.variant` names what is served.
+    """
+    base = adapter_from_state_dict(torch.load(model_path, map_location="cpu"))
+    manifest = {}
+    if os.path.exists(manifest_path(model_path)):
+        with open(manifest_path(model_path)) as f:
+            manifest = json.load(f)
+        if manifest.get("source_mtime") != os.path.getmtime(model_path):
+            print(f"Adapter variants in {manifest_path(model_path)} are older than {model_path}; "
+                  f"re-run export_adapter.py. Using fp32.")
+            manifest = {}
+
+    if variant == "auto":
+        variant = fastest_variant(manifest, allow_compile=allow_compile)
+    elif variant not in VARIANTS:
+        raise ValueError(f"Unknown adapter variant '{variant}'. Choose from {VARIANTS} or 'auto'.")
+    if variant == "fp32":
+        return FastAdapter(base)
+    if variant == "compiled":
+        return FastAdapter(base, build_variant(base, "compiled"), "compiled")
+
+    path = variant_path(model_path, variant)
+    try:
+        return FastAdapter(base, _load_script(path), variant)
+    except Exception as e:
+        print(f"Error loading adapter variant '{variant}' from {path}: {e}. Using fp32.")
+        return FastAdapter(base)
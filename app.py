@@ -1,12 +1,18 @@
 
 import streamlit as st
-import torch
 import numpy as np
 import os
+import uuid
 from utils import extract_text_from_pdf
-from ollama_module import LLMModel
-from adapter_model import ResumeMLPAdapter
-from decoder_module import ResumeDecoder
+from ollama_module import LLMModel, CritiqueSession
+from ollama_transport import Deadline, HedgePolicy
+from adapter_numpy import load_numpy_adapter
+from adapter_server import AdapterServer
+from decoder_module import DEFAULT_PREFILTER_TOP_M, ResumeDecoder
+
+# Latency budgets (seconds): a stalled request degrades the result instead of freezing the page
+PIPELINE_DEADLINE_S = 30  # Embedding + decoding for one run
+CRITIQUE_DEADLINE_S = 180  # One streamed consultant critique
 
 # -------------------------------------------------
 # Page Config
@@ -86,36 +92,49 @@ textarea {
 def load_models():
     """Load and cache the Ollama client, MLP Adapter, and Decoder."""
     # Ollama Client
-    ollama_client = LLMModel(model_name="mxbai-embed-large")
+    # Hedge embedding requests slower than the recent p95 (p99 matters more than the median here)
+    ollama_client = LLMModel(model_name="mxbai-embed-large", hedge=HedgePolicy())
     
     # MLP Adapter
     # Critical Optimization: Force CPU for MLP to save VRAM for Ollama (Gemma 2B)
     # The MLP is tiny (1024->1024), so CPU inference is instant.
-    device = torch.device("cpu") 
-    # mxbai-embed-large has 1024 dimensions. Training uses hidden_dim=2048 (from train.py)
-    mlp = ResumeMLPAdapter(input_dim=1024, hidden_dim=2048, output_dim=1024).to(device)
+    device = "cpu"
+    mlp = None
+    use_skip = True # Fallback for untrained
     
     # Load Trained Weights if available
-    model_path = "mlp_model.pth"
-    if os.path.exists(model_path):
-        try:
-            mlp.load_state_dict(torch.load(model_path, map_location=device))
-            mlp.eval() # Set to eval mode for inference
+    # Prefer the torch-free NumPy runtime (export_adapter.py writes it): importing torch
+    # costs seconds of start-up and hundreds of MB of RSS for a three-layer MLP.
+    # ADAPTER_MODEL_PATH selects another checkpoint, e.g. a low-rank one from factorize_adapter.py
+    model_path = os.environ.get("ADAPTER_MODEL_PATH", "mlp_model.pth")
+    try:
+        mlp = load_numpy_adapter(model_path)
+        if mlp is None and os.path.exists(model_path):
+            # Fastest torch variant (int8/traced) that passed its accuracy guard
+            from adapter_variants import load_adapter
+            mlp = load_adapter(model_path)
+        if mlp is not None:
             use_skip = False # Use actual MLP
-            print(f"Loaded trained model from {model_path}")
-        except Exception as e:
-            print(f"Error loading model: {e}")
-            use_skip = True # Fallback
-    else:
-        use_skip = True # Fallback for untrained
+            print(f"Loaded trained model from {model_path} ({mlp.variant})")
+    except Exception as e:
+        print(f"Error loading model: {e}")
+        mlp = None
+    
+    if mlp is None:
+        from adapter_model import ResumeMLPAdapter
+        # mxbai-embed-large has 1024 dimensions. Training uses hidden_dim=2048 (from train.py)
+        mlp = ResumeMLPAdapter(input_dim=1024, hidden_dim=2048, output_dim=1024)
+    
+    # Shared across Streamlit sessions: concurrent requests are micro-batched into one forward pass
+    adapter_server = AdapterServer(mlp, max_batch_size=32, max_wait_ms=2.0)
     
     # Decoder
     decoder = ResumeDecoder()
     
-    return ollama_client, mlp, decoder, device, use_skip
+    return ollama_client, adapter_server, decoder, device, use_skip
 
 try:
-    ollama_client, mlp_model, decoder, device, use_skip_connection = load_models()
+    ollama_client, adapter_server, decoder, device, use_skip_connection = load_models()
     st.toast(f"System initialized on {device}", icon="⚡")
     if not use_skip_connection:
         st.toast("Trained Model Loaded!", icon="🧠")
@@ -126,6 +145,10 @@ except Exception as e:
 if 'resume_text' not in st.session_state:
     st.session_state.resume_text = ""
 
+if 'resume_id' not in st.session_state:
+    # Keys this session's sentence index in the shared decoder across resume edits
+    st.session_state.resume_id = uuid.uuid4().hex
+
 # -------------------------------------------------
 # HEADER
 # -------------------------------------------------
@@ -149,8 +172,19 @@ ollama_client.model_name = "mxbai-embed-large"
 # Just show the user what's happening
 st.sidebar.info("🧠 Embedding: mxbai-embed-large")
 st.sidebar.info("🤖 Consultant: gemma:2b (GPU)")
+cache = ollama_client._get_cache()
+if cache is not None:
+    cache_stats = cache.stats()
+    st.sidebar.caption(
+        f"Embedding cache: {cache_stats['entries']} vectors, "
+        f"{cache_stats['hits']} hits / {cache_stats['misses']} misses"
+    )
 
 st.sidebar.markdown("---")
+diverse_selection = st.sidebar.checkbox(
+    "Diverse sentence selection (MMR)", value=False,
+    help="Skip sentences that repeat ones already selected instead of taking the 10 most similar."
+)
 st.sidebar.caption("Project Phase: 3 (Refinement & UX)")
 
 # -------------------------------------------------
@@ -226,11 +260,16 @@ if st.session_state.pipeline_run:
         st.error("❌ Please provide a job description.")
     else:
         with st.status("Running Deep Learning Pipeline...", expanded=True) as status:
+            deadline = Deadline(PIPELINE_DEADLINE_S)  # Shared by every Ollama call of this run
             
             # 1. Embeddings
             st.write("🧠 Generating Embeddings (Ollama)...")
-            resume_emb = ollama_client.get_vector(st.session_state.resume_text)
-            jd_emb = ollama_client.get_vector(jd_text)
+            # Chunked so long resumes are not truncated at the embedder's context limit;
+            # all chunks of both documents go out in one batched call
+            resume_doc, jd_doc = ollama_client.get_document_vectors([st.session_state.resume_text, jd_text],
+                                                                    deadline=deadline)
+            resume_emb = resume_doc.vector if resume_doc is not None else None
+            jd_emb = jd_doc.vector if jd_doc is not None else None
             
             if resume_emb is None or jd_emb is None:
                 st.error("Failed to get embeddings. Ensure Ollama is running.")
@@ -240,9 +279,8 @@ if st.session_state.pipeline_run:
                 st.write(f"⚡ Running MLP Adapter on {device}...")
                 
                 try:
-                    with torch.no_grad():
-                        # Pass to MLP
-                        output_vector = mlp_model(resume_emb, jd_emb, use_skip_connection=use_skip_connection)
+                    # Pass to MLP (batched with any other sessions' requests)
+                    output_vector = adapter_server.infer(resume_emb, jd_emb, use_skip_connection=use_skip_connection)
                     
                     st.success("Transformation Complete!")
                     status.update(label="Pipeline Completed!", state="complete")
@@ -250,7 +288,7 @@ if st.session_state.pipeline_run:
                     
                     # Store variables for tab display
                     resume_embedding = resume_emb
-                    tailored_embedding = output_vector.cpu().numpy().flatten()
+                    tailored_embedding = output_vector.flatten()
                     jd_embedding = jd_emb
                     
                     st.markdown("### 📊 Analysis & Results")
@@ -285,9 +323,17 @@ if st.session_state.pipeline_run:
                         # Decoding
                         with st.spinner("Decoding Output (RAG)..."):
                             # FIX 2: Correct Argument Order (Vector, Text) and remove invalid args
+                            decode_result = {}
                             decoded_resume = decoder.decode(
                                 tailored_embedding, # Vector first
-                                st.session_state.resume_text # Text second
+                                st.session_state.resume_text, # Text second
+                                deadline=deadline,
+                                resume_id=st.session_state.resume_id, # Only re-embed edited sentences
+                                selection="mmr" if diverse_selection else "topk",
+                                # Long CVs: embed only the BM25 shortlist against this JD
+                                jd_text=jd_text,
+                                prefilter_top_m=DEFAULT_PREFILTER_TOP_M,
+                                result=decode_result # This call's counts; the shared index may be evicted
                             )
                         st.text_area("Final Result", decoded_resume, height=600)
 
@@ -296,17 +342,59 @@ if st.session_state.pipeline_run:
                         st.markdown("This analysis is generated by **Gemma 2B** to give you qualitative feedback.")
                         
                         if st.button("Generate Expert Critique"):
-                            with st.spinner("Asking Gemma for advice..."):
-                                st.session_state.critique = ollama_client.generate_critique(st.session_state.resume_text, jd_text)
-                        
-                        if "critique" in st.session_state:
+                            # One session per resume: its prefill is reused for every new JD
+                            session = st.session_state.get("critique_session")
+                            if session is None or session.resume_text != st.session_state.resume_text:
+                                session = CritiqueSession(ollama_client, st.session_state.resume_text)
+                                st.session_state.critique_session = session
+                            # Stats come back with this stream; the cached client is shared by every user
+                            result = {}
+                            try:
+                                # Render tokens as they arrive instead of blocking on the whole run
+                                st.session_state.critique = st.write_stream(session.critique_stream(jd_text, deadline=CRITIQUE_DEADLINE_S, result=result))
+                            except RuntimeError as e:
+                                st.session_state.critique = f"Error generating response: {e}"
+                                st.markdown(st.session_state.critique)
+                            st.session_state.critique_stats = result.get("stats")
+                        elif "critique" in st.session_state:
                             st.markdown(st.session_state.critique)
 
+                        stats = st.session_state.get("critique_stats")
+                        if stats:
+                            col_t1, col_t2, col_t3, col_t4 = st.columns(4)
+                            col_t1.metric("Time to First Token", f"{stats['ttft_s']:.2f}s" if stats['ttft_s'] is not None else "n/a")
+                            col_t2.metric("Generation Speed", f"{stats['tokens_per_s']:.1f} tok/s")
+                            col_t3.metric("Prompt Eval", f"{stats['prompt_eval_count']} tok / {stats['prompt_eval_s']:.2f}s")
+                            col_t4.metric("Output Tokens", f"{stats['eval_count']}")
+
+                        session = st.session_state.get("critique_session")
+                        if session is not None and session.prime_stats:
+                            st.caption(
+                                f"Resume prefill ({session.prime_stats['prompt_eval_count']} tokens, "
+                                f"{session.prime_stats['prompt_eval_s']:.2f}s) is reused across "
+                                f"{len(session.history)} critique(s) this session."
+                            )
+
                     with tab3:
                         st.subheader("Transformation Results")
                         colA, colB = st.columns(2)
                         colA.metric("Resume Vector Size", f"{resume_emb.shape[0]}")
                         colB.metric("Transformed Vector Size", f"{tailored_embedding.shape[0]}")
+                        colA.metric("Resume Chunks Embedded", f"{len(resume_doc.chunks)}")
+                        colB.metric("JD Chunks Embedded", f"{len(jd_doc.chunks)}")
+                        sentence_update = decode_result.get("sentence_update", {})
+                        colA.metric("Sentences Reused", f"{sentence_update.get('reused', 0)}")
+                        colB.metric("Sentences Re-embedded", f"{sentence_update.get('embedded', 0)}")
+                        colA.metric("Sentences Shortlisted (BM25)", f"{sentence_update.get('shortlisted', 0)}")
+
+                        st.markdown("**Model Residency (Ollama)**")
+                        st.json(ollama_client.residency.metrics())
+
+                        st.markdown("**HTTP Transport (per endpoint)**")
+                        st.json(ollama_client.transport.metrics())
+
+                        st.markdown("**MLP Adapter Server (micro-batching)**")
+                        st.json(adapter_server.metrics())
 
                     
                 except Exception as e:
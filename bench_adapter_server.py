@@ -0,0 +1,84 @@
+"""
+Benchmark ResumeMLPAdapter served per call vs through AdapterServer micro-batches.
+
+Simulates concurrent users: each client thread sends `--requests` sequential
+adapter calls with batch size 1, as app.py sessions do. Reports throughput
+and p50/p99 latency for direct `model(...)` calls and for the server at a
+few batch-size / max-wait settings.
+
+Usage:
+    python bench_adapter_server.py [--clients 1 4 16] [--requests 200]
+"""
+import argparse
+import threading
+import time
+
+import numpy as np
+import torch
+
+from adapter_model import ResumeMLPAdapter
+from adapter_server import AdapterServer
+
+DIM = 1024
+
+
+def run_clients(call, clients, requests_per_client, vectors):
+    """Run `clients` threads of sequential calls; returns (wall seconds, per-call latencies)."""
+    latencies = [[] for _ in range(clients)]
+    barrier = threading.Barrier(clients + 1)
+
+    def client(slot):
+        barrier.wait()
+        for i in range(requests_per_client):
+            r, j = vectors[(slot * requests_per_client + i) % len(vectors)]
+            start = time.perf_counter()
+            call(r, j)
+            latencies[slot].append(time.perf_counter() - start)
+
+    threads = [threading.Thread(target=client, args=(s,)) for s in range(clients)]
+    for t in threads:
+        t.start()
+    barrier.wait()
+    start = time.perf_counter()
+    for t in threads:
+        t.join()
+    return time.perf_counter() - start, np.concatenate([np.array(l) for l in latencies])
+
+
+def report(label, wall, latencies, extra=""):
+    p50, p99 = np.percentile(latencies, [50, 99]) * 1000
+    print(f"  {label:28s}: {len(latencies) / wall:8.0f} req/s   p50 {p50:7.2f} ms   p99 {p99:7.2f} ms{extra}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--requests", type=int, default=200, help="Sequential calls per client")
+    parser.add_argument("--threads", type=int, default=0, help="torch intra-op threads (0 = torch default)")
+    args = parser.parse_args()
+
+    if args.threads:
+        torch.set_num_threads(args.threads)
+    model = ResumeMLPAdapter(input_dim=DIM, hidden_dim=2048, output_dim=DIM).eval()
+    rng = np.random.default_rng(0)
+    vectors = [(rng.standard_normal(DIM).astype(np.float32), rng.standard_normal(DIM).astype(np.float32))
+               for _ in range(256)]
+
+    def direct(r, j):
+        with torch.no_grad():
+            return model(r, j, use_skip_connection=False)
+
+    for clients in args.clients:
+        print(f"\n{clients} concurrent client(s), {args.requests} calls each")
+        report("direct model(...) per call", *run_clients(direct, clients, args.requests, vectors))
+        for max_batch, max_wait in ((8, 1.0), (32, 2.0), (64, 5.0)):
+            server = AdapterServer(model, max_batch_size=max_batch, max_wait_ms=max_wait)
+            wall, latencies = run_clients(server.infer, clients, args.requests, vectors)
+            stats = server.metrics()
+            server.close()
+            report(f"server batch<={max_batch}, wait {max_wait}ms", wall, latencies,
+                   f"   mean batch {stats['mean_batch_size']:5.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+Cold start and RSS of the adapter serving path, with and without torch.
+
+Each runtime is measured in a fresh interpreter: time to import what the
+serving path needs, load the trained weights and run the first forward pass,
+plus peak RSS afterwards. Then steady-state latency per call.
+  - numpy:  adapter_numpy.NumpyAdapter over the memory-mapped .f32 export
+  - torch:  adapter_variants.load_adapter (fastest exported torch variant)
+  - torch fp32: the plain ResumeMLPAdapter checkpoint
+
+Writes a random checkpoint first if `--model` does not exist.
+
+Usage:
+    python bench_adapter_startup.py [--model mlp_model.pth] [--runs 3]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+CHILD = {
+    "numpy": """
+from adapter_numpy import load_numpy_adapter
+model = load_numpy_adapter(MODEL)
+forward = lambda r, j: model(r, j, use_skip_connection=False)
+""",
+    "torch": """
+import torch
+from adapter_variants import load_adapter
+model = load_adapter(MODEL)
+def forward(r, j):
+    with torch.no_grad():
+        return model(r, j, use_skip_connection=False)
+""",
+    "torch fp32": """
+import torch
+from adapter_variants import load_adapter
+model = load_adapter(MODEL, variant="fp32")
+def forward(r, j):
+    with torch.no_grad():
+        return model(r, j, use_skip_connection=False)
+""",
+}
+
+TEMPLATE = """
+import json, sys, time
+start = time.perf_counter()
+import numpy as np
+MODEL = {model!r}
+{body}
+r = np.random.default_rng(0).standard_normal((1, model.input_dim)).astype(np.float32)
+forward(r, r)
+cold = time.perf_counter() - start
+times = []
+for _ in range(200):
+    t = time.perf_counter()
+    forward(r, r)
+    times.append(time.perf_counter() - t)
+# Peak RSS of this interpreter; ru_maxrss would carry over the parent's high-water mark across exec
+with open("/proc/self/status") as f:
+    rss_kb = next(int(line.split()[1]) for line in f if line.startswith("VmHWM"))
+json.dump({{"cold_s": cold, "rss_mb": rss_kb / 1024,
+           "p50_ms": float(np.percentile(times, 50) * 1000), "torch_loaded": "torch" in sys.modules}}, sys.stdout)
+"""
+
+
+def measure(name, model_path):
+    script = TEMPLATE.format(model=model_path, body=CHILD[name])
+    output = subprocess.run([sys.executable, "-c", script], capture_output=True, text=True,
+                            cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", default="mlp_model.pth")
+    parser.add_argument("--runs", type=int, default=3, help="Fresh interpreters per runtime (best cold start kept)")
+    args = parser.parse_args()
+    model_path = os.path.abspath(args.model)
+
+    if not os.path.exists(model_path):
+        import torch
+
+        from adapter_model import ResumeMLPAdapter
+        torch.save(ResumeMLPAdapter(input_dim=1024, hidden_dim=2048, output_dim=1024).state_dict(), model_path)
+        print(f"Wrote a random checkpoint to {model_path}")
+    from adapter_numpy import export_numpy
+    export_numpy(model_path)
+
+    print(f"\n{'runtime':>11} | {'cold start s':>12} | {'peak RSS MB':>11} | {'p50 ms/call':>11} | torch imported")
+    print("-" * 72)
+    for name in CHILD:
+        runs = [measure(name, model_path) for _ in range(args.runs)]
+        best = min(runs, key=lambda r: r["cold_s"])
+        print(f"{name:>11} | {best['cold_s']:>12.2f} | {best['rss_mb']:>11.0f} | {best['p50_ms']:>11.3f} | "
+              f"{best['torch_loaded']}")
+
+
+if __name__ == "__main__":
+    main()
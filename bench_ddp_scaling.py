@@ -0,0 +1,104 @@
+"""
+Data-parallel CPU training throughput at 1, 2, 4 and 8 workers (gloo).
+
+Writes a synthetic sharded dataset to a temporary directory, then for each
+worker count spawns that many processes running train.py's epoch loop
+(DistributedDataParallel, per-rank batch of train.BATCH_SIZE, one shard of
+the batches per rank). Reports samples/s over the timed epochs, the speed-up
+over one worker and the scaling efficiency (speed-up / workers).
+
+Each rank gets cpu_count // workers intra-op threads, so past the number of
+physical cores extra workers only add all-reduce traffic.
+
+Usage:
+    python bench_ddp_scaling.py [--workers 1 2 4 8] [--rows 4096] [--epochs 2]
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+import torch
+import torch.distributed as dist
+import torch.multiprocessing as mp
+import torch.nn as nn
+import torch.optim as optim
+from torch.nn.parallel import DistributedDataParallel
+
+from adapter_model import ResumeMLPAdapter
+from embedding_dataset import EmbeddingDataset, ShardedEmbeddingWriter, make_loader
+from train import BATCH_SIZE, LEARNING_RATE, MASTER_ADDR, free_port, setup_distributed, train_epoch
+
+DIM = 1024
+
+
+def write_dataset(path, rows):
+    rng = np.random.default_rng(0)
+    with ShardedEmbeddingWriter(path, DIM, source="bench_ddp_scaling") as writer:
+        for i in range(rows):
+            writer.add(rng.standard_normal(DIM), rng.standard_normal(DIM), i)
+
+
+def worker(rank, world_size, args, results):
+    """One rank: warm-up epoch, then timed epochs; rank 0 reports global samples/s."""
+    setup_distributed(rank, world_size)
+    torch.manual_seed(0)
+    dataset = EmbeddingDataset(args.data)
+    loader = make_loader(dataset, BATCH_SIZE, shuffle=True, num_workers=args.loader_workers,
+                         num_replicas=world_size, rank=rank)
+    model = DistributedDataParallel(ResumeMLPAdapter(input_dim=DIM, hidden_dim=2048, output_dim=DIM),
+                                    find_unused_parameters=True)
+    criterion = nn.CosineEmbeddingLoss()
+    optimizer = optim.Adam(model.parameters(), lr=LEARNING_RATE)
+
+    loader.sampler.set_epoch(0)
+    train_epoch(model, loader, criterion, optimizer, "cpu")  # Warm-up
+
+    samples = 0
+    dist.barrier()
+    start = time.perf_counter()
+    for epoch in range(1, args.epochs + 1):
+        loader.sampler.set_epoch(epoch)
+        samples += train_epoch(model, loader, criterion, optimizer, "cpu")[1]
+    dist.barrier()
+    elapsed = time.perf_counter() - start
+
+    total = torch.tensor([samples])
+    dist.all_reduce(total)
+    if rank == 0:
+        results.put(total.item() / elapsed)
+    dist.destroy_process_group()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--rows", type=int, default=4096, help="Synthetic training pairs")
+    parser.add_argument("--epochs", type=int, default=2, help="Timed epochs per worker count")
+    parser.add_argument("--loader-workers", type=int, default=0, help="DataLoader processes per rank")
+    args = parser.parse_args()
+
+    print(f"CPUs: {os.cpu_count()}, rows: {args.rows}, per-rank batch: {BATCH_SIZE}, timed epochs: {args.epochs}")
+    context = mp.get_context("spawn")
+    with tempfile.TemporaryDirectory() as tmp:
+        args.data = tmp
+        write_dataset(tmp, args.rows)
+
+        print(f"\n{'workers':>7} | {'samples/s':>10} | {'speed-up':>8} | {'efficiency':>10}")
+        print("-" * 45)
+        baseline = None
+        for world_size in args.workers:
+            os.environ["MASTER_ADDR"] = MASTER_ADDR
+            os.environ["MASTER_PORT"] = str(free_port())
+            results = context.SimpleQueue()
+            mp.spawn(worker, args=(world_size, args, results), nprocs=world_size, join=True)
+            rate = results.get()
+            if baseline is None:
+                baseline = rate / world_size  # Per-worker rate of the first (smallest) count
+            speed_up = rate / baseline
+            print(f"{world_size:>7} | {rate:>10.1f} | {speed_up:>7.2f}x | {speed_up / world_size:>9.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+Offline benchmark of the decoder's sentence scoring and selection.
+
+Compares, on synthetic 1024-d sentence vectors with near-duplicate clusters:
+  1. The old path: float64 `np.array` + sklearn `cosine_similarity` + full argsort
+  2. The scoring engine: pre-normalized float32 GEMV + argpartition top-k
+  3. MMR selection: latency and how redundant the selected sentences are
+  4. Many targets against one resume: a loop of GEMVs vs one GEMM (decode_many)
+
+Usage:
+    python bench_decoder.py [--sizes 50 200 1000 5000] [--top-k 10]
+"""
+import argparse
+import time
+
+import numpy as np
+from sklearn.metrics.pairwise import cosine_similarity
+
+from scoring import cosine_scores, mmr_indices, normalize_rows, top_k_indices, top_k_indices_many
+
+DIM = 1024
+
+
+def make_sentences(n, rng, cluster_size=5, noise=0.15):
+    """Sentence vectors in clusters of near-duplicates (like repeated bullet phrasing)."""
+    centers = rng.standard_normal((max(1, n // cluster_size), DIM)).astype(np.float32)
+    labels = rng.integers(0, len(centers), size=n)
+    vectors = centers[labels] + noise * rng.standard_normal((n, DIM)).astype(np.float32)
+    return [v for v in vectors], labels
+
+
+def best_of(fn, repeats):
+    """Fastest of `repeats` runs in milliseconds (less noisy than the mean)."""
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return 1000 * min(times)
+
+
+def old_path(sent_vectors, target, k):
+    matrix = np.array(sent_vectors, dtype=np.float64)
+    similarities = cosine_similarity(target.reshape(1, -1), matrix)[0]
+    return np.argsort(similarities)[-k:][::-1]
+
+
+def redundancy(unit_matrix, indices):
+    """Mean pairwise cosine similarity among selected rows (lower = more diverse)."""
+    sel = unit_matrix[indices]
+    sims = sel @ sel.T
+    n = len(indices)
+    return float((sims.sum() - np.trace(sims)) / (n * (n - 1))) if n > 1 else 0.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[50, 200, 1000, 5000])
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--mmr-lambda", type=float, default=0.7)
+    parser.add_argument("--repeats", type=int, default=20)
+    parser.add_argument("--targets", type=int, default=64, help="Target vectors for the batch comparison")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    k = args.top_k
+    print(f"{'sentences':>9} | {'old score+argsort':>17} | {'GEMV+argpartition':>17} | {'speedup':>7} | "
+          f"{'MMR':>8} | {'clusters top-k':>14} | {'clusters MMR':>12} | {'redundancy top-k/MMR':>20}")
+    print("-" * 128)
+    for n in args.sizes:
+        sent_vectors, labels = make_sentences(n, rng)
+        target = rng.standard_normal(DIM).astype(np.float32)
+
+        t_old = best_of(lambda: old_path(sent_vectors, target, k), args.repeats)
+
+        unit = normalize_rows(np.stack(sent_vectors))  # Done once per resume in the decoder
+        t_new = best_of(lambda: top_k_indices(cosine_scores(unit, target), k), args.repeats)
+
+        scores = cosine_scores(unit, target)
+        t_mmr = best_of(lambda: mmr_indices(unit, scores, k, mmr_lambda=args.mmr_lambda), args.repeats)
+
+        top = top_k_indices(scores, k)
+        mmr = mmr_indices(unit, scores, k, mmr_lambda=args.mmr_lambda)
+        assert set(top) == set(old_path(sent_vectors, target, k)), "engine disagrees with sklearn path"
+
+        print(f"{n:>9} | {t_old:>14.3f} ms | {t_new:>14.3f} ms | {t_old / t_new:>6.1f}x | {t_mmr:>5.2f} ms | "
+              f"{len(set(labels[top])):>14} | {len(set(labels[mmr])):>12} | "
+              f"{redundancy(unit, top):>9.3f} / {redundancy(unit, mmr):.3f}")
+
+    print(f"\n{args.targets} targets against one resume (top-{k} each)")
+    for n in args.sizes:
+        unit = normalize_rows(np.stack(make_sentences(n, rng)[0]))
+        targets = normalize_rows(rng.standard_normal((args.targets, DIM)))
+        t_loop = best_of(lambda: [top_k_indices(cosine_scores(unit, t), k) for t in targets], args.repeats)
+        t_batch = best_of(lambda: top_k_indices_many(targets @ unit.T, k), args.repeats)
+        print(f"  {n:>5} sentences: per-target loop {t_loop:8.3f} ms   one GEMM {t_batch:8.3f} ms   "
+              f"x{t_loop / t_batch:.1f}")
+
+
+if __name__ == "__main__":
+    main()
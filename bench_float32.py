@@ -0,0 +1,101 @@
+"""
+Copies and memory of embedding hand-offs: float64 + torch.tensor vs float32 + from_numpy.
+
+Compares the pipeline as it was (JSON list -> float64 np.array ->
+torch.tensor(..., dtype=float32) -> .to(device) with a parameter lookup per
+call) against the float32 path (JSON list -> float32 array ->
+torch.from_numpy, device cached on the module):
+  [1] buffers copied per adapter call, checked by pointer identity
+  [2] hand-off and full adapter call time at batch 1
+  [3] memory of the decoder's sentence matrix and preprocess_embeddings'
+      in-memory lists at realistic sizes
+
+Usage:
+    python bench_float32.py [--rows 50000] [--sentences 300]
+"""
+import argparse
+import time
+
+import numpy as np
+import torch
+
+from adapter_model import ResumeMLPAdapter
+
+DIM = 1024
+
+
+def legacy_handoff(vector, model):
+    """The pre-float32 path: float64 array, torch.tensor copy, per-call device lookup and .to()."""
+    device = next(model.parameters()).device
+    tensor = torch.tensor(vector, dtype=torch.float32)
+    return tensor.to(device)
+
+
+def float32_handoff(vector, model):
+    tensor = torch.from_numpy(np.asarray(vector, dtype=np.float32))
+    return tensor if tensor.device == model.device else tensor.to(model.device)
+
+
+def count_copies(payload, model):
+    """Buffers allocated between the parsed JSON list and the tensor the adapter consumes."""
+    legacy_array = np.array(payload)  # What get_vector used to return
+    legacy_tensor = legacy_handoff(legacy_array, model)
+    legacy = 1 + int(legacy_tensor.data_ptr() != legacy_array.ctypes.data)
+
+    array = np.asarray(payload, dtype=np.float32)
+    tensor = float32_handoff(array, model)
+    current = 1 + int(tensor.data_ptr() != array.ctypes.data)
+    return legacy, legacy_array.dtype, current, array.dtype
+
+
+def time_call(fn, iterations):
+    for _ in range(10):
+        fn()
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return (time.perf_counter() - start) / iterations * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=50000, help="Training pairs held by preprocess_embeddings")
+    parser.add_argument("--sentences", type=int, default=300, help="Sentences in the decoder's matrix")
+    parser.add_argument("--iterations", type=int, default=2000)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    model = ResumeMLPAdapter(input_dim=DIM, hidden_dim=2048, output_dim=DIM).eval()
+    payload = rng.standard_normal(DIM).tolist()  # /api/embed JSON, already parsed
+
+    print("[1] Buffers allocated from parsed JSON to adapter input (one embedding)")
+    legacy, legacy_dtype, current, current_dtype = count_copies(payload, model)
+    print(f"  before : {legacy} ({legacy_dtype} array, then torch.tensor copy)")
+    print(f"  after  : {current} ({current_dtype} array, shared by torch.from_numpy)")
+
+    print(f"\n[2] Time per call, batch 1 (mean of {args.iterations})")
+    legacy_vec, vec = np.array(payload), np.asarray(payload, dtype=np.float32)
+    print(f"  hand-off before : {time_call(lambda: legacy_handoff(legacy_vec, model), args.iterations):8.1f} us")
+    print(f"  hand-off after  : {time_call(lambda: float32_handoff(vec, model), args.iterations):8.1f} us")
+
+    def legacy_forward():
+        r, j = legacy_handoff(legacy_vec, model), legacy_handoff(legacy_vec, model)
+        return model(r.unsqueeze(0), j.unsqueeze(0), use_skip_connection=False)
+
+    with torch.no_grad():
+        iterations = max(args.iterations // 10, 50)
+        print(f"  adapter before  : {time_call(legacy_forward, iterations):8.1f} us")
+        print(f"  adapter after   : {time_call(lambda: model(vec, vec, use_skip_connection=False), iterations):8.1f} us")
+
+    print("\n[3] Embedding memory")
+    sentence_matrix = rng.standard_normal((args.sentences, DIM))
+    print(f"  decoder matrix, {args.sentences} sentences : {sentence_matrix.nbytes / 1e6:8.2f} MB float64 -> "
+          f"{sentence_matrix.astype(np.float32).nbytes / 1e6:8.2f} MB float32")
+    rows_bytes = 2 * args.rows * DIM  # Resume + JD list per training pair
+    print(f"  preprocess lists, {args.rows} pairs : {rows_bytes * 8 / 1e6:8.1f} MB float64 -> "
+          f"{rows_bytes * 4 / 1e6:8.1f} MB float32 (plus one stacked copy each: "
+          f"{rows_bytes * 8 / 1e6:.1f} -> {rows_bytes * 4 / 1e6:.1f} MB, and no torch.tensor copy)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+"""
+Offline benchmark of the Ollama client layers against fake_ollama.
+
+Measures, with deterministic injected latencies instead of a GPU:
+  1. Per-text requests vs batched get_vectors vs concurrent AsyncLLMModel
+  2. Cold vs warm embedding cache
+  3. Time to first token for streamed vs blocking critiques
+  4. keep_alive=0 model swapping vs the residency scheduler
+  5. Tail latency with injected stalls: plain vs hedged requests, and
+     fail-fast behaviour of the circuit breaker against a dead server
+
+Usage:
+    python bench_ollama_client.py [--sentences 200] [--latency-ms 15]
+"""
+import argparse
+import shutil
+import tempfile
+import time
+
+import numpy as np
+
+from embedding_cache import EmbeddingCache
+from fake_ollama import FakeOllamaServer
+from ollama_module import AsyncLLMModel, LLMModel, ModelResidencyManager
+from ollama_transport import Deadline, HedgePolicy, OllamaTransport
+
+EMBED_MODEL = "mxbai-embed-large"
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return time.perf_counter() - start, result
+
+
+def make_sentences(n):
+    return [f"Sentence {i}: built dashboards and automated reporting for team {i % 7}." for i in range(n)]
+
+
+def bench_batching(server, sentences):
+    print("\n[1] Embedding round trips")
+    seq = LLMModel(EMBED_MODEL, base_url=server.url, cache=False)
+    t_seq, _ = timed(lambda: [seq.get_vector(s) for s in sentences])
+
+    batched = LLMModel(EMBED_MODEL, base_url=server.url, cache=False)
+    t_batch, (matrix, ok) = timed(lambda: batched.get_vectors(sentences))
+
+    concurrent = AsyncLLMModel(EMBED_MODEL, base_url=server.url, cache=False, max_concurrency=4)
+    t_async, (matrix_async, _) = timed(lambda: concurrent.get_vectors(sentences, batch_size=16))
+
+    assert ok.all() and np.array_equal(matrix, matrix_async), "batched paths disagree"
+    n = len(sentences)
+    print(f"  per-text get_vector      : {t_seq:7.3f}s  ({n / t_seq:8.1f} texts/s)")
+    print(f"  batched get_vectors      : {t_batch:7.3f}s  ({n / t_batch:8.1f} texts/s)  x{t_seq / t_batch:.1f}")
+    print(f"  async 4x16 concurrent    : {t_async:7.3f}s  ({n / t_async:8.1f} texts/s)  x{t_seq / t_async:.1f}")
+
+
+def bench_cache(server, sentences):
+    print("\n[2] Embedding cache")
+    cache_dir = tempfile.mkdtemp(prefix="embed_cache_")
+    cache = EmbeddingCache(cache_dir)
+    try:
+        client = LLMModel(EMBED_MODEL, base_url=server.url, cache=cache)
+        before = server.stats["embedded_inputs"]
+        t_cold, (cold, _) = timed(lambda: client.get_vectors(sentences))
+        t_warm, (warm, _) = timed(lambda: client.get_vectors(sentences))
+        sent = server.stats["embedded_inputs"] - before
+        assert np.array_equal(cold, warm), "cache returned different vectors"
+        stats = cache.stats()
+        print(f"  cold: {t_cold:7.3f}s   warm: {t_warm:7.3f}s   x{t_cold / t_warm:.1f}")
+        print(f"  inputs sent to server: {sent} for {2 * len(sentences)} lookups "
+              f"(hit rate {stats['hit_rate']:.0%})")
+    finally:
+        cache.close()  # Before the directory goes, so nothing is flushed into it at exit
+        shutil.rmtree(cache_dir, ignore_errors=True)
+
+
+def bench_residency(server, cycles):
+    print("\n[4] Model residency (embed burst + critique, repeated)")
+    for label, keep_alive in (("keep_alive=0 (old)", 0), ("scheduler", 1800)):
+        server.httpd.loaded.clear()
+        residency = ModelResidencyManager(server.url, keep_alive=keep_alive)
+        client = LLMModel(EMBED_MODEL, base_url=server.url, cache=False, residency=residency)
+        loads_before = server.stats["loads"]
+
+        def run():
+            for i in range(cycles):
+                client.get_vectors(make_sentences(8))
+                client.get_vectors(make_sentences(8)[::-1])
+                client.generate_critique(f"resume {i}", "job description")
+        t, _ = timed(run)
+        loads = server.stats["loads"] - loads_before
+        print(f"  {label:20s}: {t:7.3f}s  model loads: {loads:3d}  "
+              f"evictions: {residency.metrics()['evictions']}")
+
+
+def bench_streaming(server):
+    print("\n[3] Critique latency")
+    client = LLMModel(EMBED_MODEL, base_url=server.url, cache=False)
+    t_block, _ = timed(lambda: client.generate_critique("resume", "job"))
+    result = {}
+    tokens = list(client.generate_critique_stream("resume", "job", result=result))
+    stats = result["stats"]
+    print(f"  blocking: first text after {t_block:6.3f}s")
+    print(f"  streamed: first token after {stats['ttft_s']:6.3f}s "
+          f"({len(tokens)} tokens, {stats['tokens_per_s']:.0f} tok/s, done in {stats['wall_s']:.3f}s)")
+
+
+def bench_tail(server, requests_n):
+    print("\n[5] Tail latency (single-text embeds with injected stalls)")
+    for label, hedge in (("plain", None), ("hedged at p95", HedgePolicy(min_samples=20))):
+        transport = OllamaTransport(server.url)
+        client = LLMModel(EMBED_MODEL, base_url=server.url, cache=False, transport=transport, hedge=hedge)
+        latencies = []
+        for i in range(requests_n):
+            t, _ = timed(lambda: client.get_vector(f"{label} probe {i}"))
+            latencies.append(t)
+        p50, p99 = np.percentile(latencies, [50, 99]) * 1000
+        hedges = transport.metrics()["/api/embed"]["hedges"]
+        print(f"  {label:14s}: p50 {p50:6.1f} ms   p99 {p99:7.1f} ms   max {1000 * max(latencies):7.1f} ms"
+              f"   duplicates sent: {hedges}")
+        transport.close()
+
+    dead = LLMModel(EMBED_MODEL, base_url="http://127.0.0.1:9", cache=False,
+                    transport=OllamaTransport("http://127.0.0.1:9"))
+    t, _ = timed(lambda: [dead.get_vectors(make_sentences(4), deadline=Deadline(2.0)) for _ in range(20)])
+    circuit = dead.transport.metrics()["circuit"]
+    print(f"  dead server   : 20 calls in {t:.3f}s (circuit {circuit['state']}, "
+          f"{circuit['rejected']} refused without a connection attempt)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sentences", type=int, default=200)
+    parser.add_argument("--latency-ms", type=float, default=15.0, help="Fake per-request overhead")
+    parser.add_argument("--per-input-ms", type=float, default=0.2, help="Fake per-input embedding cost")
+    parser.add_argument("--load-ms", type=float, default=300.0, help="Fake model load delay")
+    parser.add_argument("--token-ms", type=float, default=5.0, help="Fake per-token decode time")
+    parser.add_argument("--cycles", type=int, default=5, help="Embed+critique cycles for [4]")
+    parser.add_argument("--stall-rate", type=float, default=0.03, help="Fraction of stalled requests for [5]")
+    parser.add_argument("--stall-ms", type=float, default=400.0, help="Extra delay of a stalled request")
+    parser.add_argument("--tail-requests", type=int, default=300, help="Requests per variant in [5]")
+    args = parser.parse_args()
+
+    sentences = make_sentences(args.sentences)
+    with FakeOllamaServer(latency_ms=args.latency_ms, per_input_ms=args.per_input_ms,
+                          token_ms=args.token_ms) as server:
+        bench_batching(server, sentences)
+        bench_cache(server, sentences)
+        bench_streaming(server)
+        server.config.load_ms = args.load_ms
+        bench_residency(server, args.cycles)
+        server.config.load_ms = 0.0
+        server.config.stall_rate, server.config.stall_ms = args.stall_rate, args.stall_ms
+        bench_tail(server, args.tail_requests)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""
+Measure the BM25 prefilter trade-off in ResumeDecoder's hybrid mode.
+
+Uses a synthetic topic model instead of Ollama so lexical and dense
+similarity are related the way they are for real text: every word has a
+vector, a sentence's embedding is its normalized mean word vector plus
+noise, and the JD shares vocabulary with the resume sentences it targets.
+For each shortlist size M this reports the embedding calls made and how
+close the selection stays to embedding every sentence:
+  - overlap@k with the all-dense selection
+  - mean cosine of the selected sentences to the target
+
+Usage:
+    python bench_prefilter.py [--sentences 300] [--top-k 10]
+"""
+import argparse
+
+import numpy as np
+
+from decoder_module import ResumeDecoder
+from scoring import normalize_rows
+
+DIM = 256
+TOPICS = 12
+WORDS_PER_TOPIC = 40
+
+
+class SyntheticEmbedder:
+    def __init__(self, rng, noise=0.3):
+        """Stand-in embedding client: mean of per-word vectors plus noise, counting every text embedded."""
+        self.rng = rng
+        self.noise = noise
+        self.word_vectors = {}
+        self.calls = 0
+
+    def vector(self, text):
+        words = text.lower().split()
+        for w in words:
+            if w not in self.word_vectors:
+                self.word_vectors[w] = self.rng.standard_normal(DIM).astype(np.float32)
+        mean = np.mean([self.word_vectors[w] for w in words], axis=0)
+        # Deterministic per-text noise so repeated embeds agree
+        noise = np.random.default_rng(abs(hash(text)) % (2 ** 32)).standard_normal(DIM).astype(np.float32)
+        return normalize_rows(mean / np.linalg.norm(mean) + self.noise * noise / np.sqrt(DIM))[0]
+
+    def get_vectors(self, texts, deadline=None):
+        self.calls += len(texts)
+        return np.stack([self.vector(t) for t in texts]), np.ones(len(texts), dtype=bool)
+
+
+def make_corpus(rng, n_sentences):
+    vocab = [[f"t{t}w{w}" for w in range(WORDS_PER_TOPIC)] for t in range(TOPICS)]
+    shared = [f"common{w}" for w in range(60)]  # Words every section uses (managed, team, ...)
+    sentences = []
+    for i in range(n_sentences):
+        topic = rng.integers(TOPICS)
+        words = list(rng.choice(vocab[topic], size=6)) + list(rng.choice(shared, size=6))
+        rng.shuffle(words)
+        sentences.append(f"Item{i} " + " ".join(words) + ".")
+    jd_topics = rng.choice(TOPICS, size=2, replace=False)
+    jd = " ".join(" ".join(rng.choice(vocab[t], size=25)) for t in jd_topics)
+    jd += " " + " ".join(rng.choice(shared, size=5))
+    return sentences, jd
+
+
+def run(decoder, embedder, target, text, jd, top_k, prefilter_top_m, dense_weight):
+    decoder._indexes.clear()
+    embedder.calls = 0
+    selected = decoder.decode(target, text, top_k=top_k, jd_text=jd, prefilter_top_m=prefilter_top_m,
+                              dense_weight=dense_weight, resume_id="bench").split("\n\n")
+    return selected, embedder.calls
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sentences", type=int, default=300)
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--trials", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    decoder = ResumeDecoder()
+    rows = {}
+    for _ in range(args.trials):
+        embedder = SyntheticEmbedder(rng)
+        decoder.client = embedder
+        sentences, jd = make_corpus(rng, args.sentences)
+        text = "\n".join(sentences)
+        # Adapter output stand-in: the JD's embedding, nudged
+        target = embedder.vector(jd) + 0.1 * rng.standard_normal(DIM).astype(np.float32) / np.sqrt(DIM)
+
+        dense, dense_calls = run(decoder, embedder, target, text, None, args.top_k, None, 1.0)
+        rows.setdefault(("all (dense only)", 1.0), []).append((dense_calls, 1.0, mean_cosine(embedder, target, dense)))
+        for m in (10, 20, 40, 80):
+            for weight in (1.0, 0.8):
+                picked, calls = run(decoder, embedder, target, text, jd, args.top_k, m, weight)
+                overlap = len(set(picked) & set(dense)) / len(dense)
+                rows.setdefault((f"BM25 top-{m}", weight), []).append(
+                    (calls, overlap, mean_cosine(embedder, target, picked)))
+
+    print(f"{args.sentences} sentences, top-{args.top_k}, mean of {args.trials} synthetic resumes\n")
+    print(f"{'candidates':>18} | {'dense weight':>12} | {'embeds':>7} | {'fewer calls':>11} | "
+          f"{'overlap@k':>9} | {'mean cos':>8}")
+    print("-" * 82)
+    baseline_calls = np.mean([r[0] for r in rows[("all (dense only)", 1.0)]])
+    for (label, weight), values in rows.items():
+        calls, overlap, cos = (np.mean([v[i] for v in values]) for i in range(3))
+        print(f"{label:>18} | {weight:>12.1f} | {calls:>7.0f} | {baseline_calls / calls:>10.1f}x | "
+              f"{overlap:>9.2f} | {cos:>8.3f}")
+
+
+def mean_cosine(embedder, target, selected):
+    unit = normalize_rows(np.stack([embedder.vector(s) for s in selected]))
+    return float((unit @ normalize_rows(target)[0]).mean())
+
+
+if __name__ == "__main__":
+    main()
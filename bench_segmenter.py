@@ -0,0 +1,125 @@
+"""
+Benchmark the resume sentence segmenters on synthetic resumes with known splits.
+
+Resumes are rendered from gold segments the way they reach the decoder:
+headings, bullet lists hard-wrapped like PDF extraction, contact lines and
+short prose paragraphs. Reports segment precision/recall/F1 against the
+gold segments, throughput, and the import cost of each backend. The NLTK
+column is skipped when nltk or its punkt_tab data is not installed.
+
+Usage:
+    python bench_segmenter.py [--resumes 200] [--wrap 80]
+"""
+import argparse
+import os
+import random
+import subprocess
+import sys
+import textwrap
+import time
+
+from segmenter import split_sentences
+
+HEADINGS = ["EXPERIENCE", "EDUCATION", "SKILLS", "PROJECTS", "Certifications:", "Professional Summary"]
+VERBS = ["Built", "Led", "Designed", "Automated", "Migrated", "Analyzed", "Reduced", "Launched", "Mentored"]
+OBJECTS = ["an ETL pipeline", "Power BI dashboards", "a fraud model", "the AWS data lake", "ESG risk models",
+           "a React front end", "the U.S. reporting stack", "vendor contracts", "CI/CD for 12 services"]
+DETAILS = ["cutting costs by 18%", "for 3.5k users", "with Dr. Patel's team", "e.g. Airflow and dbt",
+           "across Jan. - Dec. 2022", "saving $120k/yr", "in Python and SQL", "i.e. weekly KPI reviews"]
+BULLETS = ["•", "-", "*", "▪", "1."]
+
+
+def make_resume(rng, wrap):
+    """Render one resume and return (text, gold segments)."""
+    gold = ["JANE DOE", "jane.doe@mail.com | linkedin.com/in/janedoe | +1 555-0100"]
+    lines = list(gold) + [""]
+    for heading in rng.sample(HEADINGS, 4):
+        gold.append(heading)
+        lines.append(heading)
+        if rng.random() < 0.3:
+            # Prose paragraph: several sentences, wrapped
+            sentences = [f"{rng.choice(VERBS)} {rng.choice(OBJECTS)} {rng.choice(DETAILS)}." for _ in range(3)]
+            gold.extend(sentences)
+            lines.extend(textwrap.wrap(" ".join(sentences), wrap))
+        else:
+            marker = rng.choice(BULLETS)
+            for _ in range(rng.randint(3, 6)):
+                bullet = (f"{rng.choice(VERBS)} {rng.choice(OBJECTS)} {rng.choice(DETAILS)} "
+                          f"and {rng.choice(VERBS).lower()} {rng.choice(OBJECTS)} {rng.choice(DETAILS)}")
+                if rng.random() < 0.5:
+                    bullet += "."
+                gold.append(bullet)
+                wrapped = textwrap.wrap(bullet, wrap - 2)
+                lines.append(f"{marker} {wrapped[0]}")
+                lines.extend(f"  {w}" for w in wrapped[1:])
+        lines.append("")
+    return "\n".join(lines), gold
+
+
+def score(predicted, gold):
+    """Exact-match segment precision, recall and F1 (multiset semantics)."""
+    remaining = {}
+    for g in gold:
+        remaining[g] = remaining.get(g, 0) + 1
+    hits = 0
+    for p in predicted:
+        if remaining.get(p, 0):
+            remaining[p] -= 1
+            hits += 1
+    precision = hits / len(predicted) if predicted else 0.0
+    recall = hits / len(gold) if gold else 0.0
+    f1 = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+    return precision, recall, f1
+
+
+def import_seconds(module):
+    """Cold import time of `module` in a fresh interpreter."""
+    code = f"import time; t = time.perf_counter(); import {module}; print(time.perf_counter() - t)"
+    # From the repo directory, so repo modules import wherever the benchmark is launched from
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True,
+                            cwd=os.path.dirname(os.path.abspath(__file__)))
+    return float(result.stdout.strip()) if result.returncode == 0 else None
+
+
+def evaluate(backend, corpus):
+    try:
+        split_sentences(corpus[0][0], backend=backend)
+    except (ImportError, LookupError) as e:
+        print(f"  {backend:8s}: skipped ({e})")
+        return
+    totals = [0.0, 0.0, 0.0]
+    start = time.perf_counter()
+    outputs = [split_sentences(text, backend=backend) for text, _ in corpus]
+    elapsed = time.perf_counter() - start
+    for predicted, (_, gold) in zip(outputs, corpus):
+        # Compare whitespace-normalized segments with list markers stripped (what the decoder embeds)
+        predicted = [" ".join(p.lstrip("•-*▪ ").split()) for p in predicted]
+        for i, value in enumerate(score(predicted, gold)):
+            totals[i] += value
+    n = len(corpus)
+    print(f"  {backend:8s}: P {totals[0] / n:.3f}  R {totals[1] / n:.3f}  F1 {totals[2] / n:.3f}   "
+          f"{1000 * elapsed / n:.3f} ms/resume")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--resumes", type=int, default=200)
+    parser.add_argument("--wrap", type=int, default=80, help="Hard-wrap width, like PDF text extraction")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    corpus = [make_resume(rng, args.wrap) for _ in range(args.resumes)]
+
+    print(f"Segmentation quality and speed over {args.resumes} synthetic resumes")
+    for backend in ("builtin", "nltk"):
+        evaluate(backend, corpus)
+
+    print("\nCold import cost")
+    for module in ("segmenter", "nltk"):
+        seconds = import_seconds(module)
+        print(f"  import {module:10s}: " + (f"{seconds:.3f}s" if seconds is not None else "not installed"))
+
+
+if __name__ == "__main__":
+    main()
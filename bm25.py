@@ -0,0 +1,79 @@
+"""
+Okapi BM25 over resume sentences, for shortlisting before dense reranking.
+
+A sparse lexical score against the JD text is nearly free compared with an
+embedding call, so the decoder can use it to pick which sentences are worth
+embedding at all. Postings are numpy arrays per term; scoring a query only
+touches the rows that contain its terms.
+"""
+import re
+
+import numpy as np
+
+_TOKEN = re.compile(r"[a-z0-9][a-z0-9+#.\-]*[a-z0-9+#]|[a-z0-9]")
+
+STOPWORDS = frozenset(
+    "a an and are as at be by for from has have in is it its of on or that the this to was were will with "
+    "we you your our their they he she i me my us who what which while within into over per via using".split()
+)
+
+
+def tokenize(text):
+    """Lowercase word tokens, keeping tech terms like `c++`, `c#`, `node.js` and `ci/cd` parts."""
+    return [t for t in _TOKEN.findall(text.lower()) if t not in STOPWORDS]
+
+
+class BM25Index:
+    def __init__(self, documents, k1=1.5, b=0.75):
+        """
+        BM25 index over a small collection (e.g. the sentences of one resume).
+
+        Args:
+            documents (list[str]): Texts to index; scores follow their order.
+            k1 (float): Term-frequency saturation.
+            b (float): Length normalization strength.
+        """
+        self.k1 = k1
+        self.b = b
+        self.size = len(documents)
+
+        tokenized = [tokenize(d) for d in documents]
+        self.lengths = np.array([len(t) for t in tokenized], dtype=np.float32)
+        self.avg_length = float(self.lengths.mean()) if self.size and self.lengths.sum() else 1.0
+
+        postings = {}
+        for row, tokens in enumerate(tokenized):
+            counts = {}
+            for token in tokens:
+                counts[token] = counts.get(token, 0) + 1
+            for token, tf in counts.items():
+                postings.setdefault(token, ([], []))
+                postings[token][0].append(row)
+                postings[token][1].append(tf)
+        self.postings = {
+            token: (np.array(rows, dtype=np.int64), np.array(tfs, dtype=np.float32))
+            for token, (rows, tfs) in postings.items()
+        }
+        self._norm = self.k1 * (1.0 - self.b + self.b * self.lengths / self.avg_length)
+
+    def idf(self, token):
+        df = len(self.postings[token][0])
+        return float(np.log(1.0 + (self.size - df + 0.5) / (df + 0.5)))
+
+    def scores(self, query):
+        """
+        BM25 score of every indexed document for `query`.
+
+        Args:
+            query (str): Query text (e.g. the job description).
+
+        Returns:
+            numpy.ndarray: float32 scores of shape (size,); 0 for no overlap.
+        """
+        scores = np.zeros(self.size, dtype=np.float32)
+        for token in set(tokenize(query)):
+            if token not in self.postings:
+                continue
+            rows, tf = self.postings[token]
+            scores[rows] += self.idf(token) * tf * (self.k1 + 1.0) / (tf + self._norm[rows])
+        return scores
@@ -1,7 +1,7 @@
 import pandas as pd
-import subprocess
 import time
 import os
+from ollama_module import AsyncLLMModel
 
 # ----------------------------------------------------------
 # CONFIGURATION
@@ -10,6 +10,7 @@ MODEL = "gemma:2b"               # Model in Ollama (make sure it's pulled)
 TIMEOUT = 600                  # Timeout per resume (10 min max)
 BATCH_SIZE = 10                # Save progress every 10
 SAMPLE_SIZE = 50               # Generate for first 50 resumes
+MAX_CONCURRENCY = 4            # In-flight requests (match OLLAMA_NUM_PARALLEL)
 
 INPUT_FILE = "train_jdresume.csv"
 OUTPUT_DIR = "outputs"
@@ -33,13 +34,7 @@ print(f"🧭 Using columns: resume = '{resume_col}', JD = '{jd_col}'")
 # ----------------------------------------------------------
 # 2️⃣ Generate Tailored Resumes
 # ----------------------------------------------------------
-outputs = []
-
-for i, row in df.iterrows():
-    resume = str(row[resume_col])
-    jd = str(row[jd_col])
-
-    prompt = f"""
+PROMPT_TEMPLATE = """
 You are an expert resume writer.
 Rewrite the following resume to best match the job description while keeping all information truthful.
 Emphasize relevant skills, achievements, and experiences.
@@ -54,27 +49,28 @@ Job Description:
 Return only the rewritten resume. Do not include explanations.
 """
 
-    try:
-        proc = subprocess.run(
-            ["ollama", "run", MODEL],
-            input=prompt,
-            text=True,
-            capture_output=True,
-            timeout=TIMEOUT
-        )
-        output = proc.stdout.strip()
-    except Exception as e:
-        print(f"⚠️ Error at row {i}: {e}")
-        output = ""
+client = AsyncLLMModel(model_name=MODEL, max_concurrency=MAX_CONCURRENCY, request_timeout=TIMEOUT)
+outputs = []
+
+for start in range(0, len(df), BATCH_SIZE):
+    batch = df.iloc[start:start + BATCH_SIZE]
+    prompts = [
+        PROMPT_TEMPLATE.format(resume=str(row[resume_col]), jd=str(row[jd_col]))
+        for _, row in batch.iterrows()
+    ]
 
-    outputs.append(output)
+    results = client.generate_many_sync(prompts)
+    for i, output in zip(batch.index, results):
+        if output is None:
+            print(f"⚠️ Error at row {i}")
+        outputs.append(output or "")
 
-    if (i + 1) % BATCH_SIZE == 0:
-        print(f"✅ Processed {i + 1}/{len(df)} resumes...")
-        temp_df = df.iloc[:i + 1].copy()
-        temp_df[output_col] = outputs
-        temp_df.to_csv(f"{OUTPUT_DIR}/train_tailored_partial.csv", index=False)
-        time.sleep(1)
+    done = start + len(batch)
+    print(f"✅ Processed {done}/{len(df)} resumes...")
+    temp_df = df.iloc[:done].copy()
+    temp_df[output_col] = outputs
+    temp_df.to_csv(f"{OUTPUT_DIR}/train_tailored_partial.csv", index=False)
+    time.sleep(1)
 
 # ----------------------------------------------------------
 # 3️⃣ Save Final Output
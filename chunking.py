@@ -0,0 +1,147 @@
+"""
+Split long documents into embedding-sized chunks and pool chunk vectors.
+
+mxbai-embed-large silently truncates inputs beyond its 512-token context, so a
+full resume sent as one input only contributes its first page to the vector.
+Documents are split on section and sentence boundaries into chunks that fit a
+token budget; the chunk vectors are pooled back into one document vector.
+"""
+import re
+
+import numpy as np
+
+# mxbai-embed-large reads 512 tokens; leave room for special tokens and
+# for the character-based estimate undercounting symbols and numbers.
+DEFAULT_MAX_TOKENS = 400
+CHARS_PER_TOKEN = 4
+POOLING_MODES = ("mean", "weighted", "max")
+
+_BLANK_LINE = re.compile(r"\n\s*\n")
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+(?=[A-Z0-9•\-*])")
+_HEADING = re.compile(r"^\s*(?:[A-Z][A-Z &/]{2,}|[A-Z][\w &/]{2,30}:)\s*$")
+
+
+def estimate_tokens(text):
+    """Cheap token estimate (~4 characters per token for English text)."""
+    return max(1, len(text) // CHARS_PER_TOKEN)
+
+
+def _sections(text):
+    """Split on blank lines and heading-looking lines (e.g. 'EXPERIENCE', 'Skills:')."""
+    sections = []
+    for block in _BLANK_LINE.split(text):
+        current = []
+        for line in block.splitlines():
+            if _HEADING.match(line) and current:
+                sections.append("\n".join(current))
+                current = []
+            current.append(line)
+        if current:
+            sections.append("\n".join(current))
+    return [s.strip() for s in sections if s.strip()]
+
+
+def _units(section):
+    """Sentence-level units of one section (lines first, then sentence punctuation)."""
+    units = []
+    for line in section.splitlines():
+        line = line.strip()
+        if line:
+            units.extend(u.strip() for u in _SENTENCE_END.split(line) if u.strip())
+    return units
+
+
+def _split_oversized(unit, max_tokens):
+    """Hard-split a single unit longer than the budget on word boundaries."""
+    max_chars = max_tokens * CHARS_PER_TOKEN
+    pieces, current = [], ""
+    for word in unit.split():
+        if current and len(current) + 1 + len(word) > max_chars:
+            pieces.append(current)
+            current = word
+        else:
+            current = f"{current} {word}" if current else word
+    if current:
+        pieces.append(current)
+    return pieces
+
+
+def split_into_chunks(text, max_tokens=DEFAULT_MAX_TOKENS):
+    """
+    Split a document into chunks that each fit the embedding model's context.
+
+    Sentences are packed greedily within a section; a new section always
+    starts a new chunk so chunks stay topically coherent.
+
+    Args:
+        text (str): The full document.
+        max_tokens (int): Token budget per chunk (estimated).
+
+    Returns:
+        list[str]: Chunks in document order (empty for blank input).
+    """
+    chunks = []
+    for section in _sections(text):
+        current = []
+        current_tokens = 0
+        for unit in _units(section):
+            for piece in ([unit] if estimate_tokens(unit) <= max_tokens
+                          else _split_oversized(unit, max_tokens)):
+                tokens = estimate_tokens(piece)
+                if current and current_tokens + tokens > max_tokens:
+                    chunks.append(" ".join(current))
+                    current, current_tokens = [], 0
+                current.append(piece)
+                current_tokens += tokens
+        if current:
+            chunks.append(" ".join(current))
+    return chunks
+
+
+def pool_vectors(matrix, weights=None, mode="weighted"):
+    """
+    Pool chunk vectors into one unit-length document vector.
+
+    Args:
+        matrix (numpy.ndarray): Chunk vectors, shape (num_chunks, dim).
+        weights (numpy.ndarray): Per-chunk weights (e.g. token counts), used by "weighted".
+        mode (str): "mean", "weighted" (length-weighted mean) or "max" (element-wise).
+
+    Returns:
+        numpy.ndarray: float32 vector of shape (dim,). Normalized like the
+        single-input embeddings Ollama returns, so downstream cosine scores
+        and the adapter see the same scale either way.
+    """
+    if mode not in POOLING_MODES:
+        raise ValueError(f"Unknown pooling mode '{mode}'. Choose from {POOLING_MODES}.")
+
+    matrix = np.asarray(matrix, dtype=np.float32)
+    if mode == "max":
+        pooled = matrix.max(axis=0)
+    elif mode == "weighted" and weights is not None:
+        w = np.asarray(weights, dtype=np.float32)
+        pooled = (w[:, None] * matrix).sum(axis=0) / w.sum()
+    else:
+        pooled = matrix.mean(axis=0)
+
+    norm = np.linalg.norm(pooled)
+    if norm > 0:
+        pooled = pooled / norm
+    return pooled.astype(np.float32, copy=False)
+
+
+class DocumentEmbedding:
+    def __init__(self, vector, chunks, chunk_vectors, weights):
+        """
+        A pooled document vector together with the chunk vectors it came from.
+
+        Args:
+            vector (numpy.ndarray): Pooled document vector (dim,).
+            chunks (list[str]): Chunk texts that embedded successfully.
+            chunk_vectors (numpy.ndarray): Their vectors, shape (len(chunks), dim).
+            weights (numpy.ndarray): Estimated token count of each chunk.
+        """
+        self.vector = vector
+        self.chunks = chunks
+        self.chunk_vectors = chunk_vectors
+        self.weights = weights
@@ -1,27 +1,156 @@
-
-import torch
+import threading
 import numpy as np
-from sklearn.metrics.pairwise import cosine_similarity
-from ollama_module import LLMModel
-import nltk
-
-# Ensure nltk is downloaded (basic tokenizer)
-try:
-    nltk.data.find('tokenizers/punkt')
-    nltk.data.find('tokenizers/punkt_tab')
-except LookupError:
-    nltk.download('punkt')
-    nltk.download('punkt_tab')
+from collections import OrderedDict
+from ollama_module import AsyncLLMModel
+from bm25 import BM25Index
+from scoring import (DEFAULT_DENSE_WEIGHT, DEFAULT_MMR_LAMBDA, fuse_scores, normalize_rows, select,
+                     top_k_indices, top_k_indices_many)
+from segmenter import split_sentences
 
-class ResumeDecoder:
+# Resumes whose sentence index is kept in memory at once (least recently used dropped)
+MAX_INDEXED_RESUMES = 16
+
+# Hybrid mode: sentences shortlisted by BM25 against the JD before embedding
+DEFAULT_PREFILTER_TOP_M = 40
+
+
+class SentenceIndex:
     def __init__(self):
+        """
+        Sentence vectors of one resume, kept across edits of its text.
+
+        `update` diffs a new sentence list against the indexed one: sentences
+        already indexed keep their row (and their score for an unchanged
+        target), so an edit only costs embedding the added or changed lines.
+        """
+        self.lock = threading.RLock()  # Held by a decode across update, score and selection
+        self.sentences = []
+        self.unit_matrix = None  # (N, dim) float32, L2-normalized, rows aligned with `sentences`
+        self.scores = None  # Similarity of each row to `_target` (NaN = not scored yet)
+        self.sparse_scores = None  # BM25 of each row against the JD (hybrid mode only)
+        self._target = None
+        self.last_update = {"reused": 0, "embedded": 0, "removed": 0, "failed": 0}
+
+    def update(self, sentences, embed):
+        """
+        Re-align the index with the current sentence list.
+
+        Args:
+            sentences (list[str]): Candidate sentences in document order.
+            embed (callable): texts -> (matrix, ok) for sentences not indexed yet.
+
+        Returns:
+            dict: How many sentences were reused, embedded, removed or failed.
+        """
+        with self.lock:
+            return self._update(sentences, embed)
+
+    def _update(self, sentences, embed):
+        old_rows = {s: i for i, s in enumerate(self.sentences)}
+        to_embed = [s for s in dict.fromkeys(sentences) if s not in old_rows]
+
+        fresh = {}
+        if to_embed:
+            fresh_matrix, fresh_ok = embed(to_embed)
+            fresh = {s: v for s, v, k in zip(to_embed, fresh_matrix, fresh_ok) if k}
+
+        kept, vectors, scores = [], [], []
+        for s in sentences:
+            if s in old_rows:
+                row = old_rows[s]
+                vectors.append(self.unit_matrix[row])
+                scores.append(self.scores[row] if self.scores is not None else np.nan)
+            elif s in fresh:
+                vectors.append(np.asarray(fresh[s], dtype=np.float32))
+                scores.append(np.nan)
+            else:
+                continue  # Not embedded; retried on the next update
+            kept.append(s)
+
+        current = set(sentences)
+        self.last_update = {
+            "reused": sum(s in old_rows for s in kept),
+            "embedded": len(fresh),
+            "removed": sum(s not in current for s in old_rows),
+            "failed": len(to_embed) - len(fresh),
+        }
+        self.sentences = kept
+        # Normalized once here so every later score is a single GEMV
+        self.unit_matrix = normalize_rows(np.stack(vectors)) if vectors else None
+        self.scores = np.array(scores, dtype=np.float32) if vectors else None
+        return self.last_update
+
+    def score(self, target_vector):
+        """
+        Cosine similarity of every indexed sentence to `target_vector`.
+
+        Scores for an unchanged target are updated in place: only rows added
+        since the last call are computed.
+        """
+        with self.lock:
+            return self._score(target_vector)
+
+    def _score(self, target_vector):
+        target = normalize_rows(target_vector)[0]
+        if self._target is None or not np.array_equal(self._target, target):
+            self._target = target
+            self.scores = self.unit_matrix @ target
+            return self.scores
+
+        stale = np.isnan(self.scores)
+        if stale.any():
+            self.scores[stale] = self.unit_matrix[stale] @ target
+        return self.scores
+
+
+class DecodedBatch:
+    def __init__(self, selections, selected_indices, scores, sentences):
+        """
+        Result of decoding one resume against many target vectors.
+
+        Args:
+            selections (list[str]): Reconstructed resume text per target.
+            selected_indices (list[numpy.ndarray]): Selected sentence indices per
+                target, in document order.
+            scores (numpy.ndarray): float32 cosine scores, shape (num_targets, num_sentences).
+            sentences (list[str]): The sentences the score columns refer to.
+        """
+        self.selections = selections
+        self.selected_indices = selected_indices
+        self.scores = scores
+        self.sentences = sentences
+
+
+class ResumeDecoder:
+    def __init__(self, segmenter="builtin"):
         """
         A RAG-based decoder that reconstructs a resume by selecting sentences
         that best align with the target embedding.
+
+        Sentence vectors are indexed per resume, so decoding an edited resume
+        or the same resume against a new JD only embeds what changed.
+
+        Args:
+            segmenter (str): Sentence splitter backend, "builtin" (no downloads)
+                or "nltk" (punkt data must already be installed).
         """
-        pass
+        self.segmenter = segmenter
+        self.client = AsyncLLMModel(model_name="mxbai-embed-large")
+        self._indexes = OrderedDict()  # resume_id -> SentenceIndex
+        self._indexes_lock = threading.Lock()  # One decoder serves every app session
+
+    def index_for(self, resume_id):
+        """The sentence index of `resume_id`, created on first use."""
+        with self._indexes_lock:
+            index = self._indexes.pop(resume_id, None) or SentenceIndex()
+            self._indexes[resume_id] = index
+            while len(self._indexes) > MAX_INDEXED_RESUMES:
+                self._indexes.popitem(last=False)
+            return index
 
-    def decode(self, target_vector, original_resume_text, top_k=10):
+    def decode(self, target_vector, original_resume_text, top_k=10, deadline=None,
+               resume_id="default", selection="topk", mmr_lambda=DEFAULT_MMR_LAMBDA, jd_text=None,
+               prefilter_top_m=None, dense_weight=DEFAULT_DENSE_WEIGHT, result=None):
         """
         Selects sentences from `original_resume_text` that are semantically closest 
         to `target_vector`.
@@ -30,55 +159,131 @@ class ResumeDecoder:
             target_vector (numpy.ndarray or torch.Tensor): The output vector from MLP (4096,).
             original_resume_text (str): The full text of the original resume.
             top_k (int): Number of sentences to select.
+            deadline (Deadline | float): Budget for embedding the sentences; ones not
+                embedded in time are left out of the selection.
+            resume_id (str): Identifies the resume across edits (e.g. one per user
+                session); its sentence index is diffed against the new text.
+            selection (str): "topk" for the most similar sentences, or "mmr" to
+                penalise sentences that repeat ones already selected.
+            mmr_lambda (float): Relevance/diversity trade-off for "mmr" (1.0 = top-k).
+            jd_text (str): Job description text. With `prefilter_top_m`, enables
+                hybrid retrieval: BM25 against the JD shortlists the sentences
+                worth embedding, and dense and sparse scores are fused.
+            prefilter_top_m (int): Sentences kept by the BM25 shortlist (sentences
+                already embedded for this resume are always kept, as they are free).
+            dense_weight (float): Weight of the cosine score in the fusion
+                (1.0 = cosine only, 0.0 = BM25 only).
+            result (dict): Filled with "sentence_update", the counts of this call's
+                index update (see `SentenceIndex.update`, plus "shortlisted").
+                Per call, as the index may since have been evicted or updated.
 
         Returns:
             str: Reconstructed resume text.
         """
         # normalize target vector
-        if isinstance(target_vector, torch.Tensor):
+        if hasattr(target_vector, "detach"):  # torch.Tensor, without importing torch
             target_vector = target_vector.detach().cpu().numpy()
         
         target_vector = target_vector.flatten().reshape(1, -1)
 
+        # Callers sharing a resume_id take turns, so scores always match the sentences they index
+        index = self.index_for(resume_id)
+        with index.lock:
+            # 1-2. Split into sentences and embed the ones this resume's index has not seen
+            error = self._sync_index(index, original_resume_text, deadline,
+                                     jd_text=jd_text, prefilter_top_m=prefilter_top_m, result=result)
+            if error:
+                return error
+
+            # 3. Compute Similarity: one GEMV against the pre-normalized (N, Dim) matrix
+            similarities = index.score(target_vector) # Shape (N,)
+            if index.sparse_scores is not None:
+                similarities = fuse_scores(similarities, index.sparse_scores, dense_weight)
+
+            # 4. Select Top-K (argpartition, or MMR for a less repetitive selection)
+            top_indices = select(index.unit_matrix, similarities, top_k, mode=selection, mmr_lambda=mmr_lambda)
+            
+            # Sort indices to maintain original narrative flow (optional but recommended)
+            top_indices = sorted(top_indices)
+
+            selected_sentences = [index.sentences[i] for i in top_indices]
+        
+        return "\n\n".join(selected_sentences)
+
+    def decode_many(self, target_matrix, original_resume_text, top_k=10, deadline=None,
+                    resume_id="default", selection="topk", mmr_lambda=DEFAULT_MMR_LAMBDA, result=None):
+        """
+        Decode one resume against many target vectors (e.g. one per JD).
+
+        The resume's sentences are split and embedded once, and every target
+        is scored with a single (num_targets, dim) x (dim, N) matrix multiply.
+        Dense scoring only: a BM25 shortlist would differ per JD.
+
+        Args:
+            target_matrix (numpy.ndarray or torch.Tensor): Target vectors, shape (num_targets, dim).
+            original_resume_text (str): The full text of the original resume.
+            top_k (int): Number of sentences to select per target.
+            deadline, resume_id, selection, mmr_lambda, result: As in `decode`.
+
+        Returns:
+            DecodedBatch: Per-target selections plus the full score matrix. If the
+            resume yields no usable sentences, every selection is the error
+            message and the score matrix has no columns.
+        """
+        if hasattr(target_matrix, "detach"):  # torch.Tensor, without importing torch
+            target_matrix = target_matrix.detach().cpu().numpy()
+        targets = normalize_rows(np.asarray(target_matrix).reshape(len(target_matrix), -1))
+
+        index = self.index_for(resume_id)
+        with index.lock:
+            error = self._sync_index(index, original_resume_text, deadline, result=result)
+            if error:
+                empty = np.empty((len(targets), 0), dtype=np.float32)
+                return DecodedBatch([error] * len(targets), [np.empty(0, dtype=np.int64)] * len(targets), empty, [])
+
+            # One GEMM for all targets: (T, Dim) x (Dim, N)
+            scores = targets @ index.unit_matrix.T
+
+            if selection == "topk":
+                picked = top_k_indices_many(scores, top_k)
+            else:
+                picked = [select(index.unit_matrix, row, top_k, mode=selection, mmr_lambda=mmr_lambda)
+                          for row in scores]
+
+            selected_indices = [np.sort(rows) for rows in picked]  # Original narrative order
+            selections = ["\n\n".join(index.sentences[i] for i in rows) for rows in selected_indices]
+            return DecodedBatch(selections, selected_indices, scores, list(index.sentences))
+
+    def _sync_index(self, index, original_resume_text, deadline, jd_text=None, prefilter_top_m=None,
+                    result=None):
+        """Split the resume and sync `index` (caller holds its lock); returns an error string or None."""
         # 1. Split resume into candidate sentences
-        sentences = nltk.sent_tokenize(original_resume_text)
+        sentences = split_sentences(original_resume_text, backend=self.segmenter)
         # Clean sentences (remove short ones)
         sentences = [s.strip() for s in sentences if len(s.strip()) > 20]
         
         if not sentences:
             return "Error: No valid sentences found in resume."
 
-        # 2. Embed all sentences
-        # Note: This is slow if done sequentially. 
-        # Ideally, we would batch this or cache it.
-        # For a single resume (20-50 sentences), this is acceptable (few seconds).
-        sent_vectors = []
-        valid_sentences = []
-        
-        # Instantiate Client
-        client = LLMModel(model_name="mxbai-embed-large")
-
-        for sent in sentences:
-            vec = client.get_vector(sent)
-            if vec is not None:
-                sent_vectors.append(vec)
-                valid_sentences.append(sent)
-        
-        if not sent_vectors:
-            return "Error: Could not embed sentences."
-
-        sent_matrix = np.array(sent_vectors) # (Num_Sentences, 4096)
-
-        # 3. Compute Similarity: Target (1, 4096) x Matrix.T (4096, N)
-        similarities = cosine_similarity(target_vector, sent_matrix)[0] # Shape (N,)
+        # 2. Embed only sentences this resume's index has not seen
+        sparse = None
+        shortlisted = len(sentences)
+        if jd_text and prefilter_top_m:
+            # Hybrid: only BM25's top-M (plus sentences with a vector already) get embedded
+            bm25 = BM25Index(sentences).scores(jd_text)
+            sparse = dict(zip(sentences, bm25))
+            keep = set(sentences[i] for i in top_k_indices(bm25, prefilter_top_m))
+            keep.update(s for s in index.sentences if s in sparse)
+            sentences = [s for s in sentences if s in keep]
+            shortlisted = len(set(sentences))
 
-        # 4. Select Top-K
-        # Get indices of top-k scores
-        top_indices = np.argsort(similarities)[-top_k:][::-1]
-        
-        # Sort indices to maintain original narrative flow (optional but recommended)
-        top_indices = sorted(top_indices)
+        index.update(sentences, lambda texts: self.client.get_vectors(texts, deadline=deadline))
+        index.last_update["shortlisted"] = shortlisted
+        if result is not None:
+            result["sentence_update"] = dict(index.last_update)
+        index.sparse_scores = (np.array([sparse[s] for s in index.sentences], dtype=np.float32)
+                               if sparse is not None else None)
 
-        selected_sentences = [valid_sentences[i] for i in top_indices]
-        
-        return "\n\n".join(selected_sentences)
+        if not index.sentences:
+            return "Error: Could not embed sentences."
+        return None
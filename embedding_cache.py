@@ -0,0 +1,420 @@
+"""
+Persistent, content-addressed cache for embedding vectors.
+
+Vectors are stored as float32 rows in memory-mapped files (one file per
+embedding dimension) and an index maps each content key to its row.
+Keys hash the model name, the embedding endpoint and the normalized text, so
+the same sentence embedded by the same model is only ever sent to Ollama once.
+The cache is bounded by `max_entries` and evicts the least recently used rows.
+
+Several processes may share one cache directory (the app, preprocess runs,
+sweep workers). Every change to the index is appended to a journal
+(`journal.log`: "+ key dim slot" / "- key" lines) under an inter-process file
+lock, after the vector row is written; before each lookup or insert a process
+replays the records other processes appended. All processes therefore agree
+on which rows are taken and never hand one row to two texts. The journal is
+folded into the `index.json` snapshot every COMPACT_EVERY records and at exit,
+so an insert costs one small append instead of rewriting the whole index.
+"""
+import atexit
+import functools
+import hashlib
+import json
+import os
+import threading
+import weakref
+from collections import OrderedDict
+
+import numpy as np
+
+DEFAULT_CACHE_DIR = os.environ.get("RESUMECRAFT_EMBED_CACHE_DIR", ".embedding_cache")
+DEFAULT_MAX_ENTRIES = 50_000
+INDEX_FILE = "index.json"
+JOURNAL_FILE = "journal.log"
+LOCK_FILE = "cache.lock"
+INDEX_VERSION = 2
+COMPACT_EVERY = 10_000  # Journal records before they are folded into the snapshot
+
+
+def normalize_text(text):
+    """Collapse whitespace so cosmetic edits (re-wrapped lines, trailing spaces) still hit."""
+    return " ".join(str(text).split())
+
+
+def make_key(model_name, endpoint, text):
+    """Content-address a text for a given model and embedding endpoint."""
+    h = hashlib.sha256()
+    for part in (model_name, endpoint, normalize_text(text)):
+        h.update(part.encode("utf-8"))
+        h.update(b"\0")
+    return h.hexdigest()
+
+
+class _FileLock:
+    """Exclusive lock shared by every process opening `path` (flock, or msvcrt on Windows)."""
+
+    def __init__(self, path):
+        self._file = open(path, "a+b")
+
+    def __enter__(self):
+        if os.name == "nt":
+            import msvcrt
+            self._file.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(self._file.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    continue  # LK_LOCK gives up after ~10 s; keep waiting
+        else:
+            import fcntl
+            fcntl.flock(self._file.fileno(), fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if os.name == "nt":
+            import msvcrt
+            self._file.seek(0)
+            msvcrt.locking(self._file.fileno(), msvcrt.LK_UNLCK, 1)
+        else:
+            import fcntl
+            fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+
+    def close(self):
+        self._file.close()
+
+
+def _flush_at_exit(ref):
+    """atexit hook holding only a weak reference, so caches can still be garbage collected."""
+    cache = ref()
+    if cache is not None:
+        cache.flush()
+
+
+class _VectorPool:
+    """A growable float32 memmap holding every cached vector of one dimension."""
+
+    def __init__(self, path, dim, max_rows):
+        self.path = path
+        self.dim = dim
+        self.max_rows = max_rows
+        self.rows = 0
+        self.free = []
+        self.next_slot = 0
+        self.mmap = None
+        self.refresh()
+
+    def refresh(self):
+        """Re-map the file at its current size (another process may have grown it)."""
+        rows = os.path.getsize(self.path) // (self.dim * 4) if os.path.exists(self.path) else 0
+        if rows != self.rows or (rows and self.mmap is None):
+            self.mmap = None
+            self.rows = rows
+            if rows:
+                self.mmap = np.memmap(self.path, dtype=np.float32, mode="r+", shape=(rows, self.dim))
+
+    def _grow(self):
+        new_rows = min(self.max_rows, max(1024, self.rows * 2))
+        if self.mmap is not None:
+            self.mmap.flush()
+            self.mmap = None
+        with open(self.path, "ab") as f:
+            f.truncate(new_rows * self.dim * 4)
+        self.rows = 0
+        self.refresh()
+
+    def allocate(self):
+        if self.free:
+            return self.free.pop()
+        if self.next_slot >= self.rows:
+            self.refresh()
+            if self.next_slot >= self.rows:
+                self._grow()
+        slot = self.next_slot
+        self.next_slot += 1
+        return slot
+
+    def claim(self, slot):
+        """Replay another process's `allocate` that returned `slot`."""
+        if self.free and self.free[-1] == slot:
+            self.free.pop()
+        elif slot in self.free:
+            self.free.remove(slot)
+        else:
+            self.next_slot = max(self.next_slot, slot + 1)
+        if slot >= self.rows:
+            self.refresh()
+
+
+class EmbeddingCache:
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_entries=DEFAULT_MAX_ENTRIES, bypass=None):
+        """
+        On-disk LRU cache of embedding vectors, safe to share between processes.
+
+        Args:
+            cache_dir (str): Directory holding the index, journal and vector files.
+            max_entries (int): Maximum number of cached vectors before LRU eviction.
+            bypass (bool): If True, lookups always miss and nothing is stored.
+                Defaults to the RESUMECRAFT_EMBED_CACHE_BYPASS environment variable.
+        """
+        if bypass is None:
+            bypass = os.environ.get("RESUMECRAFT_EMBED_CACHE_BYPASS", "") not in ("", "0")
+
+        self.cache_dir = cache_dir
+        self.max_entries = max_entries
+        self.bypass = bypass
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self._lock = threading.Lock()  # Threads of this process; _file_lock covers the others
+        self._entries = OrderedDict()  # key -> (dim, slot), oldest first
+        self._pools = {}
+        self._generation = None  # Snapshot generation the in-memory index was loaded from
+        self._journal_pos = 0  # Journal bytes already applied
+        self._journal_records = 0
+        self._dirty = False
+
+        os.makedirs(cache_dir, exist_ok=True)
+        self._file_lock = _FileLock(os.path.join(cache_dir, LOCK_FILE))
+        with self._lock, self._file_lock:
+            self._sync()
+        self._at_exit = functools.partial(_flush_at_exit, weakref.ref(self))
+        atexit.register(self._at_exit)
+
+    # -------------------------------------------------
+    # Persistence
+    # -------------------------------------------------
+    def _path(self, name):
+        return os.path.join(self.cache_dir, name)
+
+    def _pool(self, dim):
+        pool = self._pools.get(dim)
+        if pool is None:
+            pool = _VectorPool(self._path(f"vectors-{dim}.f32"), dim, self.max_entries)
+            self._pools[dim] = pool
+        return pool
+
+    def _load_snapshot(self):
+        """Reset the in-memory index to `index.json` (empty if missing or from an older version)."""
+        self._entries.clear()
+        self._pools.clear()
+        self._generation = 0
+        path = self._path(INDEX_FILE)
+        if not os.path.exists(path):
+            return
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                index = json.load(f)
+            if index.get("version") != INDEX_VERSION:
+                return
+            self._generation = index["generation"]
+            for dim, state in index["pools"].items():
+                pool = self._pool(int(dim))
+                pool.next_slot = state["next_slot"]
+                pool.free = list(state["free"])
+            for key, dim, slot in index["entries"]:
+                if slot < self._pool(dim).rows:  # Skip rows lost with a truncated vector file
+                    self._entries[key] = (dim, slot)
+        except Exception as e:
+            print(f"Embedding cache index unreadable, starting empty: {e}")
+            self._entries.clear()
+            self._pools.clear()
+
+    def _sync(self):
+        """Apply journal records appended by other processes. Caller holds both locks."""
+        path = self._path(JOURNAL_FILE)
+        if not os.path.exists(path):
+            self._load_snapshot()
+            self._write_journal_header()
+            return
+
+        with open(path, "rb") as f:
+            header = f.readline()
+            generation = json.loads(header)["generation"] if header.endswith(b"\n") else None
+            if generation != self._generation or self._journal_pos == 0:
+                # Compacted (or first load): start over from the snapshot it was folded into
+                self._load_snapshot()
+                if generation != self._generation:
+                    self._write_journal_header()  # Journal is stale or torn; the snapshot is the truth
+                    return
+                self._journal_pos, self._journal_records = len(header), 0
+            f.seek(self._journal_pos)
+            tail = f.read()
+
+        complete = tail[:tail.rfind(b"\n") + 1]
+        for line in complete.decode("utf-8").splitlines():
+            self._apply(line.split())
+        self._journal_records += complete.count(b"\n")
+        self._journal_pos += len(complete)
+        if len(complete) != len(tail):
+            # A writer died mid-record (writers hold the lock, so none is active): drop the fragment
+            with open(path, "r+b") as f:
+                f.truncate(self._journal_pos)
+
+    def _apply(self, record):
+        if record[0] == "+":
+            key, dim, slot = record[1], int(record[2]), int(record[3])
+            self._pool(dim).claim(slot)
+            self._entries[key] = (dim, slot)
+        elif record[0] == "-" and record[1] in self._entries:
+            self._release(record[1])
+
+    def _append(self, records):
+        """Append this process's records (already applied in memory) to the journal."""
+        with open(self._path(JOURNAL_FILE), "a", encoding="utf-8", newline="\n") as f:
+            f.write("".join(records))
+        self._journal_pos += sum(len(r) for r in records)
+        self._journal_records += len(records)
+
+    def _write_journal_header(self):
+        with open(self._path(JOURNAL_FILE), "w", encoding="utf-8", newline="\n") as f:
+            f.write(json.dumps({"generation": self._generation}) + "\n")
+        self._journal_pos = os.path.getsize(self._path(JOURNAL_FILE))
+        self._journal_records = 0
+
+    def _compact(self):
+        """Fold the journal into a new snapshot. Caller holds both locks and has synced."""
+        for pool in self._pools.values():
+            if pool.mmap is not None:
+                pool.mmap.flush()
+        self._generation += 1
+        index = {
+            "version": INDEX_VERSION,
+            "generation": self._generation,
+            "entries": [[key, dim, slot] for key, (dim, slot) in self._entries.items()],
+            "pools": {str(dim): {"next_slot": pool.next_slot, "free": pool.free}
+                      for dim, pool in self._pools.items()},
+        }
+        path = self._path(INDEX_FILE)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(index, f)
+        os.replace(tmp_path, path)
+        self._write_journal_header()
+        self._dirty = False
+
+    def flush(self):
+        """Write dirty vector rows to disk and fold the journal into the index snapshot."""
+        with self._lock:
+            if not self._dirty or not os.path.isdir(self.cache_dir):
+                return  # Nothing new, or the directory was removed (e.g. a temporary cache)
+            with self._file_lock:
+                self._sync()
+                self._compact()
+
+    def close(self):
+        """Flush, then release the files and the exit hook; the cache must not be used afterwards."""
+        self.flush()
+        atexit.unregister(self._at_exit)
+        with self._lock:
+            self._pools.clear()
+            self._file_lock.close()
+
+    # -------------------------------------------------
+    # Lookup / Insert
+    # -------------------------------------------------
+    def get_many(self, keys):
+        """
+        Look up cached vectors.
+
+        Args:
+            keys (list[str]): Keys produced by `make_key`.
+
+        Returns:
+            list: A float32 vector per key, or None on a miss.
+        """
+        if self.bypass:
+            self.misses += len(keys)
+            return [None] * len(keys)
+
+        results = []
+        with self._lock, self._file_lock:
+            self._sync()
+            for key in keys:
+                entry = self._entries.get(key)
+                if entry is None:
+                    self.misses += 1
+                    results.append(None)
+                    continue
+                dim, slot = entry
+                self._entries.move_to_end(key)
+                self.hits += 1
+                # Copy out of the memmap so later slot reuse cannot alias the result
+                results.append(np.array(self._pools[dim].mmap[slot]))
+        return results
+
+    def put_many(self, keys, vectors):
+        """Store vectors under their keys, evicting least recently used entries."""
+        if self.bypass:
+            return
+        with self._lock, self._file_lock:
+            self._sync()
+            records = []
+            for key, vec in zip(keys, vectors):
+                dim = len(vec)
+                entry = self._entries.get(key)
+                if entry is not None and entry[0] == dim:
+                    slot = entry[1]
+                    self._entries.move_to_end(key)
+                else:
+                    if entry is not None:
+                        self._release(key)
+                        records.append(f"- {key}\n")
+                    while len(self._entries) >= self.max_entries:
+                        evicted = next(iter(self._entries))
+                        self._release(evicted)
+                        records.append(f"- {evicted}\n")
+                        self.evictions += 1
+                    slot = self._pool(dim).allocate()
+                    self._entries[key] = (dim, slot)
+                    records.append(f"+ {key} {dim} {slot}\n")
+                # Row first, record second: a process that sees the record finds the vector
+                self._pools[dim].mmap[slot] = vec
+            if records:
+                self._append(records)
+            self._dirty = True
+            if self._journal_records >= COMPACT_EVERY:
+                self._compact()
+
+    def _release(self, key):
+        dim, slot = self._entries.pop(key)
+        self._pools[dim].free.append(slot)
+
+    def clear(self):
+        """Drop every cached vector (files are kept and reused)."""
+        with self._lock, self._file_lock:
+            self._sync()
+            self._entries.clear()
+            for pool in self._pools.values():
+                pool.free = []
+                pool.next_slot = 0
+            self._compact()
+
+    def stats(self):
+        """Return hit/miss counters and current occupancy."""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "bypass": self.bypass,
+        }
+
+    def __len__(self):
+        return len(self._entries)
+
+
+_default_caches = {}
+
+
+def get_default_cache(cache_dir=DEFAULT_CACHE_DIR):
+    """Process-wide shared cache per directory (threads share one in-memory index)."""
+    cache_dir = os.path.abspath(cache_dir)
+    if cache_dir not in _default_caches:
+        _default_caches[cache_dir] = EmbeddingCache(cache_dir)
+    return _default_caches[cache_dir]
@@ -0,0 +1,339 @@
+"""
+Sharded, memory-mapped (resume, JD) embedding dataset for training the adapter.
+
+On disk, a dataset is a directory:
+    manifest.json              rows per shard, dim, dtype, file names
+    shard-00000.resume.npy     float32 (rows, dim)
+    shard-00000.jd.npy         float32 (rows, dim)
+    shard-00000.ids.npy        int64 (rows,) source row of each pair (CSV line)
+The manifest is written last, so an interrupted write never looks complete.
+
+`EmbeddingDataset` memory-maps the shards lazily in each process (DataLoader
+workers included), so start-up reads nothing and the dataset can be much
+larger than RAM or device memory. `ShardedBatchSampler` yields shuffled
+batches whose rows come from one shard and are read in ascending order.
+`make_loader` puts both behind a DataLoader with worker prefetch and pinned
+memory.
+
+Convert an old `dataset_tensors.pt` with:
+    python embedding_dataset.py convert dataset_tensors.pt dataset_embeddings
+"""
+import argparse
+import json
+import os
+
+import numpy as np
+import torch
+from torch.utils.data import DataLoader, Dataset, Sampler
+
+MANIFEST = "manifest.json"
+FORMAT_VERSION = 1
+SHARD_ROWS = 16384  # 64 MB per side at 1024 dims
+DEFAULT_NUM_WORKERS = 2
+DEFAULT_PREFETCH_FACTOR = 4
+
+
+def read_manifest(path):
+    manifest_file = os.path.join(path, MANIFEST)
+    if not os.path.exists(manifest_file):
+        raise FileNotFoundError(f"No embedding dataset at {path} (missing {MANIFEST}). "
+                                f"Run preprocess_embeddings.py first.")
+    with open(manifest_file) as f:
+        manifest = json.load(f)
+    if manifest.get("version") != FORMAT_VERSION:
+        raise ValueError(f"Unsupported embedding dataset version {manifest.get('version')} in {path}.")
+    return manifest
+
+
+class ShardedEmbeddingWriter:
+    def __init__(self, path, dim, shard_rows=SHARD_ROWS, source=None):
+        """
+        Append (resume, JD) embedding pairs to a sharded dataset, one shard in memory at a time.
+
+        Args:
+            path (str): Dataset directory; an existing dataset there is replaced.
+            dim (int): Embedding dimension.
+            shard_rows (int): Rows per shard file.
+            source (str): Where the pairs came from, recorded in the manifest.
+        """
+        self.path = path
+        self.dim = dim
+        self.shard_rows = shard_rows
+        self.source = source
+        self.shards = []
+        self.rows = 0
+
+        os.makedirs(path, exist_ok=True)
+        if os.path.exists(os.path.join(path, MANIFEST)):
+            os.remove(os.path.join(path, MANIFEST))  # Invalid until close() writes the new one
+        self._resume = np.empty((shard_rows, dim), dtype=np.float32)
+        self._jd = np.empty((shard_rows, dim), dtype=np.float32)
+        self._ids = np.empty(shard_rows, dtype=np.int64)
+        self._filled = 0
+
+    def add(self, resume_emb, jd_emb, source_id):
+        """Append one pair; `source_id` is its row in the source data."""
+        self._resume[self._filled] = resume_emb
+        self._jd[self._filled] = jd_emb
+        self._ids[self._filled] = source_id
+        self._filled += 1
+        if self._filled == self.shard_rows:
+            self._flush()
+
+    def _flush(self):
+        if not self._filled:
+            return
+        name = f"shard-{len(self.shards):05d}"
+        files = {part: f"{name}.{part}.npy" for part in ("resume", "jd", "ids")}
+        np.save(os.path.join(self.path, files["resume"]), self._resume[:self._filled])
+        np.save(os.path.join(self.path, files["jd"]), self._jd[:self._filled])
+        np.save(os.path.join(self.path, files["ids"]), self._ids[:self._filled])
+        self.shards.append({"rows": self._filled, **files})
+        self.rows += self._filled
+        self._filled = 0
+
+    def close(self):
+        """Write the last shard and the manifest. Returns the manifest."""
+        self._flush()
+        manifest = {
+            "version": FORMAT_VERSION,
+            "rows": self.rows,
+            "dim": self.dim,
+            "dtype": "float32",
+            "source": self.source,
+            "shards": self.shards,
+        }
+        tmp = os.path.join(self.path, MANIFEST + ".tmp")
+        with open(tmp, "w") as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(tmp, os.path.join(self.path, MANIFEST))
+        return manifest
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+
+
+class EmbeddingDataset(Dataset):
+    def __init__(self, path):
+        """
+        Memory-mapped view of a sharded embedding dataset.
+
+        Indexing with an int returns one (resume, jd) pair of 1-D tensors;
+        indexing with an array of row numbers (what ShardedBatchSampler
+        yields) returns a (batch, dim) pair, gathered shard by shard.
+
+        Args:
+            path (str): Dataset directory written by ShardedEmbeddingWriter.
+        """
+        self.path = path
+        self.manifest = read_manifest(path)
+        self.dim = self.manifest["dim"]
+        self.shard_rows = np.array([s["rows"] for s in self.manifest["shards"]], dtype=np.int64)
+        self.offsets = np.concatenate(([0], np.cumsum(self.shard_rows)))
+        self._maps = {}
+
+    def __len__(self):
+        return int(self.offsets[-1])
+
+    def __getstate__(self):
+        # Memory maps are reopened in each worker rather than pickled
+        state = self.__dict__.copy()
+        state["_maps"] = {}
+        return state
+
+    def shard(self, i):
+        """(resume, jd, ids) memory maps of shard `i`, opened on first use in this process."""
+        if i not in self._maps:
+            entry = self.manifest["shards"][i]
+            self._maps[i] = tuple(np.load(os.path.join(self.path, entry[part]), mmap_mode="r")
+                                  for part in ("resume", "jd", "ids"))
+        return self._maps[i]
+
+    def __getitem__(self, index):
+        if np.isscalar(index):
+            shard = int(np.searchsorted(self.offsets, index, side="right") - 1)
+            resume, jd, _ = self.shard(shard)
+            local = index - self.offsets[shard]
+            return torch.from_numpy(np.array(resume[local])), torch.from_numpy(np.array(jd[local]))
+
+        indices = np.asarray(index, dtype=np.int64)
+        shards = np.searchsorted(self.offsets, indices, side="right") - 1
+        resume_out = np.empty((len(indices), self.dim), dtype=np.float32)
+        jd_out = np.empty((len(indices), self.dim), dtype=np.float32)
+        for shard in np.unique(shards):
+            mask = shards == shard
+            resume, jd, _ = self.shard(int(shard))
+            local = indices[mask] - self.offsets[shard]
+            resume_out[mask] = resume[local]
+            jd_out[mask] = jd[local]
+        return torch.from_numpy(resume_out), torch.from_numpy(jd_out)
+
+    def rows(self, start, stop):
+        """Contiguous rows [start, stop) as (resume, jd) tensors (copied into memory)."""
+        return self[np.arange(start, stop)]
+
+    def source_ids(self):
+        """Source row id of every pair, in dataset order."""
+        return np.concatenate([self.shard(i)[2] for i in range(len(self.shard_rows))])
+
+
+class ShardedBatchSampler(Sampler):
+    def __init__(self, dataset, batch_size, shuffle=True, drop_last=False, seed=0, indices=None,
+                 num_replicas=1, rank=0):
+        """
+        Batches of row numbers, each drawn from a single shard.
+
+        Rows are permuted within every shard, cut into batches, and the
+        batches of all shards are shuffled together; each batch is sorted so
+        its memory-map reads are sequential. Call `set_epoch` every epoch.
+
+        For data-parallel training every replica builds the same batch list
+        (same seed and epoch) and takes every `num_replicas`-th batch, so the
+        replicas see disjoint data and run the same number of steps (batches
+        that would leave replicas uneven are dropped for that epoch).
+
+        Args:
+            dataset (EmbeddingDataset): Dataset to sample.
+            batch_size (int): Rows per batch.
+            shuffle (bool): Shuffle rows and batches.
+            drop_last (bool): Drop each shard's final partial batch.
+            seed (int): Base seed; the epoch is mixed in.
+            indices (numpy.ndarray): Restrict sampling to these rows (e.g. a training split).
+            num_replicas (int): Data-parallel processes sharing the dataset.
+            rank (int): This process's index among them.
+        """
+        self.batch_size = batch_size
+        self.num_replicas = num_replicas
+        self.rank = rank
+        self.shuffle = shuffle
+        self.drop_last = drop_last
+        self.seed = seed
+        self.epoch = 0
+        rows = np.arange(len(dataset)) if indices is None else np.sort(np.asarray(indices, dtype=np.int64))
+        shards = np.searchsorted(dataset.offsets, rows, side="right") - 1
+        self.shard_indices = [rows[shards == s] for s in np.unique(shards)]
+
+    def set_epoch(self, epoch):
+        self.epoch = epoch
+
+    def _batches(self):
+        rng = np.random.default_rng((self.seed, self.epoch))
+        batches = []
+        for rows in self.shard_indices:
+            if self.shuffle:
+                rows = rng.permutation(rows)
+            for i in range(0, len(rows), self.batch_size):
+                batch = rows[i:i + self.batch_size]
+                if self.drop_last and len(batch) < self.batch_size:
+                    continue
+                batches.append(np.sort(batch))
+        if self.shuffle:
+            batches = [batches[i] for i in rng.permutation(len(batches))]
+        usable = len(batches) - len(batches) % self.num_replicas
+        return batches[self.rank:usable:self.num_replicas]
+
+    def __iter__(self):
+        return iter(self._batches())
+
+    def __len__(self):
+        full = sum(len(rows) // self.batch_size for rows in self.shard_indices)
+        partial = sum(len(rows) % self.batch_size != 0 for rows in self.shard_indices)
+        return (full if self.drop_last else full + partial) // self.num_replicas
+
+
+def split_indices(size, val_fraction, seed=0):
+    """
+    Deterministic train/validation split of row numbers.
+
+    Args:
+        size (int): Rows in the dataset.
+        val_fraction (float): Share of rows held out (at least one when size > 1).
+        seed (int): Split seed; the same seed and size give the same split.
+
+    Returns:
+        tuple[numpy.ndarray, numpy.ndarray]: Sorted (train, validation) row numbers.
+    """
+    permutation = np.random.default_rng(seed).permutation(size)
+    val_rows = int(round(size * val_fraction))
+    if val_fraction > 0:
+        val_rows = max(val_rows, 1)
+    val_rows = min(val_rows, max(size - 1, 0))  # Always leave something to train on
+    return np.sort(permutation[val_rows:]), np.sort(permutation[:val_rows])
+
+
+def make_loader(dataset, batch_size, shuffle=True, num_workers=DEFAULT_NUM_WORKERS, pin_memory=None,
+                prefetch_factor=DEFAULT_PREFETCH_FACTOR, seed=0, indices=None, drop_last=False,
+                num_replicas=1, rank=0):
+    """
+    DataLoader streaming (resume, jd) batches from a sharded dataset.
+
+    Args:
+        dataset (EmbeddingDataset or str): Dataset or its directory.
+        batch_size (int): Rows per batch.
+        shuffle (bool): Shuffle every epoch (call `loader.sampler.set_epoch(epoch)`).
+        num_workers (int): Worker processes gathering batches ahead of training.
+        pin_memory (bool): Page-lock batches for async host-to-GPU copies; defaults to CUDA availability.
+        prefetch_factor (int): Batches each worker keeps ready.
+        seed (int): Shuffle seed.
+        indices (numpy.ndarray): Only sample these rows.
+        drop_last (bool): Drop partial batches.
+        num_replicas (int): Data-parallel processes; each gets a disjoint share of the batches.
+        rank (int): This process's index among them.
+
+    Returns:
+        torch.utils.data.DataLoader: Yields (resume, jd) float32 tensors of shape (batch, dim).
+    """
+    if isinstance(dataset, str):
+        dataset = EmbeddingDataset(dataset)
+    sampler = ShardedBatchSampler(dataset, batch_size, shuffle=shuffle, drop_last=drop_last, seed=seed,
+                                  indices=indices, num_replicas=num_replicas, rank=rank)
+    worker_options = {}
+    if num_workers > 0:
+        worker_options = {"prefetch_factor": prefetch_factor, "persistent_workers": True}
+    return DataLoader(
+        dataset,
+        sampler=sampler,
+        batch_size=None,  # The sampler already yields whole batches
+        num_workers=num_workers,
+        pin_memory=torch.cuda.is_available() if pin_memory is None else pin_memory,
+        **worker_options,
+    )
+
+
+def convert_tensors(tensor_file, path, shard_rows=SHARD_ROWS):
+    """Rewrite a legacy `dataset_tensors.pt` as a sharded dataset."""
+    data = torch.load(tensor_file, map_location="cpu")
+    resume, jd = data['resume_embeddings'].float().numpy(), data['jd_embeddings'].float().numpy()
+    with ShardedEmbeddingWriter(path, resume.shape[1], shard_rows=shard_rows, source=tensor_file) as writer:
+        for i in range(len(resume)):
+            writer.add(resume[i], jd[i], i)
+    return read_manifest(path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+    convert = commands.add_parser("convert", help="Convert dataset_tensors.pt to a sharded dataset")
+    convert.add_argument("tensor_file")
+    convert.add_argument("path")
+    convert.add_argument("--shard-rows", type=int, default=SHARD_ROWS)
+    info = commands.add_parser("info", help="Print a dataset's manifest summary")
+    info.add_argument("path")
+    args = parser.parse_args()
+
+    if args.command == "convert":
+        manifest = convert_tensors(args.tensor_file, args.path, args.shard_rows)
+        print(f"Wrote {manifest['rows']} pairs in {len(manifest['shards'])} shard(s) to {args.path}")
+    else:
+        manifest = read_manifest(args.path)
+        size_mb = manifest["rows"] * manifest["dim"] * 4 * 2 / 1e6
+        print(f"{args.path}: {manifest['rows']} pairs, dim {manifest['dim']}, {manifest['dtype']}, "
+              f"{len(manifest['shards'])} shard(s), {size_mb:.1f} MB, source {manifest['source']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+Export faster CPU inference variants of the trained adapter (see adapter_variants.py).
+
+Builds the traced and int8 variants of `mlp_model.pth`, checks each against
+fp32 on the validation pairs train.py holds out, benchmarks latency/throughput, and writes
+`mlp_model.variants.json`. It also writes `mlp_model.f32` for the torch-free
+NumPy runtime (adapter_numpy.py), which app.py prefers; without it the app
+serves the fastest torch variant that passed the accuracy guard. Re-run
+after every training run.
+
+Usage:
+    python export_adapter.py [--compile] [--min-cosine 0.999]
+"""
+import argparse
+import os
+
+import numpy as np
+import torch
+
+from adapter_numpy import NumpyAdapter, export_numpy
+from embedding_dataset import MANIFEST, EmbeddingDataset, split_indices
+from adapter_variants import (DEFAULT_MIN_COSINE, adapter_from_state_dict, export_variants, fastest_variant, load_adapter,
+                              manifest_path)
+from train import SPLIT_SEED, VAL_FRACTION
+
+# Configuration
+MODEL_PATH = "mlp_model.pth"
+DATA_DIR = "dataset_embeddings"
+GUARD_ROWS = 256  # Most validation pairs the accuracy guard runs on
+
+
+def validation_set(input_dim, rows=GUARD_ROWS):
+    """
+    Up to `rows` pairs of train.py's validation split (never trained on), or
+    random unit vectors if the dataset is missing or too small to split.
+    """
+    if os.path.exists(os.path.join(DATA_DIR, MANIFEST)):
+        dataset = EmbeddingDataset(DATA_DIR)
+        _, val_rows = split_indices(len(dataset), VAL_FRACTION, seed=SPLIT_SEED)
+        if len(val_rows):
+            return dataset[val_rows[:rows]]
+        print(f"{DATA_DIR} has no validation split; guarding on {rows} random unit vectors instead.")
+    else:
+        print(f"{DATA_DIR} not found; guarding on {rows} random unit vectors instead.")
+    generator = torch.Generator().manual_seed(0)
+    resume = torch.nn.functional.normalize(torch.randn(rows, input_dim, generator=generator), dim=1)
+    jd = torch.nn.functional.normalize(torch.randn(rows, input_dim, generator=generator), dim=1)
+    return resume, jd
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", default=MODEL_PATH)
+    parser.add_argument("--compile", action="store_true", help="Also measure torch.compile (slow to compile)")
+    parser.add_argument("--min-cosine", type=float, default=DEFAULT_MIN_COSINE)
+    parser.add_argument("--iterations", type=int, default=200, help="Timed calls per batch size")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.model):
+        print(f"Error: {args.model} not found. Run train.py first.")
+        return
+
+    input_dim = adapter_from_state_dict(torch.load(args.model, map_location="cpu")).input_dim
+    resume_emb, jd_emb = validation_set(input_dim)
+    variants = ("traced", "int8") + (("compiled",) if args.compile else ())
+
+    print(f"Exporting {', '.join(variants)} from {args.model} (guard: {len(resume_emb)} rows, "
+          f"min cosine {args.min_cosine})...")
+    manifest = export_variants(args.model, resume_emb, jd_emb, variants=variants,
+                               min_cosine=args.min_cosine, iterations=args.iterations)
+
+    print(f"\n{'variant':>9} | {'min cos':>8} | {'mean cos':>8} | {'guard':>5} | {'b1 p50 ms':>9} | "
+          f"{'b1 p99 ms':>9} | {'b32 rows/s':>10}")
+    print("-" * 78)
+    for name, entry in manifest["variants"].items():
+        cos_min = f"{entry['min_cosine']:.5f}" if "min_cosine" in entry else "-"
+        cos_mean = f"{entry['mean_cosine']:.5f}" if "mean_cosine" in entry else "-"
+        print(f"{name:>9} | {cos_min:>8} | {cos_mean:>8} | {'ok' if entry['passed'] else 'FAIL':>5} | "
+              f"{entry['b1_p50_ms']:>9.3f} | {entry['b1_p99_ms']:>9.3f} | {entry['b32_rows_per_s']:>10.0f}")
+
+    print(f"\nWrote {manifest_path(args.model)}; fastest torch variant: '{fastest_variant(manifest)}'.")
+
+    # Torch-free runtime: check it reproduces the fp32 model on the same validation rows
+    numpy_path = export_numpy(args.model)
+    reference = load_adapter(args.model, variant="fp32")
+    runtime = NumpyAdapter.load(numpy_path)
+    for use_skip in (False, True):
+        with torch.no_grad():
+            expected = reference(resume_emb, jd_emb, use_skip_connection=use_skip).numpy()
+        actual = runtime(resume_emb.numpy(), jd_emb.numpy(), use_skip_connection=use_skip)
+        print(f"NumPy runtime ({'skip' if use_skip else 'mlp'} path): max abs error vs fp32 "
+              f"{np.abs(actual - expected).max():.2e}")
+    print(f"Wrote {numpy_path}; the app serves it without importing torch.")
+
+
+if __name__ == "__main__":
+    main()
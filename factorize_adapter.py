@@ -0,0 +1,168 @@
+"""
+Build low-rank adapters from a trained checkpoint by truncated SVD.
+
+Each Linear of the MLP path (2048x2048, 2048x2048 and 2048x1024 for
+mxbai-embed-large) is replaced by a rank-r factorization (see
+LowRankResumeMLPAdapter). For every rank in `--ranks` this reports:
+  - weight reconstruction error (relative Frobenius, worst layer)
+  - output cosine to the dense adapter on the validation pairs (mean / min)
+  - MLP parameters, artifact size, and batch-1 latency (torch and NumPy)
+
+With `--rank`, the chosen factorization is optionally fine-tuned to match
+the dense adapter's outputs on the training embeddings (distillation), then
+saved and exported for the NumPy runtime. The result loads through the same
+`load_numpy_adapter` / `load_adapter` calls the app uses; serve it with
+`ADAPTER_MODEL_PATH=mlp_model_r128.pth streamlit run app.py`.
+
+Usage:
+    python factorize_adapter.py [--ranks 32 64 128 256 512]
+    python factorize_adapter.py --rank 128 --fine-tune-epochs 20
+"""
+import argparse
+import os
+
+import torch
+import torch.nn as nn
+
+from adapter_model import LowRankResumeMLPAdapter
+from adapter_numpy import NumpyAdapter, export_numpy
+from adapter_variants import adapter_from_state_dict, benchmark
+from embedding_dataset import MANIFEST, EmbeddingDataset, split_indices
+from export_adapter import DATA_DIR, validation_set
+from train import SPLIT_SEED, VAL_FRACTION
+
+# Configuration
+MODEL_PATH = "mlp_model.pth"
+RANKS = (32, 64, 128, 256, 512)
+FINE_TUNE_BATCH_SIZE = 16
+FINE_TUNE_LEARNING_RATE = 1e-4
+
+
+def mlp_parameters(model):
+    return sum(p.numel() for p in model.network.parameters())
+
+
+def weight_error(dense, low_rank):
+    """Worst relative Frobenius error ||W - up @ down|| / ||W|| over the MLP layers."""
+    errors = []
+    with torch.no_grad():
+        for layer, factorized in zip(dense.network, low_rank.network):
+            if isinstance(layer, nn.Linear):
+                approx = factorized.up.weight @ factorized.down.weight
+                errors.append(float(torch.linalg.norm(layer.weight - approx) / torch.linalg.norm(layer.weight)))
+    return max(errors)
+
+
+def output_cosine(dense, model, resume_emb, jd_emb):
+    with torch.no_grad():
+        expected = dense(resume_emb, jd_emb, use_skip_connection=False)
+        actual = model(resume_emb, jd_emb, use_skip_connection=False)
+    cosines = nn.functional.cosine_similarity(actual, expected, dim=1)
+    return float(cosines.mean()), float(cosines.min())
+
+
+def latency(model, iterations):
+    """Batch-1 p50 latency in ms for the torch module and for the NumPy runtime on its weights."""
+    def torch_forward(r, j):
+        return model(r, j, use_skip_connection=False)
+
+    numpy_model = NumpyAdapter({k: v.detach().numpy() for k, v in model.state_dict().items()})
+
+    def numpy_forward(r, j):
+        return numpy_model(r.numpy(), j.numpy(), use_skip_connection=False)
+
+    return (benchmark(torch_forward, model.input_dim, batch_sizes=(1,), iterations=iterations)["b1_p50_ms"],
+            benchmark(numpy_forward, model.input_dim, batch_sizes=(1,), iterations=iterations)["b1_p50_ms"])
+
+
+def report_row(label, dense, model, resume_emb, jd_emb, iterations):
+    size_mb = sum(t.numel() for t in model.state_dict().values()) * 4 / 1e6
+    error = weight_error(dense, model) if isinstance(model, LowRankResumeMLPAdapter) else 0.0
+    cos_mean, cos_min = output_cosine(dense, model, resume_emb, jd_emb)
+    torch_ms, numpy_ms = latency(model, iterations)
+    print(f"{label:>9} | {error:>9.4f} | {cos_mean:>8.5f} | {cos_min:>8.5f} | {mlp_parameters(model) / 1e6:>9.2f}M | "
+          f"{size_mb:>7.1f} | {torch_ms:>8.3f} | {numpy_ms:>8.3f}")
+
+
+def training_rows():
+    """Training embeddings (train.py's split, validation pairs excluded), or None without a dataset."""
+    if not os.path.exists(os.path.join(DATA_DIR, MANIFEST)):
+        return None
+    dataset = EmbeddingDataset(DATA_DIR)
+    train_rows, _ = split_indices(len(dataset), VAL_FRACTION, seed=SPLIT_SEED)
+    return dataset[train_rows]
+
+
+def fine_tune(dense, model, resume_emb, jd_emb, epochs):
+    """Distill: train the factorized MLP path to reproduce the dense adapter's outputs (1 - cosine)."""
+    with torch.no_grad():
+        teacher = dense(resume_emb, jd_emb, use_skip_connection=False)
+    optimizer = torch.optim.Adam(model.network.parameters(), lr=FINE_TUNE_LEARNING_RATE)
+    model.train()
+    for epoch in range(epochs):
+        permutation = torch.randperm(len(resume_emb))
+        epoch_loss = 0.0
+        num_batches = 0
+        for i in range(0, len(permutation), FINE_TUNE_BATCH_SIZE):
+            indices = permutation[i:i + FINE_TUNE_BATCH_SIZE]
+            output = model(resume_emb[indices], jd_emb[indices], use_skip_connection=False)
+            loss = (1 - nn.functional.cosine_similarity(output, teacher[indices], dim=1)).mean()
+            optimizer.zero_grad()
+            loss.backward()
+            optimizer.step()
+            epoch_loss += loss.item()
+            num_batches += 1
+        if (epoch + 1) % 5 == 0 or epoch + 1 == epochs:
+            print(f"  Fine-tune epoch [{epoch + 1}/{epochs}], distillation loss: {epoch_loss / num_batches:.6f}")
+    return model.eval()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", default=MODEL_PATH)
+    parser.add_argument("--ranks", type=int, nargs="+", default=list(RANKS), help="Ranks to report")
+    parser.add_argument("--rank", type=int, help="Build, fine-tune and save the adapter at this rank")
+    parser.add_argument("--fine-tune-epochs", type=int, default=0)
+    parser.add_argument("--output", help="Checkpoint to write (default: mlp_model_r<rank>.pth)")
+    parser.add_argument("--iterations", type=int, default=200, help="Timed calls per latency figure")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.model):
+        print(f"Error: {args.model} not found. Run train.py first.")
+        return
+    dense = adapter_from_state_dict(torch.load(args.model, map_location="cpu"))
+    if isinstance(dense, LowRankResumeMLPAdapter):
+        print(f"Error: {args.model} is already low-rank (rank {dense.rank}); factorize the dense checkpoint.")
+        return
+    resume_emb, jd_emb = validation_set(dense.input_dim)
+
+    print(f"\n{'rank':>9} | {'W error':>9} | {'mean cos':>8} | {'min cos':>8} | {'MLP params':>10} | "
+          f"{'MB':>7} | {'torch ms':>8} | {'numpy ms':>8}")
+    print("-" * 88)
+    report_row("dense", dense, dense, resume_emb, jd_emb, args.iterations)
+    ranks = sorted(set(args.ranks) | ({args.rank} if args.rank else set()))
+    for rank in ranks:
+        low_rank = LowRankResumeMLPAdapter.from_dense(dense, rank)
+        report_row(str(rank), dense, low_rank, resume_emb, jd_emb, args.iterations)
+
+    if not args.rank:
+        return
+    model = LowRankResumeMLPAdapter.from_dense(dense, args.rank)
+    if args.fine_tune_epochs:
+        rows = training_rows()
+        if rows is None:
+            print(f"\n{DATA_DIR} not found; skipping fine-tuning.")
+        else:
+            print(f"\nFine-tuning rank {args.rank} on {len(rows[0])} rows...")
+            fine_tune(dense, model, *rows, epochs=args.fine_tune_epochs)
+            cos_mean, cos_min = output_cosine(dense, model, resume_emb, jd_emb)
+            print(f"  Held-out cosine to dense after fine-tuning: mean {cos_mean:.5f}, min {cos_min:.5f}")
+
+    output = args.output or f"{os.path.splitext(args.model)[0]}_r{args.rank}.pth"
+    torch.save(model.state_dict(), output)
+    numpy_path = export_numpy(output)
+    print(f"\nSaved {output} and {numpy_path}. Serve with ADAPTER_MODEL_PATH={output}.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,370 @@
+"""
+Local stand-in for the Ollama HTTP API, for offline benchmarking and CI.
+
+Implements /api/embed, /api/embeddings, /api/generate (blocking and NDJSON
+streaming, with `context`), /api/ps and /api/tags. Embeddings are derived
+from a hash of (model, text), so they are deterministic across runs and
+machines; generation returns canned consultant text. Latency, model load
+delays and error rates are configurable so the client, cache and residency
+layers can be measured without a GPU.
+
+Usage:
+    python fake_ollama.py --port 11434 --latency-ms 20 --load-ms 1500
+
+    with FakeOllamaServer(latency_ms=5) as server:
+        client = LLMModel("mxbai-embed-large", base_url=server.url)
+"""
+import argparse
+import hashlib
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+CANNED_RESPONSE = """## Career Transition Analysis
+Name: Candidate
+Target: Target Role
+
+## 1. Skill Translation
+| Skill | Application to Target Job |
+|:---|:---|
+| Python | Automate reporting and repetitive workflows |
+| SQL | Manage operational data |
+
+## 4. Keywords for ATS
+- leadership
+- automation
+- stakeholder management
+
+## 5. Summary
+The candidate brings transferable analytical skills to the new role."""
+
+# Resident size reported by /api/ps (bytes)
+MODEL_SIZES = {
+    "mxbai-embed-large:latest": 1200 * 1024 * 1024,
+    "gemma:2b": 3000 * 1024 * 1024,
+}
+DEFAULT_SIZE = 2048 * 1024 * 1024
+
+
+def _canonical(name):
+    return name if ":" in name else f"{name}:latest"
+
+
+def fake_embedding(model, text, dim=1024, normalize=True):
+    """Deterministic pseudo-random embedding for (model, text)."""
+    seed = int.from_bytes(hashlib.sha256(f"{model}\0{text}".encode("utf-8")).digest()[:8], "little")
+    vec = np.random.default_rng(seed).standard_normal(dim).astype(np.float32)
+    if normalize:
+        vec /= np.linalg.norm(vec)
+    return vec
+
+
+def _token_ids(text):
+    """Stable fake token ids (one per ~4 characters) for `context` arrays."""
+    return [int.from_bytes(hashlib.md5(text[i:i + 4].encode("utf-8")).digest()[:2], "little")
+            for i in range(0, len(text), 4)]
+
+
+class FakeOllamaConfig:
+    def __init__(self, dim=1024, latency_ms=0.0, per_input_ms=0.0, load_ms=0.0,
+                 prefill_ms_per_token=0.0, token_ms=0.0, error_rate=0.0, stall_rate=0.0,
+                 stall_ms=0.0, seed=0):
+        """
+        Behaviour knobs for the fake server.
+
+        Args:
+            dim (int): Embedding dimension.
+            latency_ms (float): Fixed overhead added to every request.
+            per_input_ms (float): Extra time per embedded input.
+            load_ms (float): Delay when a request hits a model that is not loaded.
+            prefill_ms_per_token (float): Prompt-eval time per new prompt token.
+            token_ms (float): Time per generated token.
+            error_rate (float): Probability in [0, 1] of answering with HTTP 500.
+            stall_rate (float): Probability in [0, 1] of a request stalling.
+            stall_ms (float): Extra delay of a stalled request (a slow tail).
+            seed (int): Seed for the error and stall injection RNG.
+        """
+        self.dim = dim
+        self.latency_ms = latency_ms
+        self.per_input_ms = per_input_ms
+        self.load_ms = load_ms
+        self.prefill_ms_per_token = prefill_ms_per_token
+        self.token_ms = token_ms
+        self.error_rate = error_rate
+        self.stall_rate = stall_rate
+        self.stall_ms = stall_ms
+        self.rng = random.Random(seed)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # Keep-alive, like the real server
+    # Headers and body go out in separate writes; without TCP_NODELAY a
+    # reused connection stalls ~40 ms on delayed ACKs (Go servers set it too)
+    disable_nagle_algorithm = True
+
+    def log_message(self, *args):
+        pass
+
+    # -------------------------------------------------
+    # Plumbing
+    # -------------------------------------------------
+    @property
+    def config(self):
+        return self.server.config
+
+    def _send_json(self, obj, status=200):
+        body = json.dumps(obj).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_chunk(self, obj):
+        data = (json.dumps(obj) + "\n").encode("utf-8")
+        self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+        self.wfile.flush()
+
+    def _sleep_ms(self, ms):
+        if ms > 0:
+            time.sleep(ms / 1000.0)
+
+    def _ensure_loaded(self, model, keep_alive):
+        """Simulate model residency; returns the load duration in seconds."""
+        model = _canonical(model)
+        with self.server.lock:
+            loaded = model in self.server.loaded
+            if keep_alive == 0:
+                self.server.loaded.pop(model, None)
+            else:
+                self.server.loaded[model] = time.time()
+            if not loaded:
+                self.server.stats["loads"] += 1
+        if loaded:
+            return 0.001
+        self._sleep_ms(self.config.load_ms)
+        return self.config.load_ms / 1000.0
+
+    # -------------------------------------------------
+    # Routes
+    # -------------------------------------------------
+    def do_GET(self):
+        if self.path == "/api/ps":
+            with self.server.lock:
+                models = [{"name": m, "model": m, "size": MODEL_SIZES.get(m, DEFAULT_SIZE),
+                           "size_vram": MODEL_SIZES.get(m, DEFAULT_SIZE)}
+                          for m in self.server.loaded]
+            self._send_json({"models": models})
+        elif self.path == "/api/tags":
+            self._send_json({"models": [{"name": m} for m in MODEL_SIZES]})
+        else:
+            self._send_json({"error": "not found"}, status=404)
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        try:
+            body = json.loads(self.rfile.read(length) or b"{}")
+        except json.JSONDecodeError:
+            self._send_json({"error": "invalid JSON"}, status=400)
+            return
+
+        with self.server.lock:
+            self.server.stats["requests"] += 1
+            self.server.stats["by_path"][self.path] = self.server.stats["by_path"].get(self.path, 0) + 1
+            fail = self.config.rng.random() < self.config.error_rate
+            stall = self.config.rng.random() < self.config.stall_rate
+            self.server.stats["stalls"] += int(stall)
+
+        self._sleep_ms(self.config.latency_ms + (self.config.stall_ms if stall else 0.0))
+        if fail:
+            with self.server.lock:
+                self.server.stats["errors"] += 1
+            self._send_json({"error": "injected failure"}, status=500)
+            return
+
+        routes = {
+            "/api/embed": self._embed,
+            "/api/embeddings": self._embeddings,
+            "/api/generate": self._generate,
+        }
+        handler = routes.get(self.path)
+        if handler is None:
+            self._send_json({"error": "not found"}, status=404)
+            return
+        handler(body)
+
+    def _embed(self, body):
+        model = body.get("model", "")
+        inputs = body.get("input", "")
+        if isinstance(inputs, str):
+            inputs = [inputs]
+        load_s = self._ensure_loaded(model, body.get("keep_alive"))
+        if not inputs or inputs == [""]:
+            # Unload/warm-up call
+            self._send_json({"model": model, "embeddings": [], "load_duration": int(load_s * 1e9)})
+            return
+        self._sleep_ms(self.config.per_input_ms * len(inputs))
+        with self.server.lock:
+            self.server.stats["embedded_inputs"] += len(inputs)
+        embeddings = [fake_embedding(model, t, self.config.dim).tolist() for t in inputs]
+        self._send_json({
+            "model": model,
+            "embeddings": embeddings,
+            "load_duration": int(load_s * 1e9),
+            "prompt_eval_count": sum(len(_token_ids(t)) for t in inputs),
+        })
+
+    def _embeddings(self, body):
+        model = body.get("model", "")
+        self._ensure_loaded(model, body.get("keep_alive"))
+        self._sleep_ms(self.config.per_input_ms)
+        with self.server.lock:
+            self.server.stats["embedded_inputs"] += 1
+        # The legacy endpoint returns unnormalized vectors, like the real one
+        vec = fake_embedding(model, body.get("prompt", ""), self.config.dim, normalize=False)
+        self._send_json({"embedding": vec.tolist()})
+
+    def _generate(self, body):
+        model = body.get("model", "")
+        prompt = body.get("prompt", "")
+        if "prompt" not in body:
+            # Load/unload request without a prompt
+            load_s = self._ensure_loaded(model, body.get("keep_alive"))
+            self._send_json({"model": model, "response": "", "done": True,
+                             "load_duration": int(load_s * 1e9)})
+            return
+
+        start = time.perf_counter()
+        load_s = self._ensure_loaded(model, body.get("keep_alive"))
+
+        # Context tokens are already in the KV cache: only the new prompt is prefilled
+        context = list(body.get("context") or [])
+        prompt_tokens = _token_ids((body.get("system") or "") * (not context) + prompt)
+        prefill_s = len(prompt_tokens) * self.config.prefill_ms_per_token / 1000.0
+        time.sleep(prefill_s)
+
+        num_predict = (body.get("options") or {}).get("num_predict")
+        words = CANNED_RESPONSE.split(" ")
+        if num_predict is not None and num_predict >= 0:
+            words = words[:num_predict]
+        tokens = [w if i == 0 else " " + w for i, w in enumerate(words)]
+
+        def final(eval_s):
+            return {
+                "model": model,
+                "done": True,
+                "context": context + prompt_tokens + _token_ids("".join(tokens)),
+                "total_duration": int((time.perf_counter() - start) * 1e9),
+                "load_duration": int(load_s * 1e9),
+                "prompt_eval_count": len(prompt_tokens),
+                "prompt_eval_duration": int(prefill_s * 1e9),
+                "eval_count": len(tokens),
+                "eval_duration": int(eval_s * 1e9),
+            }
+
+        if body.get("stream", True):
+            self.send_response(200)
+            self.send_header("Content-Type", "application/x-ndjson")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            eval_start = time.perf_counter()
+            for token in tokens:
+                self._sleep_ms(self.config.token_ms)
+                self._send_chunk({"model": model, "response": token, "done": False})
+            last = final(time.perf_counter() - eval_start)
+            last["response"] = ""
+            self._send_chunk(last)
+            self.wfile.write(b"0\r\n\r\n")
+            self.wfile.flush()
+        else:
+            self._sleep_ms(self.config.token_ms * len(tokens))
+            last = final(self.config.token_ms * len(tokens) / 1000.0)
+            last["response"] = "".join(tokens)
+            self._send_json(last)
+
+
+class FakeOllamaServer:
+    def __init__(self, host="127.0.0.1", port=0, **config):
+        """
+        Fake Ollama server running on a background thread.
+
+        Args:
+            host (str): Interface to bind.
+            port (int): Port to bind (0 picks a free port).
+            **config: Keyword arguments for FakeOllamaConfig.
+        """
+        self.httpd = ThreadingHTTPServer((host, port), _Handler)
+        self.httpd.daemon_threads = True
+        self.httpd.config = FakeOllamaConfig(**config)
+        self.httpd.lock = threading.Lock()
+        self.httpd.loaded = {}
+        self.httpd.stats = {"requests": 0, "errors": 0, "stalls": 0, "loads": 0, "embedded_inputs": 0,
+                             "by_path": {}}
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def config(self):
+        return self.httpd.config
+
+    @property
+    def stats(self):
+        return self.httpd.stats
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a deterministic fake Ollama server.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11434)
+    parser.add_argument("--dim", type=int, default=1024, help="Embedding dimension")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Fixed overhead per request")
+    parser.add_argument("--per-input-ms", type=float, default=0.0, help="Extra time per embedded input")
+    parser.add_argument("--load-ms", type=float, default=0.0, help="Model load delay on a cold request")
+    parser.add_argument("--prefill-ms-per-token", type=float, default=0.0)
+    parser.add_argument("--token-ms", type=float, default=0.0, help="Time per generated token")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with HTTP 500")
+    parser.add_argument("--stall-rate", type=float, default=0.0, help="Fraction of requests that stall")
+    parser.add_argument("--stall-ms", type=float, default=0.0, help="Extra delay of a stalled request")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    server = FakeOllamaServer(
+        host=args.host, port=args.port, dim=args.dim, latency_ms=args.latency_ms,
+        per_input_ms=args.per_input_ms, load_ms=args.load_ms,
+        prefill_ms_per_token=args.prefill_ms_per_token, token_ms=args.token_ms,
+        error_rate=args.error_rate, stall_rate=args.stall_rate, stall_ms=args.stall_ms, seed=args.seed,
+    )
+    print(f"Fake Ollama listening on {server.url} (Ctrl+C to stop)")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.httpd.server_close()
+
+
+if __name__ == "__main__":
+    main()
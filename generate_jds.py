@@ -1,50 +1,69 @@
 
 import csv
-import requests
 import json
 import time
 from tqdm import tqdm
 import os
 import random
+from ollama_module import AsyncLLMModel
+from ollama_transport import DEFAULT_OLLAMA_URL
 
 # Configuration
 INPUT_FILE = "preprocessed_dataset.csv"  # Only reading extracted resumes
 OUTPUT_FILE = "synthetic_training_dataset.csv"
 MODEL_NAME = "gemma:2b"
-OLLAMA_URL = "http://localhost:11434/api/generate"
+OLLAMA_BASE_URL = DEFAULT_OLLAMA_URL  # OLLAMA_HOST if set, else localhost:11434
 MAX_SAMPLES = 50  # Start with a small batch
+MAX_CONCURRENCY = 4  # In-flight requests; match OLLAMA_NUM_PARALLEL on the server
+WRITE_EVERY = 16  # Append results to the CSV after this many resumes
+REQUEST_TIMEOUT = 600
+
+SYSTEM_PROMPT = (
+    "You are an expert HR Recruiter. "
+    "Read the following resume snippet and generate a realistic Job Description (JD) "
+    "that this candidate would be perfectly qualified for. "
+    "The JD should include: Job Title, Responsibilities, and Required Skills. "
+    "Keep it concise but detailed enough for semantic matching."
+)
+GENERATION_OPTIONS = {
+    "temperature": 0.7
+}
+
+client = AsyncLLMModel(model_name=MODEL_NAME, base_url=OLLAMA_BASE_URL,
+                       max_concurrency=MAX_CONCURRENCY, request_timeout=REQUEST_TIMEOUT)
+
+def build_prompt(resume_text):
+    return f"Resume Content:\n{resume_text[:2000]}\n\nGenerate a matching Job Description:"
 
 def generate_jd(resume_text):
     """
-    Uses Llama3 to hallucinate a matching Job Description for a given resume.
+    Uses Gemma to hallucinate a matching Job Description for a given resume.
+    """
+    return generate_jds([resume_text])[0]
+
+def generate_jds(resume_texts):
+    """
+    Generates matching Job Descriptions for many resumes concurrently.
+    Returns one JD (or None on failure) per resume, in input order.
     """
-    system_prompt = (
-        "You are an expert HR Recruiter. "
-        "Read the following resume snippet and generate a realistic Job Description (JD) "
-        "that this candidate would be perfectly qualified for. "
-        "The JD should include: Job Title, Responsibilities, and Required Skills. "
-        "Keep it concise but detailed enough for semantic matching."
+    return client.generate_many_sync(
+        [build_prompt(text) for text in resume_texts],
+        system=SYSTEM_PROMPT,
+        options=GENERATION_OPTIONS,
     )
-    
-    prompt = f"Resume Content:\n{resume_text[:2000]}\n\nGenerate a matching Job Description:"
-
-    payload = {
-        "model": MODEL_NAME,
-        "prompt": prompt,
-        "system": system_prompt,
-        "stream": False,
-        "options": {
-            "temperature": 0.7 
-        }
-    }
 
+def flatten_resume(resume_json_str):
+    """Flatten the resume JSON into plain text for the LLM ("" if unusable)."""
+    if not resume_json_str or len(resume_json_str) < 10:
+        return ""
     try:
-        response = requests.post(OLLAMA_URL, json=payload, timeout=600)
-        response.raise_for_status()
-        return response.json().get("response", "").strip()
-    except Exception as e:
-        print(f"Error generating JD: {e}")
-        return None
+        resume_data = json.loads(resume_json_str)
+        education = " ".join(resume_data.get("Education", [])) if isinstance(resume_data.get("Education"), list) else ""
+        experience = " ".join(resume_data.get("Experience", [])) if isinstance(resume_data.get("Experience"), list) else ""
+        skills = " ".join(resume_data.get("Skills", [])) if isinstance(resume_data.get("Skills"), list) else ""
+    except Exception:
+        return ""
+    return f"Education: {education}\nExperience: {experience}\nSkills: {skills}"
 
 def main():
     if not os.path.exists(INPUT_FILE):
@@ -72,32 +91,6 @@ def main():
     print(f"Generating JDs for {len(rows)} resumes using {MODEL_NAME}...")
     print("This requires a running GPU and may take time.")
 
-    # List to store results
-    synthetic_data = []
-
-    for index, row in tqdm(enumerate(rows), total=len(rows)):
-        resume_json_str = row.get('resume_json', '')
-        if not resume_json_str or len(resume_json_str) < 10:
-            continue
-        
-        resume_text = ""
-        try:
-            resume_data = json.loads(resume_json_str)
-            # Flatten the resume content for the LLM
-            education = " ".join(resume_data.get("Education", [])) if isinstance(resume_data.get("Education"), list) else ""
-            experience = " ".join(resume_data.get("Experience", [])) if isinstance(resume_data.get("Experience"), list) else ""
-            skills = " ".join(resume_data.get("Skills", [])) if isinstance(resume_data.get("Skills"), list) else ""
-            
-            resume_text = f"Education: {education}\nExperience: {experience}\nSkills: {skills}"
-        except Exception as e:
-            # print(f"Error parsing JSON for row {index}: {e}")
-            continue
-
-        if len(resume_text) < 50:
-            continue
-            
-        jd = generate_jd(resume_text)
-        
     # Initialize file with header if not exists
     file_exists = os.path.isfile(OUTPUT_FILE)
     if not file_exists:
@@ -105,38 +98,29 @@ def main():
             writer = csv.DictWriter(f, fieldnames=["Resume", "Job_Description", "Category"])
             writer.writeheader()
 
-    for index, row in tqdm(enumerate(rows), total=len(rows)):
-        resume_json_str = row.get('resume_json', '')
-        if not resume_json_str or len(resume_json_str) < 10:
-            continue
-        
-        resume_text = ""
-        try:
-            resume_data = json.loads(resume_json_str)
-            # Flatten the resume content for the LLM
-            education = " ".join(resume_data.get("Education", [])) if isinstance(resume_data.get("Education"), list) else ""
-            experience = " ".join(resume_data.get("Experience", [])) if isinstance(resume_data.get("Experience"), list) else ""
-            skills = " ".join(resume_data.get("Skills", [])) if isinstance(resume_data.get("Skills"), list) else ""
-            
-            resume_text = f"Education: {education}\nExperience: {experience}\nSkills: {skills}"
-        except Exception as e:
-            continue
-
+    candidates = []
+    for row in rows:
+        resume_text = flatten_resume(row.get('resume_json', ''))
         if len(resume_text) < 50:
             continue
-            
-        jd = generate_jd(resume_text)
-        
-        if jd:
-            new_row = {
-                "Resume": resume_text,
-                "Job_Description": jd,
-                "Category": row.get('Category', 'Unknown')
-            }
-            # Append immediately
+        candidates.append((resume_text, row.get('Category', 'Unknown')))
+
+    with tqdm(total=len(candidates)) as progress:
+        for start in range(0, len(candidates), WRITE_EVERY):
+            block = candidates[start:start + WRITE_EVERY]
+            jds = generate_jds([resume_text for resume_text, _ in block])
+
+            # Append each block immediately so a crash keeps finished work
             with open(OUTPUT_FILE, 'a', newline='', encoding='utf-8') as f:
                 writer = csv.DictWriter(f, fieldnames=["Resume", "Job_Description", "Category"])
-                writer.writerow(new_row)
+                for (resume_text, category), jd in zip(block, jds):
+                    if jd:
+                        writer.writerow({
+                            "Resume": resume_text,
+                            "Job_Description": jd,
+                            "Category": category
+                        })
+            progress.update(len(block))
             
     print(f"Done! Saved content to {OUTPUT_FILE}")
 
@@ -2,20 +2,287 @@
 Minimal Ollama client for generating job-specific resumes without importing the
 full zlm package or langchain dependencies.
 """
+import contextlib
+import contextvars
 import json
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+
 import requests
 
+from ollama_transport import (DEFAULT_OLLAMA_URL, NO_RETRY, CircuitOpenError, Deadline, DeadlineExceeded,
+                              counts_as_failure, get_transport)
+
+# VRAM the scheduler may fill with resident models (GTX 1060 6GB minus headroom)
+DEFAULT_VRAM_BUDGET_MB = int(os.environ.get("OLLAMA_VRAM_BUDGET_MB", "5120"))
+DEFAULT_KEEP_ALIVE = 1800  # Seconds a model stays loaded after its last request
+# Rough resident sizes until /api/ps reports the real ones
+MODEL_SIZE_ESTIMATES_MB = {
+    "mxbai-embed-large:latest": 1200,
+    "gemma:2b": 3000,
+    "llama3:latest": 5600,
+}
+DEFAULT_MODEL_SIZE_MB = 4096
+
+
+def _require_numpy():
+    try:
+        import numpy as np
+    except ImportError:
+        raise ImportError("numpy is required. Please install it with `pip install numpy`.")
+    return np
+
+
+def _stack_vectors(rows):
+    """Stack per-text vectors (or None) into a float32 matrix plus a mask.
+
+    Rows that are None, or whose dimension disagrees with the first valid row,
+    are left as zeros and flagged False in the mask.
+    """
+    np = _require_numpy()
+
+    dim = next((len(v) for v in rows if v is not None), 0)
+    matrix = np.zeros((len(rows), dim), dtype=np.float32)
+    ok = np.zeros(len(rows), dtype=bool)
+    for i, vec in enumerate(rows):
+        if vec is not None and len(vec) == dim:
+            matrix[i] = vec
+            ok[i] = True
+    return matrix, ok
+
+
+def _generation_stats(final_chunk, ttft_s, wall_s):
+    """Summarize Ollama's timing fields (nanoseconds) for one generation.
+
+    Args:
+        final_chunk (dict): The response body, or the last (`done`) stream chunk.
+        ttft_s (float | None): Client-side time to first token, if streamed.
+        wall_s (float): Client-side wall time for the whole request.
+
+    Returns:
+        dict: Durations in seconds, token counts and decode tokens/s.
+    """
+    def seconds(field):
+        return (final_chunk.get(field) or 0) / 1e9
+
+    eval_count = final_chunk.get("eval_count") or 0
+    eval_s = seconds("eval_duration")
+    prompt_eval_count = final_chunk.get("prompt_eval_count") or 0
+    prompt_eval_s = seconds("prompt_eval_duration")
+    return {
+        "ttft_s": ttft_s,
+        "wall_s": wall_s,
+        "total_s": seconds("total_duration"),
+        "load_s": seconds("load_duration"),
+        "prompt_eval_count": prompt_eval_count,
+        "prompt_eval_s": prompt_eval_s,
+        "prompt_tokens_per_s": prompt_eval_count / prompt_eval_s if prompt_eval_s else 0.0,
+        "eval_count": eval_count,
+        "eval_s": eval_s,
+        "tokens_per_s": eval_count / eval_s if eval_s else 0.0,
+    }
+
+
+def _canonical_model(name):
+    """Ollama reports untagged models as `name:latest`."""
+    return name if ":" in name else f"{name}:latest"
+
+
+class ModelResidencyManager:
+    def __init__(self, base_url=DEFAULT_OLLAMA_URL, budget_mb=DEFAULT_VRAM_BUDGET_MB,
+                 keep_alive=DEFAULT_KEEP_ALIVE, size_estimates_mb=None):
+        """Decide which Ollama models stay loaded within a VRAM/RAM budget.
+
+        Models are kept resident (via `keep_alive`) across bursts of calls and
+        only the least recently used ones are unloaded when a model that is
+        about to run would not otherwise fit.
+
+        Args:
+            base_url (str): Base URL for the local Ollama server.
+            budget_mb (int): Memory the resident models may occupy together.
+            keep_alive (int): Seconds a model stays loaded after its last use.
+            size_estimates_mb (dict): Resident size per model until /api/ps
+                reports the measured size.
+        """
+        self.base_url = base_url.rstrip("/")
+        self.transport = get_transport(self.base_url)
+        self.budget_mb = budget_mb
+        self.keep_alive = keep_alive
+        self._sizes = {
+            _canonical_model(k): v
+            for k, v in (size_estimates_mb or MODEL_SIZE_ESTIMATES_MB).items()
+        }
+
+        self._lock = threading.Lock()
+        self._hot = OrderedDict()  # model -> expiry (monotonic), least recent first
+        self._synced = False
+
+        self.loads = {}  # model -> {"count", "total_s", "last_s"}
+        self.evictions = 0
+        self.decisions = deque(maxlen=200)
+
+    def _size(self, model):
+        return self._sizes.get(model, DEFAULT_MODEL_SIZE_MB)
+
+    def _expire_locked(self):
+        now = time.monotonic()
+        for model in [m for m, expiry in self._hot.items() if expiry <= now]:
+            del self._hot[model]
+
+    def _sync_locked(self):
+        """Refresh the hot set and measured sizes from /api/ps."""
+        # Mark synced even on failure so an old server without /api/ps
+        # is not polled before every request
+        self._synced = True
+        try:
+            resp = self.transport.get("/api/ps", retry=NO_RETRY)
+            resp.raise_for_status()
+            running = resp.json().get("models", [])
+        except Exception:
+            return
+        expiry = time.monotonic() + self.keep_alive
+        seen = set()
+        for info in running:
+            model = _canonical_model(info.get("name") or info.get("model", ""))
+            size = info.get("size_vram") or info.get("size")
+            if size:
+                self._sizes[model] = size / (1024 * 1024)
+            seen.add(model)
+            if model not in self._hot:
+                self._hot[model] = expiry
+        for model in [m for m in self._hot if m not in seen]:
+            del self._hot[model]
+
+    def refresh(self):
+        """Re-read which models the server currently has loaded."""
+        with self._lock:
+            self._sync_locked()
+
+    def acquire(self, model_name):
+        """Make room for `model_name` and return the keep_alive to request it with.
+
+        Evicts least recently used resident models only when the budget
+        would otherwise be exceeded.
+        """
+        model = _canonical_model(model_name)
+        with self._lock:
+            if not self._synced:
+                self._sync_locked()
+            self._expire_locked()
+
+            if model in self._hot:
+                self._hot.move_to_end(model)
+                self._hot[model] = time.monotonic() + self.keep_alive
+                return self.keep_alive
+
+            needed = self._size(model)
+            victims = []
+            while self._hot and sum(self._size(m) for m in self._hot) + needed > self.budget_mb:
+                victim, _ = self._hot.popitem(last=False)
+                victims.append(victim)
+            self._hot[model] = time.monotonic() + self.keep_alive
+
+            self.evictions += len(victims)
+            self.decisions.append({
+                "time": time.time(),
+                "load": model,
+                "evict": victims,
+                "resident_mb": round(sum(self._size(m) for m in self._hot)),
+                "budget_mb": self.budget_mb,
+            })
+
+        for victim in victims:
+            self._unload(victim)
+        return self.keep_alive
+
+    def record_response(self, model_name, data):
+        """Track the `load_duration` Ollama reports for a request."""
+        load_s = (data.get("load_duration") or 0) / 1e9
+        if load_s <= 0:
+            return
+        model = _canonical_model(model_name)
+        with self._lock:
+            stats = self.loads.setdefault(model, {"count": 0, "total_s": 0.0, "last_s": 0.0})
+            # Warm requests still report a few ms of "load"; only count real loads
+            if load_s > 0.1:
+                stats["count"] += 1
+                stats["total_s"] += load_s
+                # Next acquire re-reads /api/ps to learn the measured size
+                self._synced = False
+            stats["last_s"] = load_s
+
+    def release(self, model_name):
+        """Unload a model now and forget it is resident."""
+        model = _canonical_model(model_name)
+        with self._lock:
+            self._hot.pop(model, None)
+        self._unload(model)
+
+    def _unload(self, model):
+        payload = {"model": model, "keep_alive": 0}
+        try:
+            resp = self.transport.post("/api/generate", payload, timeout=5, retry=NO_RETRY)
+            if resp.status_code == 400:
+                # Embedding-only models reject /api/generate; unload via /api/embed
+                payload["input"] = ""
+                self.transport.post("/api/embed", payload, timeout=5, retry=NO_RETRY)
+        except Exception:
+            pass
+
+    def metrics(self):
+        """Resident models, load times and recent swap decisions."""
+        with self._lock:
+            self._expire_locked()
+            return {
+                "budget_mb": self.budget_mb,
+                "resident": {m: round(self._size(m)) for m in self._hot},
+                "loads": {m: dict(v) for m, v in self.loads.items()},
+                "evictions": self.evictions,
+                "decisions": list(self.decisions),
+            }
+
+
+_residency_managers = {}
+
+
+def get_residency_manager(base_url=DEFAULT_OLLAMA_URL):
+    """One residency manager per Ollama server, shared by every client in the process."""
+    base_url = base_url.rstrip("/")
+    if base_url not in _residency_managers:
+        _residency_managers[base_url] = ModelResidencyManager(base_url)
+    return _residency_managers[base_url]
+
 
 class LLMModel:
-    def __init__(self, model_name="gemma:2b", base_url="http://localhost:11434"):
+    def __init__(self, model_name="gemma:2b", base_url=DEFAULT_OLLAMA_URL, cache=None,
+                 residency=None, transport=None, deadline_s=None, hedge=None):
         """Initialize the LLM model with the specified model name.
 
         Args:
             model_name (str): Name of the Ollama model to use (default: "gemma:2b")
             base_url (str): Base URL for the local Ollama server
+            cache (EmbeddingCache | bool | None): Embedding cache used under
+                `get_vector`/`get_vectors`. None uses the shared on-disk cache,
+                False disables caching.
+            residency (ModelResidencyManager | None): Decides which models stay
+                loaded. None uses the manager shared by all clients of `base_url`.
+            transport (OllamaTransport | None): Pooled HTTP transport. None uses
+                the one shared by all clients of `base_url`.
+            deadline_s (float | None): Default budget per call when the caller
+                passes no `deadline` (None: only the per-endpoint timeouts).
+            hedge (HedgePolicy | None): Hedge slow embedding requests with a
+                duplicate (see ollama_transport.HedgePolicy). None disables.
         """
         self.model_name = model_name
         self.base_url = base_url.rstrip("/")
+        self.transport = transport or get_transport(self.base_url)
+        self.deadline_s = deadline_s
+        self.hedge = hedge
+        self.cache = cache
+        self.residency = residency or get_residency_manager(self.base_url)
+        self._embed_endpoint = "/api/embed"
         self.system_prompt = (
             "You are an AI assistant that helps optimize resumes for specific job descriptions. "
             "Modify the given resume to better match the provided job description. "
@@ -23,16 +290,43 @@ class LLMModel:
             "Return only the modified resume in JSON format."
         )
 
-    def generate_critique(self, resume_text, jd_text):
+    def generate_critique(self, resume_text, jd_text, deadline=None):
         """
         Generates career advice for tailoring resume to JD.
         """
-        prompt = f"""Career Consultant: Help this person apply for a new job.
+        return self._generate(self._critique_prompt(resume_text, jd_text), deadline=deadline)
+
+    def generate_critique_stream(self, resume_text, jd_text, deadline=None, result=None):
+        """
+        Streams career advice token by token as Gemma produces it.
+
+        Timing for the finished run goes to `result["stats"]` when a dict is
+        passed (see `_generation_stats`). If `deadline` expires mid-stream the
+        stream stops with an error line instead of running on.
+        """
+        return self._generate_stream(self._critique_prompt(resume_text, jd_text), deadline=deadline,
+                                     result=result)
+
+    def _deadline(self, deadline):
+        """The caller's Deadline, or a fresh one from `deadline_s` (None if neither is set)."""
+        return Deadline.coerce(deadline if deadline is not None else self.deadline_s)
+
+    def _critique_prompt(self, resume_text, jd_text):
+        """Build the consultant prompt for one resume/JD pair."""
+        return self._resume_section(resume_text) + self._job_section(jd_text)
+
+    def _resume_section(self, resume_text):
+        """Prompt prefix that depends only on the resume (shared across JDs)."""
+        return f"""Career Consultant: Help this person apply for a new job.
 
 THEIR RESUME:
 {resume_text[:3000]}
 
-TARGET JOB:
+"""
+
+    def _job_section(self, jd_text):
+        """Prompt suffix for one target job."""
+        return f"""TARGET JOB:
 {jd_text[:1200]}
 
 Copy this EXACT format and fill in with their actual data:
@@ -69,18 +363,74 @@ Keep their original job title. Show how to describe it for the new role:
 ## 5. Summary
 [Name] is a [background]. [How skills transfer to new role].
 """
-        
-        self.force_unload("mxbai-embed-large")
-        return self._generate(prompt)
 
-    def _generate(self, prompt: str) -> str:
-        """Call the local Ollama HTTP API to generate a response."""
-        url = f"{self.base_url}/api/generate"
+    def _generate(self, prompt: str, context=None, options=None, deadline=None, result=None) -> str:
+        """Call the local Ollama HTTP API to generate a response.
+
+        Args:
+            prompt (str): Prompt text.
+            context (list[int]): Token context returned by an earlier call to
+                continue from (its prefill is not repeated).
+            options (dict): Overrides merged into the default sampling options.
+            deadline (Deadline | float): Budget for the call (default: `deadline_s`).
+            result (dict): Filled with "stats" (see `_generation_stats`) and
+                "context" (tokens to continue from) when the call succeeds.
+                Per call, so clients shared between sessions never mix them up.
+        """
+        payload = self._critique_payload(prompt, stream=False, context=context, options=options)
+        try:
+            start = time.perf_counter()
+            resp = self.transport.post("/api/generate", payload, deadline=self._deadline(deadline))
+            resp.raise_for_status()
+            data = resp.json()
+            self.residency.record_response(payload["model"], data)
+            if result is not None:
+                result.update(stats=_generation_stats(data, None, time.perf_counter() - start),
+                              context=data.get("context"))
+            return data.get("response", "").strip()
+        except Exception as e:
+            return f"Error generating response: {e}"
+
+    def _generate_stream(self, prompt: str, context=None, deadline=None, result=None):
+        """Yield response tokens as Ollama streams NDJSON chunks; `result` as for `_generate`."""
+        payload = self._critique_payload(prompt, stream=True, context=context)
+        deadline = self._deadline(deadline)
+        start = time.perf_counter()
+        ttft = None
+        try:
+            with self.transport.post("/api/generate", payload, stream=True, deadline=deadline) as resp:
+                resp.raise_for_status()
+                for line in resp.iter_lines():
+                    if deadline is not None and deadline.expired():
+                        raise DeadlineExceeded(f"Stopped after {time.perf_counter() - start:.1f}s: deadline reached")
+                    if not line:
+                        continue
+                    chunk = json.loads(line)
+                    if chunk.get("error"):
+                        raise RuntimeError(chunk["error"])
+                    token = chunk.get("response", "")
+                    if token:
+                        if ttft is None:
+                            ttft = time.perf_counter() - start
+                        yield token
+                    if chunk.get("done"):
+                        self.residency.record_response(payload["model"], chunk)
+                        if result is not None:
+                            result.update(stats=_generation_stats(chunk, ttft, time.perf_counter() - start),
+                                          context=chunk.get("context"))
+                        break
+        except Exception as e:
+            yield f"\n\nError generating response: {e}"
+
+    def _critique_payload(self, prompt, stream, context=None, options=None):
+        model = "gemma:2b" # Force Gemma 2B for generation (smarter than mxbai, lighter than llama3)
         payload = {
-            "model": "gemma:2b", # Force Gemma 2B for generation (smarter than mxbai, lighter than llama3)
+            "model": model,
             "prompt": prompt,
             "system": self.system_prompt,
-            "stream": False,
+            "stream": stream,
+            # Evicts the embedder only if Gemma would not fit alongside it
+            "keep_alive": self.residency.acquire(model),
             "options": {
                 "num_gpu": 35,  # Force all layers to GPU (GTX 1060 6GB)
                 "num_ctx": 4096,  # Context window
@@ -89,83 +439,245 @@ Keep their original job title. Show how to describe it for the new role:
                 "top_k": 40,  # Limit token choices
             }
         }
-        try:
-            resp = requests.post(url, json=payload, timeout=600)
-            resp.raise_for_status()
-            data = resp.json()
-            return data.get("response", "").strip()
-        except Exception as e:
-            return f"Error generating response: {e}"
+        payload["options"].update(options or {})
+        if context:
+            # The system prompt is already part of the primed context
+            payload["context"] = context
+            del payload["system"]
+        return payload
 
-    def get_vector(self, text: str):
+    def get_vector(self, text: str, deadline=None):
         """Generate embeddings for the given text using local Ollama.
 
         Args:
             text (str): Input text to embed.
+            deadline (Deadline | float): Budget for the call (default: `deadline_s`).
 
         Returns:
             numpy.ndarray: The embedding vector.
             None: If extraction fails.
         """
-        try:
-            import numpy as np
-        except ImportError:
-            raise ImportError("numpy is required. Please install it with `pip install numpy`.")
+        matrix, ok = self.get_vectors([text], deadline=deadline)
+        if not ok[0]:
+            return None
+        return matrix[0]
+
+    def get_vectors(self, texts, batch_size=32, deadline=None):
+        """Generate embeddings for many texts with batched Ollama requests.
+
+        Uses the array form of `/api/embed`'s `input` field so each HTTP round
+        trip carries up to `batch_size` texts instead of one.
+
+        Args:
+            texts (list[str]): Input texts to embed.
+            batch_size (int): Maximum number of texts sent per request.
+            deadline (Deadline | float): Budget for all batches (default:
+                `deadline_s`). Batches not sent before it expires are marked
+                failed instead of stalling the caller.
+
+        Returns:
+            tuple(numpy.ndarray, numpy.ndarray): A contiguous float32 matrix of
+            shape (len(texts), dim) in input order, and a boolean mask that is
+            False for rows that could not be embedded (those rows are zeros).
+        """
+        texts = list(texts)
+        deadline = self._deadline(deadline)
+        cache = self._get_cache()
+        if cache is None:
+            return _stack_vectors(self._embed_all(texts, batch_size, deadline))
+
+        rows, pending = self._cache_lookup(cache, texts)
+        missing = [text for text, _ in pending.values()]
+        fetched = self._embed_all(missing, batch_size, deadline)
+
+        self._cache_store(cache, rows, pending, fetched)
+        return _stack_vectors(rows)
+
+    def _embed_all(self, texts, batch_size, deadline):
+        """Embed `texts` batch by batch; once `deadline` expires the rest are marked failed."""
+        rows = []
+        for start in range(0, len(texts), batch_size):
+            batch = texts[start:start + batch_size]
+            if deadline is not None and deadline.expired():
+                rows.extend([None] * len(batch))
+            else:
+                rows.extend(self._embed_batch(batch, deadline))
+        skipped = sum(vec is None for vec in rows)
+        if deadline is not None and deadline.expired() and skipped:
+            print(f"Embedding deadline of {deadline.seconds}s reached; "
+                  f"{skipped} of {len(rows)} texts not embedded")
+        return rows
+
+    def get_document_vector(self, text, pooling="weighted", max_tokens=None, deadline=None):
+        """Embed a long document by chunking and pooling (see `get_document_vectors`).
+
+        Returns:
+            DocumentEmbedding: Pooled vector plus chunk vectors.
+            None: If no chunk could be embedded.
+        """
+        return self.get_document_vectors([text], pooling=pooling, max_tokens=max_tokens, deadline=deadline)[0]
+
+    def get_document_vectors(self, texts, pooling="weighted", max_tokens=None, batch_size=32, deadline=None):
+        """Embed whole documents without the embedder's silent truncation.
+
+        Each document is split on section/sentence boundaries into chunks
+        within the token budget; the chunks of every document go out together
+        in batched requests and are pooled back per document.
+
+        Args:
+            texts (list[str]): Documents to embed.
+            pooling (str): "mean", "weighted" (by chunk length) or "max".
+            max_tokens (int): Token budget per chunk (default: chunking.DEFAULT_MAX_TOKENS).
+            batch_size (int): Maximum number of chunks per request.
+            deadline (Deadline | float): Budget for embedding every chunk.
+
+        Returns:
+            list[DocumentEmbedding | None]: One entry per document, None if no
+            chunk of that document could be embedded.
+        """
+        from chunking import DEFAULT_MAX_TOKENS, DocumentEmbedding, estimate_tokens, pool_vectors, split_into_chunks
+        np = _require_numpy()
+
+        doc_chunks = [split_into_chunks(t, max_tokens or DEFAULT_MAX_TOKENS) for t in texts]
+        flat = [chunk for chunks in doc_chunks for chunk in chunks]
+        matrix, ok = self.get_vectors(flat, batch_size=batch_size, deadline=deadline)
+
+        documents = []
+        offset = 0
+        for chunks in doc_chunks:
+            rows = slice(offset, offset + len(chunks))
+            offset += len(chunks)
+            keep = ok[rows]
+            if not keep.any():
+                documents.append(None)
+                continue
+            kept_chunks = [c for c, k in zip(chunks, keep) if k]
+            chunk_vectors = matrix[rows][keep]
+            weights = np.array([estimate_tokens(c) for c in kept_chunks], dtype=np.float32)
+            documents.append(DocumentEmbedding(
+                pool_vectors(chunk_vectors, weights, mode=pooling),
+                kept_chunks, chunk_vectors, weights,
+            ))
+        return documents
+
+    def _cache_lookup(self, cache, texts):
+        """Fill cached rows and group the missing ones by distinct text.
+
+        Returns:
+            tuple(list, dict): Per-text vectors (None on a miss) and a mapping
+            from each missing cache key to its text and the row indices it fills.
+        """
+        keys = [self._cache_key(t) for t in texts]
+        rows = cache.get_many(keys)
+
+        # Embed each distinct missing text once, even if it repeats in `texts`
+        pending = {}
+        for i, (key, text, vec) in enumerate(zip(keys, texts, rows)):
+            if vec is None:
+                pending.setdefault(key, (text, []))[1].append(i)
+        return rows, pending
+
+    def _cache_store(self, cache, rows, pending, fetched):
+        """Scatter freshly embedded vectors into `rows` and write them to the cache."""
+        new_keys, new_vectors = [], []
+        for (text, indices), vec in zip(pending.values(), fetched):
+            if vec is None:
+                continue
+            for i in indices:
+                rows[i] = vec
+            # Key after fetching: a 404 fallback may have switched the endpoint
+            new_keys.append(self._cache_key(text))
+            new_vectors.append(vec)
+        if new_keys:
+            # Journaled as they are stored; the index snapshot is rewritten in batches and at exit
+            cache.put_many(new_keys, new_vectors)
+
+    def _get_cache(self):
+        """Resolve the configured embedding cache (None when disabled)."""
+        if self.cache is None:
+            from embedding_cache import get_default_cache
+            self.cache = get_default_cache()
+        if self.cache is False:
+            return None
+        return self.cache
+
+    def _cache_key(self, text):
+        from embedding_cache import make_key
+        return make_key(self.model_name, f"{self.base_url}{self._embed_endpoint}", text)
+
+    def _embed_batch(self, batch, deadline=None):
+        """Embed one batch of texts, returning a vector (or None) per text."""
+        np = _require_numpy()
+
+        if self._embed_endpoint == "/api/embeddings":
+            return [self._embed_legacy(text, deadline) for text in batch]
 
-        url = f"{self.base_url}/api/embed"
         payload = {
             "model": self.model_name,
-            "input": text,
-            "keep_alive": 0, # Force unload to save VRAM for potential Llama3 swap
+            "input": batch,
+            # Stay resident across the burst; the scheduler evicts when needed
+            "keep_alive": self.residency.acquire(self.model_name),
         }
-        
+
         try:
-            resp = requests.post(url, json=payload, timeout=600)
+            resp = self.transport.post("/api/embed", payload, deadline=deadline, hedge=self.hedge)
             resp.raise_for_status()
             data = resp.json()
+            self.residency.record_response(self.model_name, data)
             embeddings = data.get("embeddings", [])
-            if not embeddings:
-                return None
-            return np.array(embeddings[0])
-            
+            if len(embeddings) != len(batch):
+                print(f"Ollama returned {len(embeddings)} embeddings for {len(batch)} inputs")
+                return [None] * len(batch)
+            return [np.asarray(e, dtype=np.float32) for e in embeddings]
+
         except requests.exceptions.HTTPError as e:
-            if e.response.status_code == 404:
-                # Fallback to legacy /api/embeddings
-                url = f"{self.base_url}/api/embeddings"
-                payload = {
-                    "model": self.model_name,
-                    "prompt": text,
-                    # Legacy endpoint often doesn't support keep_alive or handles it poorly
-                }
-                try:
-                    resp = requests.post(url, json=payload, timeout=600)
-                    resp.raise_for_status()
-                    data = resp.json()
-                    embedding = data.get("embedding", [])
-                    if not embedding:
-                        return None
-                    return np.array(embedding)
-                except Exception as ex:
-                    print(f"Legacy Embedding Error: {ex}")
-                    return None
-            else:
-                print(f"Ollama API Error: {e}")
-                return None
+            if e.response is not None and e.response.status_code == 404:
+                # Fallback to legacy /api/embeddings (one prompt per request)
+                self._embed_endpoint = "/api/embeddings"
+                return [self._embed_legacy(text, deadline) for text in batch]
+            if len(batch) > 1:
+                # One bad input rejects the whole batch; retry individually
+                # so the failure mask only covers the offending rows.
+                return [self._embed_batch([text], deadline)[0] for text in batch]
+            print(f"Ollama API Error: {e}")
+            return [None]
+        except (requests.exceptions.Timeout, requests.exceptions.ConnectionError) as e:
+            # Deadline expired or circuit open: fail this batch fast
+            print(f"Ollama unavailable for embedding: {e}")
+            return [None] * len(batch)
         except Exception as e:
-            print(f"Unexpected Error in get_vector: {e}")
-            return None
+            print(f"Unexpected Error in get_vectors: {e}")
+            return [None] * len(batch)
 
-    def force_unload(self, model_name):
-        """Force a model to unload from VRAM to prevent OOM."""
-        url = f"{self.base_url}/api/generate"
+    def _embed_legacy(self, text, deadline=None):
+        """Embed a single text through the legacy /api/embeddings endpoint."""
+        np = _require_numpy()
+
+        self.residency.acquire(self.model_name)
         payload = {
-            "model": model_name,
-            "keep_alive": 0
+            "model": self.model_name,
+            "prompt": text,
+            # Legacy endpoint often doesn't support keep_alive or handles it poorly
         }
         try:
-            requests.post(url, json=payload, timeout=5)
-        except:
-            pass
+            resp = self.transport.post("/api/embeddings", payload, deadline=deadline, hedge=self.hedge)
+            resp.raise_for_status()
+            data = resp.json()
+            self.residency.record_response(self.model_name, data)
+            embedding = data.get("embedding", [])
+            if not embedding:
+                return None
+            return np.asarray(embedding, dtype=np.float32)
+        except Exception as ex:
+            print(f"Legacy Embedding Error: {ex}")
+            return None
+
+    def force_unload(self, model_name):
+        """Force a model to unload from VRAM to prevent OOM.
+
+        Normally unnecessary: the residency manager evicts models on demand.
+        """
+        self.residency.release(model_name)
 
 
     def generate_resume(self, resume_json, job_description):
@@ -177,3 +689,467 @@ Keep their original job title. Show how to describe it for the new role:
         # but for this refactor we acknowledge it's not the primary path anymore.
         pass
 
+
+
+class CritiqueSession:
+    PRIME_INSTRUCTION = "Read this resume carefully. Reply only with: OK"
+
+    def __init__(self, client, resume_text):
+        """
+        Critiques one resume against many JDs without re-running resume prefill.
+
+        The model is primed once with the resume section of the consultant
+        prompt; Ollama's returned `context` tokens are then continued from for
+        every JD, so each critique only evaluates the JD-specific tokens.
+
+        Args:
+            client (LLMModel): Client used for generation.
+            resume_text (str): The resume shared by every critique.
+        """
+        self.client = client
+        self.resume_text = resume_text
+        self.context = None
+        self.prime_stats = None
+        self.history = []  # One stats dict per critiqued JD
+
+    def prime(self, deadline=None):
+        """Run the resume prefill once and keep its context tokens.
+
+        Args:
+            deadline (Deadline | float): Budget for the prefill call (default: the client's `deadline_s`).
+
+        Raises:
+            RuntimeError: If the prefill fails or runs out of time.
+        """
+        if self.context is not None:
+            return self.context
+        prompt = self.client._resume_section(self.resume_text) + self.PRIME_INSTRUCTION
+        # The client is shared by every app session: context and stats come back per call
+        result = {}
+        reply = self.client._generate(prompt, options={"num_predict": 4}, deadline=deadline, result=result)
+        if reply.startswith("Error generating response"):
+            raise RuntimeError(reply)
+        self.context = result.get("context")
+        self.prime_stats = result.get("stats")
+        return self.context
+
+    def critique(self, jd_text, deadline=None):
+        """Blocking critique for one JD, continuing from the primed resume context."""
+        deadline = self.client._deadline(deadline)  # One budget for the prefill and the critique
+        context = self.prime(deadline)
+        result = {}
+        response = self.client._generate(self.client._job_section(jd_text), context=context,
+                                         deadline=deadline, result=result)
+        self._record(jd_text, result.get("stats"))
+        return response
+
+    def critique_stream(self, jd_text, deadline=None, result=None):
+        """Streaming critique for one JD; stats land in `history` (and `result`, if given) when done."""
+        deadline = self.client._deadline(deadline)  # One budget for the prefill and the critique
+        context = self.prime(deadline)
+        result = {} if result is None else result
+        yield from self.client._generate_stream(self.client._job_section(jd_text), context=context,
+                                                deadline=deadline, result=result)
+        self._record(jd_text, result.get("stats"))
+
+    def _record(self, jd_text, stats):
+        stats = dict(stats or {})
+        stats["jd_chars"] = len(jd_text)
+        self.history.append(stats)
+
+    def prefill_report(self):
+        """Prompt-eval cost of the shared resume prefill vs each additional JD."""
+        return {
+            "resume_prefill_tokens": (self.prime_stats or {}).get("prompt_eval_count", 0),
+            "resume_prefill_s": (self.prime_stats or {}).get("prompt_eval_s", 0.0),
+            "per_jd": [
+                {"prompt_eval_count": h.get("prompt_eval_count", 0),
+                 "prompt_eval_s": h.get("prompt_eval_s", 0.0)}
+                for h in self.history
+            ],
+        }
+
+
+def _require_aiohttp():
+    try:
+        import aiohttp
+    except ImportError:
+        raise ImportError("aiohttp is required for AsyncLLMModel. Please install it with `pip install aiohttp`.")
+    return aiohttp
+
+
+def run_sync(coro):
+    """Run a coroutine to completion from synchronous code.
+
+    Raises:
+        RuntimeError: If called from inside a running event loop (await instead).
+    """
+    import asyncio
+
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coro)
+    coro.close()
+    raise RuntimeError("run_sync() cannot be used inside a running event loop; await the coroutine instead.")
+
+
+class AsyncLLMModel(LLMModel):
+    def __init__(self, model_name="gemma:2b", base_url=DEFAULT_OLLAMA_URL, cache=None,
+                 residency=None, transport=None, max_concurrency=4, request_timeout=600,
+                 deadline_s=None):
+        """Asyncio counterpart of LLMModel with bounded request concurrency.
+
+        At most `max_concurrency` requests are in flight at once; raise
+        OLLAMA_NUM_PARALLEL on the server to match. The inherited synchronous
+        methods (`get_vector`, `get_vectors`, `generate_critique`) keep working
+        and run the coroutines below on a private event loop.
+
+        One instance may be shared by many threads and event loops (e.g. a
+        Streamlit cache_resource): the aiohttp session and the concurrency
+        semaphore belong to the task that opened them (`async with client`,
+        each sync call, or a single coroutine call), never to the instance.
+
+        Args:
+            model_name (str): Name of the Ollama model to use.
+            base_url (str): Base URL for the local Ollama server.
+            cache (EmbeddingCache | bool | None): See LLMModel.
+            residency (ModelResidencyManager | None): See LLMModel.
+            transport (OllamaTransport | None): See LLMModel. Its retry policy
+                and latency counters are shared with the async requests.
+            max_concurrency (int): Maximum number of in-flight HTTP requests.
+            request_timeout (float): Default per-request deadline in seconds,
+                covering both the wait for a concurrency slot and the request.
+            deadline_s (float | None): See LLMModel; applies to the sync wrappers.
+
+        Every `timeout` argument below also accepts a `Deadline`, so one
+        budget can be shared by all requests of a pipeline step.
+        """
+        super().__init__(model_name=model_name, base_url=base_url, cache=cache, residency=residency,
+                         transport=transport, deadline_s=deadline_s)
+        self.max_concurrency = max_concurrency
+        self.request_timeout = request_timeout
+        # [session, semaphore, token] of the enclosing scope; context-local, so
+        # threads and tasks sharing this instance never see each other's session
+        self._scope_var = contextvars.ContextVar(f"ollama_session_{id(self)}", default=None)
+
+    # -------------------------------------------------
+    # Session management
+    # -------------------------------------------------
+    async def __aenter__(self):
+        """Open a session (and concurrency limit) for the current task and the tasks it starts."""
+        import asyncio
+        aiohttp = _require_aiohttp()
+
+        scope = [aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=self.max_concurrency)),
+                 asyncio.Semaphore(self.max_concurrency), None]
+        scope[2] = self._scope_var.set(scope)
+        return self
+
+    async def __aexit__(self, *exc):
+        session, _, token = self._scope_var.get()
+        self._scope_var.reset(token)
+        await session.close()
+
+    @contextlib.asynccontextmanager
+    async def _scope(self):
+        """(session, semaphore) of the enclosing `async with client`, or a fresh pair for this call."""
+        scope = self._scope_var.get()
+        if scope is not None:
+            yield scope[0], scope[1]
+            return
+        async with self:
+            yield tuple(self._scope_var.get()[:2])
+
+    def _run(self, coro):
+        """Run `coro` on a private loop inside its own session, closed when it finishes."""
+        async def runner():
+            async with self:
+                return await coro
+        return run_sync(runner())
+
+    def _budget(self, timeout):
+        """Seconds allowed for one call: what is left of a Deadline, else `timeout` or the default."""
+        if isinstance(timeout, Deadline):
+            return timeout.remaining()
+        return timeout or self.request_timeout
+
+    def _cut_short(self, timeout, budget):
+        """Whether a Deadline left this call less than the configured timeout (see `counts_as_failure`)."""
+        return isinstance(timeout, Deadline) and budget < self.request_timeout
+
+    @staticmethod
+    def _record_outcome(breaker, status, error, cut_short):
+        """Feed the circuit breaker the same way the sync transport does."""
+        if error is not None:
+            if counts_as_failure(error, cut_short):
+                breaker.record_failure()
+            else:
+                breaker.release()
+        elif status is None:
+            breaker.release()  # Cancelled by the caller before any answer
+        elif status >= 500:
+            breaker.record_failure()
+        else:
+            breaker.record_success()
+
+    async def _post_json(self, path, payload, timeout=None):
+        """POST `payload` and return the decoded JSON body.
+
+        Transient failures are retried per the transport's retry policy; the
+        deadline covers queueing, every attempt and the backoff in between.
+
+        Raises:
+            aiohttp.ClientResponseError: On a non-2xx status.
+            TimeoutError: If the deadline expires while queued or in flight.
+            CircuitOpenError: If the transport's circuit breaker is open.
+        """
+        import asyncio
+        aiohttp = _require_aiohttp()
+
+        retry = self.transport.retry
+        breaker = self.transport.breaker
+        attempt = 0
+        budget = self._budget(timeout)
+        cut_short = self._cut_short(timeout, budget)
+        async with self._scope() as (session, semaphore), asyncio.timeout(budget) as limit:
+            while True:
+                status, error = None, None
+                async with semaphore:
+                    if not breaker.allow():
+                        raise CircuitOpenError(f"Circuit open for {self.base_url} after repeated failures")
+                    start = time.perf_counter()
+                    try:
+                        async with session.post(f"{self.base_url}{path}", json=payload) as resp:
+                            status = resp.status
+                            if not (status >= 400 and retry.should_retry(attempt, status=status)):
+                                resp.raise_for_status()
+                                data = await resp.json(content_type=None)
+                    except aiohttp.ClientConnectionError as e:
+                        error = ConnectionError(str(e))
+                    except asyncio.CancelledError:
+                        if limit.expired():
+                            error = TimeoutError(f"{path} timed out after {budget:.1f}s")
+                        raise
+                    finally:
+                        self.transport.record(path, time.perf_counter() - start,
+                                              error=error is not None or (status or 0) >= 400,
+                                              retried=attempt > 0)
+                        self._record_outcome(breaker, status, error, cut_short)
+                if error is None and status < 400:
+                    return data
+                if error is not None and not retry.should_retry(attempt, exception=error):
+                    raise error
+                await asyncio.sleep(retry.delay(attempt))
+                attempt += 1
+
+    # -------------------------------------------------
+    # Embeddings
+    # -------------------------------------------------
+    async def embed(self, text, timeout=None):
+        """Embed a single text. Returns a float32 vector or None on failure."""
+        matrix, ok = await self.embed_many([text], timeout=timeout)
+        if not ok[0]:
+            return None
+        return matrix[0]
+
+    async def embed_many(self, texts, batch_size=32, timeout=None):
+        """Embed many texts, sending up to `max_concurrency` batches at once.
+
+        Args:
+            texts (list[str]): Input texts to embed.
+            batch_size (int): Maximum number of texts per request.
+            timeout (float): Per-request deadline in seconds.
+
+        Returns:
+            tuple(numpy.ndarray, numpy.ndarray): float32 matrix and success mask,
+            as returned by `LLMModel.get_vectors`.
+        """
+        import asyncio
+
+        texts = list(texts)
+        cache = self._get_cache()
+        if cache is None:
+            rows, pending = [None] * len(texts), {i: (t, [i]) for i, t in enumerate(texts)}
+        else:
+            rows, pending = self._cache_lookup(cache, texts)
+        missing = [text for text, _ in pending.values()]
+
+        batches = [missing[i:i + batch_size] for i in range(0, len(missing), batch_size)]
+        async with self._scope():  # One session and concurrency limit for every batch
+            results = await asyncio.gather(*(self._aembed_batch(b, timeout) for b in batches))
+        fetched = [vec for batch in results for vec in batch]
+
+        if cache is None:
+            for (_, indices), vec in zip(pending.values(), fetched):
+                rows[indices[0]] = vec
+        else:
+            self._cache_store(cache, rows, pending, fetched)
+        return _stack_vectors(rows)
+
+    async def _aembed_batch(self, batch, timeout=None):
+        """Async version of `LLMModel._embed_batch`."""
+        import asyncio
+        np = _require_numpy()
+        aiohttp = _require_aiohttp()
+
+        if self._embed_endpoint == "/api/embeddings":
+            return await asyncio.gather(*(self._aembed_legacy(t, timeout) for t in batch))
+
+        payload = {
+            "model": self.model_name,
+            "input": batch,
+            "keep_alive": await asyncio.to_thread(self.residency.acquire, self.model_name),
+        }
+        try:
+            data = await self._post_json("/api/embed", payload, timeout)
+            self.residency.record_response(self.model_name, data)
+            embeddings = data.get("embeddings", [])
+            if len(embeddings) != len(batch):
+                print(f"Ollama returned {len(embeddings)} embeddings for {len(batch)} inputs")
+                return [None] * len(batch)
+            return [np.asarray(e, dtype=np.float32) for e in embeddings]
+
+        except aiohttp.ClientResponseError as e:
+            if e.status == 404:
+                self._embed_endpoint = "/api/embeddings"
+                return await asyncio.gather(*(self._aembed_legacy(t, timeout) for t in batch))
+            if len(batch) > 1:
+                singles = await asyncio.gather(*(self._aembed_batch([t], timeout) for t in batch))
+                return [vecs[0] for vecs in singles]
+            print(f"Ollama API Error: {e}")
+            return [None]
+        except TimeoutError:
+            print(f"Embedding request timed out after {self._budget(timeout):.0f}s budget")
+            return [None] * len(batch)
+        except Exception as e:
+            print(f"Unexpected Error in embed_many: {e}")
+            return [None] * len(batch)
+
+    async def _aembed_legacy(self, text, timeout=None):
+        """Async version of `LLMModel._embed_legacy`."""
+        np = _require_numpy()
+
+        import asyncio
+
+        await asyncio.to_thread(self.residency.acquire, self.model_name)
+        payload = {"model": self.model_name, "prompt": text}
+        try:
+            data = await self._post_json("/api/embeddings", payload, timeout)
+            self.residency.record_response(self.model_name, data)
+            embedding = data.get("embedding", [])
+            if not embedding:
+                return None
+            return np.asarray(embedding, dtype=np.float32)
+        except Exception as ex:
+            print(f"Legacy Embedding Error: {ex}")
+            return None
+
+    # -------------------------------------------------
+    # Generation
+    # -------------------------------------------------
+    async def _generation_payload(self, prompt, system, options, model, stream):
+        import asyncio
+
+        model = model or self.model_name
+        payload = {
+            "model": model,
+            "prompt": prompt,
+            "stream": stream,
+            "options": options or {},
+            "keep_alive": await asyncio.to_thread(self.residency.acquire, model),
+        }
+        if system:
+            payload["system"] = system
+        return payload
+
+    async def generate(self, prompt, system=None, options=None, model=None, timeout=None, result=None):
+        """Generate a completion. Returns the response text, or None on failure.
+
+        Timing goes to `result["stats"]` when a dict is passed.
+        """
+        payload = await self._generation_payload(prompt, system, options, model, stream=False)
+        try:
+            start = time.perf_counter()
+            data = await self._post_json("/api/generate", payload, timeout)
+            self.residency.record_response(payload["model"], data)
+            if result is not None:
+                result["stats"] = _generation_stats(data, None, time.perf_counter() - start)
+            return data.get("response", "").strip()
+        except TimeoutError:
+            print(f"Generation timed out after {self._budget(timeout):.0f}s budget")
+            return None
+        except Exception as e:
+            print(f"Error generating response: {e}")
+            return None
+
+    async def generate_many(self, prompts, system=None, options=None, model=None, timeout=None):
+        """Generate completions for many prompts concurrently, preserving order."""
+        import asyncio
+
+        async with self._scope():
+            return await asyncio.gather(*(
+                self.generate(p, system=system, options=options, model=model, timeout=timeout)
+                for p in prompts
+            ))
+
+    async def generate_stream(self, prompt, system=None, options=None, model=None, timeout=None,
+                              result=None):
+        """Yield response tokens as Ollama streams them.
+
+        The deadline bounds the whole stream, including the wait for a slot.
+        Timing for the finished stream goes to `result["stats"]` when a dict is passed.
+        """
+        import asyncio
+        aiohttp = _require_aiohttp()
+
+        payload = await self._generation_payload(prompt, system, options, model, stream=True)
+        start = time.perf_counter()
+        ttft = None
+        breaker = self.transport.breaker
+        budget = self._budget(timeout)
+        cut_short = self._cut_short(timeout, budget)
+        async with self._scope() as (session, semaphore), asyncio.timeout(budget) as limit:
+            async with semaphore:
+                if not breaker.allow():
+                    raise CircuitOpenError(f"Circuit open for {self.base_url} after repeated failures")
+                try:
+                    resp = await session.post(f"{self.base_url}/api/generate", json=payload)
+                except aiohttp.ClientConnectionError as e:
+                    self._record_outcome(breaker, None, ConnectionError(str(e)), cut_short)
+                    raise
+                except asyncio.CancelledError:
+                    error = TimeoutError("/api/generate timed out") if limit.expired() else None
+                    self._record_outcome(breaker, None, error, cut_short)
+                    raise
+                async with resp:
+                    self.transport.record("/api/generate", time.perf_counter() - start,
+                                          error=resp.status >= 400)
+                    self._record_outcome(breaker, resp.status, None, cut_short)
+                    resp.raise_for_status()
+                    async for line in resp.content:
+                        if not line.strip():
+                            continue
+                        chunk = json.loads(line)
+                        if chunk.get("response"):
+                            if ttft is None:
+                                ttft = time.perf_counter() - start
+                            yield chunk["response"]
+                        if chunk.get("done"):
+                            self.residency.record_response(payload["model"], chunk)
+                            if result is not None:
+                                result["stats"] = _generation_stats(chunk, ttft, time.perf_counter() - start)
+                            break
+
+    # -------------------------------------------------
+    # Sync wrappers
+    # -------------------------------------------------
+    def get_vectors(self, texts, batch_size=32, deadline=None):
+        """Synchronous `embed_many`; drop-in replacement for `LLMModel.get_vectors`."""
+        return self._run(self.embed_many(texts, batch_size=batch_size,
+                                         timeout=self._deadline(deadline)))
+
+    def generate_many_sync(self, prompts, system=None, options=None, model=None, timeout=None):
+        """Synchronous `generate_many` for scripts without an event loop."""
+        return self._run(self.generate_many(prompts, system=system, options=options,
+                                             model=model, timeout=timeout))
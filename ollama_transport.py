@@ -0,0 +1,462 @@
+"""
+Shared HTTP transport for every Ollama caller in the project.
+
+One keep-alive `requests.Session` per server with a sized connection pool,
+pluggable retries with jittered exponential backoff, per-endpoint timeouts
+and request/latency counters. Thousands of short embedding calls reuse the
+same TCP connections instead of paying connection setup each time.
+
+For tail latency, requests also honour a caller-supplied Deadline shared by
+a whole pipeline, can be hedged with a duplicate once they run slower than
+the endpoint's recent p95, and are refused immediately by a circuit breaker
+while the server keeps failing.
+"""
+import os
+import random
+import threading
+import time
+from collections import deque
+from concurrent import futures
+
+import requests
+from requests.adapters import HTTPAdapter
+
+
+def _default_base_url():
+    """Honour OLLAMA_HOST (as the Ollama CLI does), e.g. `127.0.0.1:11434`."""
+    host = os.environ.get("OLLAMA_HOST", "").strip()
+    if not host:
+        return "http://localhost:11434"
+    if "://" not in host:
+        host = f"http://{host}"
+    return host.rstrip("/")
+
+
+DEFAULT_OLLAMA_URL = _default_base_url()
+
+# Seconds; embedding calls are short, generation can legitimately take minutes
+DEFAULT_TIMEOUTS = {
+    "/api/embed": 120,
+    "/api/embeddings": 120,
+    "/api/generate": 600,
+    "/api/ps": 5,
+    "/api/tags": 5,
+}
+FALLBACK_TIMEOUT = 600
+
+# Successful latencies kept per endpoint for the hedging percentile
+LATENCY_WINDOW = 256
+
+
+class DeadlineExceeded(requests.exceptions.Timeout):
+    """The caller's deadline expired before the request could be sent or finish."""
+
+
+class CircuitOpenError(requests.exceptions.ConnectionError):
+    """The server has been failing; the request was refused without being sent."""
+
+
+class Deadline:
+    def __init__(self, seconds):
+        """
+        A fixed point in time shared by every request of one operation.
+
+        Pass the same Deadline down a pipeline (embed, decode, critique) so
+        each step only gets the budget the earlier steps left over.
+
+        Args:
+            seconds (float): Budget from now.
+        """
+        self.seconds = seconds
+        self.expires_at = time.monotonic() + seconds
+
+    @classmethod
+    def coerce(cls, value):
+        """Accept a Deadline, a number of seconds, or None (no deadline)."""
+        if value is None or isinstance(value, Deadline):
+            return value
+        return cls(value)
+
+    def remaining(self):
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def expired(self):
+        return self.remaining() <= 0
+
+    def clamp(self, timeout):
+        """`timeout` shortened to what is left of the deadline."""
+        return min(timeout, self.remaining())
+
+    def __repr__(self):
+        return f"Deadline({self.seconds}s, {self.remaining():.2f}s left)"
+
+
+class RetryPolicy:
+    def __init__(self, max_retries=2, backoff_base=0.25, backoff_max=4.0,
+                 retry_statuses=(429, 500, 502, 503, 504)):
+        """
+        Retry transient failures with full-jitter exponential backoff.
+
+        Any object with the same `should_retry` / `delay` methods can be
+        passed to OllamaTransport instead.
+
+        Args:
+            max_retries (int): Retries after the first attempt.
+            backoff_base (float): Backoff cap for the first retry, in seconds.
+            backoff_max (float): Upper bound on any single backoff.
+            retry_statuses (tuple[int]): HTTP statuses worth retrying.
+        """
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.retry_statuses = set(retry_statuses)
+
+    def should_retry(self, attempt, status=None, exception=None):
+        """Whether attempt number `attempt` (0-based) may be followed by another.
+
+        Args:
+            attempt (int): Index of the attempt that just finished.
+            status (int): Its HTTP status, if a response arrived.
+            exception (Exception): Its error, if the request failed to complete.
+        """
+        if attempt >= self.max_retries:
+            return False
+        if exception is not None:
+            return isinstance(exception, (requests.exceptions.ConnectionError, requests.exceptions.Timeout,
+                                          ConnectionError, TimeoutError))
+        return status in self.retry_statuses
+
+    def delay(self, attempt):
+        """Full jitter: uniform in [0, min(max, base * 2**attempt)]."""
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+
+NO_RETRY = RetryPolicy(max_retries=0)
+
+
+class HedgePolicy:
+    def __init__(self, percentile=95, min_delay=0.05, max_delay=None, min_samples=20,
+                 fixed_delay=None, paths=("/api/embed", "/api/embeddings")):
+        """
+        Send a duplicate request when the first one is slower than usual.
+
+        If a request has not answered after the endpoint's recent `percentile`
+        latency, an identical request is sent on another pooled connection
+        and whichever answers first wins. Roughly (100 - percentile)% of
+        requests are duplicated, and one stalled connection no longer sets
+        the tail latency. Generation is not hedged by default because a
+        duplicate doubles GPU work.
+
+        Args:
+            percentile (float): Latency percentile after which to hedge.
+            min_delay (float): Never hedge sooner than this, in seconds.
+            max_delay (float): Never wait longer than this before hedging.
+            min_samples (int): Successful requests needed before the
+                percentile is trusted (no hedging until then).
+            fixed_delay (float): Hedge after this many seconds instead of
+                the observed percentile.
+            paths (tuple[str]): Endpoints that may be hedged.
+        """
+        self.percentile = percentile
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.min_samples = min_samples
+        self.fixed_delay = fixed_delay
+        self.paths = set(paths)
+
+    def delay(self, transport, path):
+        """Seconds to wait before hedging a request to `path`, or None to not hedge."""
+        if path not in self.paths:
+            return None
+        if self.fixed_delay is not None:
+            return self.fixed_delay
+        observed = transport.latency_percentile(path, self.percentile, self.min_samples)
+        if observed is None:
+            return None
+        delay = max(self.min_delay, observed)
+        return min(delay, self.max_delay) if self.max_delay is not None else delay
+
+
+class CircuitBreaker:
+    def __init__(self, failure_threshold=5, reset_after=15.0):
+        """
+        Fail fast while the server is down instead of waiting out every timeout.
+
+        After `failure_threshold` consecutive failures (connection errors,
+        5xx, and timeouts that ran the full configured timeout; see
+        `counts_as_failure`) the circuit opens and requests are refused at once.
+        After `reset_after` seconds a single probe is let through; its
+        success closes the circuit, its failure re-opens it.
+
+        Args:
+            failure_threshold (int): Consecutive failures that open the circuit.
+            reset_after (float): Seconds before a probe request is allowed.
+        """
+        self.failure_threshold = failure_threshold
+        self.reset_after = reset_after
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at = None
+        self._probing = False
+        self.trips = 0
+        self.rejected = 0
+
+    @property
+    def state(self):
+        with self._lock:
+            if self._opened_at is None:
+                return "closed"
+            if time.monotonic() - self._opened_at >= self.reset_after:
+                return "half-open"
+            return "open"
+
+    def allow(self):
+        """Whether a request may be sent now (claims the probe when half-open)."""
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if time.monotonic() - self._opened_at >= self.reset_after and not self._probing:
+                self._probing = True
+                return True
+            self.rejected += 1
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._probing or self._failures >= self.failure_threshold:
+                if self._opened_at is None:
+                    self.trips += 1
+                self._opened_at = time.monotonic()
+            self._probing = False
+
+    def release(self):
+        """An attempt that says nothing about the server (e.g. cut short by a deadline) ended."""
+        with self._lock:
+            self._probing = False
+
+
+def counts_as_failure(error, cut_short):
+    """
+    Whether a failed attempt means the server is unhealthy.
+
+    Connection errors count. Timeouts count only when the attempt had the full
+    configured timeout: one shortened by the caller's Deadline says more about
+    that caller's budget, and would let one impatient session open the
+    process-wide circuit for everyone.
+
+    Args:
+        error (Exception): What the attempt raised (requests or builtin exceptions).
+        cut_short (bool): The attempt's timeout was clamped by a Deadline.
+    """
+    if isinstance(error, (requests.exceptions.Timeout, TimeoutError)):
+        return not cut_short
+    return isinstance(error, (requests.exceptions.ConnectionError, ConnectionError))
+
+
+def _discard(future):
+    """Close the response of a hedged request that lost the race."""
+    if future.exception() is None:
+        future.result().close()
+
+
+class OllamaTransport:
+    def __init__(self, base_url=DEFAULT_OLLAMA_URL, pool_size=16, retry=None, timeouts=None,
+                 breaker=None):
+        """
+        Pooled, instrumented HTTP transport to one Ollama server.
+
+        Args:
+            base_url (str): Base URL for the Ollama server.
+            pool_size (int): Maximum keep-alive connections kept open.
+            retry (RetryPolicy): Retry policy (default: RetryPolicy()).
+            timeouts (dict): Per-endpoint timeouts in seconds, merged over DEFAULT_TIMEOUTS.
+            breaker (CircuitBreaker): Circuit breaker (default: CircuitBreaker()).
+        """
+        self.base_url = base_url.rstrip("/")
+        self.retry = retry or RetryPolicy()
+        self.timeouts = dict(DEFAULT_TIMEOUTS, **(timeouts or {}))
+        self.breaker = breaker or CircuitBreaker()
+        self.pool_size = pool_size
+        self._executor = None
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        self._lock = threading.Lock()
+        self._stats = {}
+        self._latencies = {}
+
+    def timeout_for(self, path):
+        return self.timeouts.get(path, FALLBACK_TIMEOUT)
+
+    def latency_percentile(self, path, percentile, min_samples=1):
+        """Recent successful latency of `path` at `percentile`, in seconds (None if too few samples)."""
+        with self._lock:
+            window = sorted(self._latencies.get(path, ()))
+        if len(window) < max(1, min_samples):
+            return None
+        index = min(len(window) - 1, int(len(window) * percentile / 100))
+        return window[index]
+
+    def _stats_locked(self, path):
+        return self._stats.setdefault(path, {
+            "requests": 0, "errors": 0, "retries": 0, "hedges": 0, "total_s": 0.0, "max_s": 0.0,
+        })
+
+    def record(self, path, elapsed, error=False, retried=False):
+        """Add one attempt to the per-endpoint counters (also used by the async client)."""
+        with self._lock:
+            stats = self._stats_locked(path)
+            stats["requests"] += 1
+            stats["errors"] += int(error)
+            stats["retries"] += int(retried)
+            stats["total_s"] += elapsed
+            stats["max_s"] = max(stats["max_s"], elapsed)
+            if not error:
+                self._latencies.setdefault(path, deque(maxlen=LATENCY_WINDOW)).append(elapsed)
+
+    def request(self, method, path, json=None, timeout=None, stream=False, retry=None,
+                deadline=None, hedge=None):
+        """
+        Send a request, retrying transient failures per the retry policy.
+
+        Args:
+            deadline (Deadline | float): Overall budget for all attempts and
+                backoff; each attempt's timeout is clamped to what is left.
+            hedge (HedgePolicy): Hedge slow attempts with a duplicate request
+                (never for streamed responses).
+
+        Returns:
+            requests.Response: The final response (callers call raise_for_status).
+
+        Raises:
+            DeadlineExceeded: If the deadline expired before an attempt could start.
+            CircuitOpenError: If the circuit breaker is refusing requests.
+            requests.exceptions.RequestException: If the last attempt failed to connect.
+        """
+        retry = retry or self.retry
+        deadline = Deadline.coerce(deadline)
+        timeout = timeout or self.timeout_for(path)
+        attempt = 0
+        while True:
+            if deadline is not None and deadline.expired():
+                raise DeadlineExceeded(f"Deadline expired before {method} {path} (attempt {attempt + 1})")
+            if not self.breaker.allow():
+                raise CircuitOpenError(f"Circuit open for {self.base_url} after repeated failures")
+
+            attempt_timeout = deadline.clamp(timeout) if deadline is not None else timeout
+            cut_short = attempt_timeout < timeout
+            hedge_delay = hedge.delay(self, path) if hedge is not None and not stream else None
+            try:
+                if hedge_delay is None:
+                    resp = self._send(method, path, json, attempt_timeout, stream, attempt > 0, cut_short)
+                else:
+                    resp = self._hedged(method, path, json, attempt_timeout, attempt > 0, hedge_delay, cut_short)
+            except requests.exceptions.RequestException as e:
+                if not retry.should_retry(attempt, exception=e):
+                    raise
+            else:
+                if not retry.should_retry(attempt, status=resp.status_code):
+                    return resp
+                resp.close()
+            backoff = retry.delay(attempt)
+            time.sleep(deadline.clamp(backoff) if deadline is not None else backoff)
+            attempt += 1
+
+    def _send(self, method, path, json, timeout, stream, retried, cut_short=False):
+        """One attempt: send, record latency and feed the circuit breaker."""
+        start = time.perf_counter()
+        try:
+            resp = self.session.request(method, f"{self.base_url}{path}", json=json,
+                                        timeout=timeout, stream=stream)
+        except requests.exceptions.RequestException as e:
+            self.record(path, time.perf_counter() - start, error=True, retried=retried)
+            if counts_as_failure(e, cut_short):
+                self.breaker.record_failure()
+            else:
+                self.breaker.release()
+            raise
+        self.record(path, time.perf_counter() - start, error=resp.status_code >= 400, retried=retried)
+        if resp.status_code >= 500:
+            self.breaker.record_failure()
+        else:
+            self.breaker.record_success()
+        return resp
+
+    def _hedged(self, method, path, json, timeout, retried, delay, cut_short=False):
+        """Send one attempt, racing a duplicate against it if it takes longer than `delay`."""
+        with self._lock:
+            if self._executor is None:
+                self._executor = futures.ThreadPoolExecutor(max_workers=self.pool_size,
+                                                            thread_name_prefix="ollama-hedge")
+        first = self._executor.submit(self._send, method, path, json, timeout, False, retried, cut_short)
+        done, _ = futures.wait([first], timeout=delay)
+        if done:
+            return first.result()
+
+        with self._lock:
+            self._stats_locked(path)["hedges"] += 1
+        pending = {first, self._executor.submit(self._send, method, path, json, timeout, False, retried, cut_short)}
+        finished = []
+        while pending:
+            done, pending = futures.wait(pending, return_when=futures.FIRST_COMPLETED)
+            finished.extend(done)
+            winner = next((f for f in done if f.exception() is None and f.result().status_code < 500), None)
+            if winner is not None:
+                break
+        else:
+            winner = finished[-1]  # Both failed: surface the last error or 5xx response
+        # Both can finish in the same wait; every response but the winner's goes back to the pool
+        for loser in finished:
+            if loser is not winner:
+                _discard(loser)
+        for loser in pending:
+            loser.add_done_callback(_discard)
+        return winner.result()
+
+    def post(self, path, payload, timeout=None, stream=False, retry=None, deadline=None, hedge=None):
+        return self.request("POST", path, json=payload, timeout=timeout, stream=stream, retry=retry,
+                            deadline=deadline, hedge=hedge)
+
+    def get(self, path, timeout=None, retry=None, deadline=None):
+        return self.request("GET", path, timeout=timeout, retry=retry, deadline=deadline)
+
+    def metrics(self):
+        """Per-endpoint request, error, retry and hedge counts with mean/p95/p99/max latency."""
+        with self._lock:
+            stats = {path: dict(s) for path, s in self._stats.items()}
+        for path, s in stats.items():
+            s["mean_ms"] = 1000 * s["total_s"] / s["requests"] if s["requests"] else 0.0
+            for pct in (95, 99):
+                observed = self.latency_percentile(path, pct)
+                s[f"p{pct}_ms"] = 1000 * observed if observed is not None else None
+        stats["circuit"] = {"state": self.breaker.state, "trips": self.breaker.trips,
+                            "rejected": self.breaker.rejected}
+        return stats
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+        self.session.close()
+
+
+_transports = {}
+_transports_lock = threading.Lock()
+
+
+def get_transport(base_url=None):
+    """The process-wide transport for `base_url` (default: OLLAMA_HOST or localhost:11434)."""
+    base_url = (base_url or DEFAULT_OLLAMA_URL).rstrip("/")
+    with _transports_lock:
+        if base_url not in _transports:
+            _transports[base_url] = OllamaTransport(base_url)
+        return _transports[base_url]
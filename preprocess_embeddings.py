@@ -1,13 +1,16 @@
 
 import csv
-import torch
-import numpy as np
 from tqdm import tqdm
-from ollama_module import LLMModel
+from ollama_module import AsyncLLMModel
+from embedding_dataset import SHARD_ROWS, ShardedEmbeddingWriter
 import os
 
 INPUT_FILE = "synthetic_training_dataset.csv"
-OUTPUT_FILE = "dataset_tensors.pt"
+OUTPUT_DIR = "dataset_embeddings"  # Sharded memory-mapped dataset (see embedding_dataset.py)
+EMBED_BATCH_SIZE = 32  # Texts per /api/embed request
+MAX_CONCURRENCY = 4  # Batches in flight at once (match OLLAMA_NUM_PARALLEL)
+ROWS_PER_STEP = EMBED_BATCH_SIZE * MAX_CONCURRENCY // 2  # Resume + JD per row
+POOLING = "weighted"  # Chunk pooling; must match the app (LLMModel default)
 
 def main():
     if not os.path.exists(INPUT_FILE):
@@ -23,47 +26,38 @@ def main():
 
     print(f"Processing {len(data)} samples...")
     
-    resume_embeddings = []
-    jd_embeddings = []
-    
-    # Check for GPU
-    device = "cuda" if torch.cuda.is_available() else "cpu"
-    print(f"Will save tensors for device: {device}")
+    # Pairs stream straight into shards, so memory holds at most one shard however large the CSV is
+    writer = None
     
     # Initialize Ollama Client
     # Ensure this matches the embedding model you want to use
-    client = LLMModel(model_name="mxbai-embed-large")
-
-    for row in tqdm(data):
-        resume_text = row['Resume']
-        jd_text = row['Job_Description']
-        
-        # Get embeddings (returns numpy array)
-        r_emb = client.get_vector(resume_text)
-        j_emb = client.get_vector(jd_text)
-        
-        if r_emb is not None and j_emb is not None:
-            resume_embeddings.append(r_emb)
-            jd_embeddings.append(j_emb)
-
-    if not resume_embeddings:
+    client = AsyncLLMModel(model_name="mxbai-embed-large", max_concurrency=MAX_CONCURRENCY)
+
+    for start in tqdm(range(0, len(data), ROWS_PER_STEP)):
+        rows = data[start:start + ROWS_PER_STEP]
+
+        # Embed resumes and JDs of the whole block with concurrent batched requests.
+        # Documents are chunked and pooled exactly as the app does at inference time.
+        texts = [row['Resume'] for row in rows] + [row['Job_Description'] for row in rows]
+        docs = client.get_document_vectors(texts, pooling=POOLING, batch_size=EMBED_BATCH_SIZE)
+        r_docs, j_docs = docs[:len(rows)], docs[len(rows):]
+
+        for offset, (r_doc, j_doc) in enumerate(zip(r_docs, j_docs)):
+            if r_doc is not None and j_doc is not None:
+                if writer is None:
+                    writer = ShardedEmbeddingWriter(OUTPUT_DIR, dim=len(r_doc.vector), shard_rows=SHARD_ROWS,
+                                                    source=INPUT_FILE)
+                # Source row id = CSV data row, so pairs can be traced back after skips
+                writer.add(r_doc.vector, j_doc.vector, start + offset)
+
+    if writer is None:
         print("No valid embeddings generated.")
         return
 
-    # Convert to Tensors
-    print("Converting to PyTorch tensors...")
-    r_tensor = torch.tensor(np.array(resume_embeddings), dtype=torch.float32)
-    j_tensor = torch.tensor(np.array(jd_embeddings), dtype=torch.float32)
-
-    # Save
-    torch.save({
-        'resume_embeddings': r_tensor,
-        'jd_embeddings': j_tensor
-    }, OUTPUT_FILE)
-    
-    print(f"Saved dataset to {OUTPUT_FILE}")
-    print(f"Resume Tensor Shape: {r_tensor.shape}")
-    print(f"JD Tensor Shape: {j_tensor.shape}")
+    manifest = writer.close()
+    print(f"Saved dataset to {OUTPUT_DIR}")
+    print(f"Pairs: {manifest['rows']} of {len(data)}, Embedding Dim: {manifest['dim']}, "
+          f"Shards: {len(manifest['shards'])}")
 
 if __name__ == "__main__":
     main()
@@ -1,6 +1,7 @@
 """Quick test of all 4 scenarios with Gemma 2B on GPU."""
 import sys
-import requests
+
+from ollama_transport import get_transport
 
 RESUME = """Ayush Kumar - Fintech Researcher
 Skills: Python, TensorFlow, Power BI, Financial Modeling, R, AWS Cloud SQL, Tableau, Excel, GitHub
@@ -36,6 +37,8 @@ Provide SPECIFIC advice using this EXACT format:
 > [Your pitch here]
 """
 
+transport = get_transport()
+
 print("=" * 60)
 print("ResumeCraft - All 4 Test Scenarios")
 print("=" * 60)
@@ -48,7 +51,7 @@ for name, jd in SCENARIOS.items():
     sys.stdout.flush()
     
     try:
-        resp = requests.post("http://localhost:11434/api/generate", json={
+        resp = transport.post("/api/generate", {
             "model": "gemma:2b",
             "prompt": PROMPT.format(resume=RESUME, jd=jd),
             "stream": False,
@@ -0,0 +1,129 @@
+"""
+Resume-aware sentence segmentation with no downloads.
+
+Resumes are mostly bullets, headings and short lines rather than prose, and
+PDF extraction hard-wraps long bullets across lines. The built-in segmenter
+starts a new segment at bullets, headings and lines that close the previous
+one, re-joins wrapped continuation lines, and splits the rest on sentence
+punctuation while keeping abbreviations, initials, decimals and URLs intact.
+All patterns are compiled once at import.
+
+NLTK's punkt tokenizer remains available as an optional backend; it is only
+imported when selected and never downloads data on its own.
+"""
+import re
+
+BACKENDS = ("builtin", "nltk")
+
+_BULLET = re.compile(r"^\s*(?:[•●▪◦·‣∙■□➢➤►✓✔*\-–—]|\(?\d{1,2}[.)](?=\s))\s*")
+_HEADING = re.compile(r"^\s*(?:[A-Z][A-Z0-9 &/,\-]{2,40}|[A-Z][\w &/\-]{2,30}:)\s*$")
+_LINE_CLOSED = re.compile(r"[.!?:;]['\")\]]?\s*$")
+_LINE_OPEN = re.compile(r"(?:[,&/(\-–]|\b(?:and|or|of|the|to|in|for|with|a|an|at|on|by))\s*$", re.IGNORECASE)
+_DASH_RANGE = re.compile(r"^[\-–—]\s+\S")  # "- Dec. 2022" wrapped from "Jan." on the line above
+_CONTINUATION = re.compile(r"^\s*(?:[a-z($€£]|\d+(?:\.\d+)?%?\s+[a-z])")
+
+# Sentence boundary: terminal punctuation, optional closing quote/bracket, whitespace, then a sentence start
+_SENTENCE_END = re.compile(r"(?<=[.!?])['\")\]]?\s+(?=[\"'(\[]?[A-Z0-9•])")
+_ABBREVIATION = re.compile(
+    r"\b(?:e\.g|i\.e|etc|vs|approx|incl|dept|est|inc|ltd|co|corp|llc|dr|mr|mrs|ms|prof|jr|sr|st|no|"
+    r"jan|feb|mar|apr|jun|jul|aug|sep|sept|oct|nov|dec)\.$",
+    re.IGNORECASE,
+)
+_INITIALS = re.compile(r"(?:^|\s)(?:[A-Z]\.){1,3}$")  # "J.", "U.S.", "B.Sc" style initials
+_WHITESPACE = re.compile(r"\s+")
+
+
+def _logical_lines(text):
+    """Join hard-wrapped lines back into bullets/paragraph lines."""
+    lines = []
+    for raw in text.splitlines():
+        line = raw.strip()
+        if not line:
+            if lines and lines[-1] is not None:
+                lines.append(None)  # Blank line always ends a segment
+            continue
+        previous = lines[-1] if lines else None
+        abbreviated = previous is not None and bool(_ABBREVIATION.search(previous) or _INITIALS.search(previous))
+        starts_new = (
+            previous is None
+            or (_BULLET.match(line) and not (abbreviated and _DASH_RANGE.match(line)))
+            or _HEADING.match(line)
+            or _HEADING.match(previous)
+        )
+        if not starts_new:
+            closed = _LINE_CLOSED.search(previous) and not abbreviated
+            joins = _CONTINUATION.match(line) or (
+                # An indented line under an unfinished one is a wrapped bullet
+                not closed and (_LINE_OPEN.search(previous) or raw[:1].isspace())
+            )
+            starts_new = not joins
+        if starts_new:
+            lines.append(line)
+        else:
+            lines[-1] = f"{lines[-1]} {line}"
+    return [_BULLET.sub("", line, count=1) for line in lines if line is not None]
+
+
+def _split_line(line):
+    """Split one logical line on sentence punctuation, re-joining false breaks."""
+    pieces = _SENTENCE_END.split(line)
+    sentences = []
+    for piece in pieces:
+        piece = piece.strip()
+        if not piece:
+            continue
+        if sentences and (_ABBREVIATION.search(sentences[-1]) or _INITIALS.search(sentences[-1])):
+            sentences[-1] = f"{sentences[-1]} {piece}"
+        else:
+            sentences.append(piece)
+    return sentences
+
+
+def split_sentences_builtin(text):
+    """
+    Segment resume text into bullets, headings and sentences.
+
+    Args:
+        text (str): Resume text (pasted or extracted from a PDF).
+
+    Returns:
+        list[str]: Segments in document order, whitespace-normalized.
+    """
+    segments = []
+    for line in _logical_lines(text):
+        for sentence in _split_line(line):
+            segments.append(_WHITESPACE.sub(" ", sentence))
+    return segments
+
+
+def _require_nltk():
+    try:
+        import nltk
+    except ImportError:
+        raise ImportError("nltk is required for the 'nltk' segmenter backend. "
+                          "Please install it with `pip install nltk`.")
+    try:
+        nltk.data.find("tokenizers/punkt_tab")
+    except LookupError:
+        raise LookupError("The 'nltk' segmenter needs the punkt_tab tokenizer data. Download it once with "
+                          "`python -m nltk.downloader punkt_tab`, or use the 'builtin' backend.")
+    return nltk
+
+
+def split_sentences(text, backend="builtin"):
+    """
+    Split resume text into candidate sentences.
+
+    Args:
+        text (str): Resume text.
+        backend (str): "builtin" (default, no downloads) or "nltk"
+            (punkt; its data must already be installed).
+
+    Returns:
+        list[str]: Sentences in document order.
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown segmenter backend '{backend}'. Choose from {BACKENDS}.")
+    if backend == "nltk":
+        return _require_nltk().sent_tokenize(text)
+    return split_sentences_builtin(text)
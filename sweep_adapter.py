@@ -0,0 +1,257 @@
+"""
+Parallel hyperparameter sweep for the adapter over the sharded embedding dataset.
+
+Each trial trains a ResumeMLPAdapter with one configuration (learning rate,
+batch size, hidden width, epochs) using train.py's epoch loop, validation
+split and early stopping, and keeps its best validation loss and cosine.
+Trials run in a pool of `--jobs` processes. Every worker memory-maps the same
+read-only shards of `dataset_embeddings`, so the embeddings are held once in
+the page cache however many trials run; nothing is loaded or copied per trial.
+
+The search space is a JSON object mapping a parameter (lr, batch_size,
+hidden_dim, epochs) to a list of values, taken as a grid or sampled with
+`--random N`, or to a {"low", "high", "log"} range (random search only):
+    {"lr": {"low": 1e-5, "high": 3e-3, "log": true},
+     "batch_size": [16, 64, 256], "hidden_dim": [512, 1024, 2048], "epochs": [20]}
+Parameters left out keep train.py's defaults.
+
+Pruning (median stopping rule): from epoch PRUNE_AFTER on, a trial whose
+validation cosine is below the median other trials reached at the same epoch
+is stopped; a trial whose loss turns NaN/inf stops at once.
+
+Results (validation loss and cosine, wall time, parameters and size per
+trial) are written to a CSV and printed best first, followed by the train.py
+command that reproduces the best configuration.
+
+Usage:
+    python sweep_adapter.py [--space space.json] [--random 20] [--jobs 4]
+"""
+import argparse
+import csv
+import itertools
+import json
+import math
+import multiprocessing as mp
+import os
+import random
+import statistics
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import torch
+import torch.nn as nn
+import torch.optim as optim
+
+from adapter_model import ResumeMLPAdapter
+from embedding_dataset import MANIFEST, EmbeddingDataset, make_loader, split_indices
+from train import (BATCH_SIZE, DATA_DIR, EPOCHS, HIDDEN_DIM, LEARNING_RATE, MIN_DELTA, PATIENCE, SPLIT_SEED,
+                   VAL_BATCH_SIZE, VAL_FRACTION, evaluate, train_epoch)
+
+# Configuration
+RESULTS_PATH = "sweep_results.csv"
+DEFAULT_SPACE = {
+    "lr": [1e-4, 3e-4, 1e-3],
+    "batch_size": [16, 64],
+    "hidden_dim": [512, 1024, 2048],
+    "epochs": [20],
+}
+DEFAULTS = {"lr": LEARNING_RATE, "batch_size": BATCH_SIZE, "hidden_dim": HIDDEN_DIM, "epochs": EPOCHS}
+PRUNE_AFTER = 3  # Epochs a trial always gets before it can be pruned
+PRUNE_MIN_TRIALS = 3  # Other trials that must have reached an epoch before comparing against them
+RESULT_FIELDS = ("trial", "lr", "batch_size", "hidden_dim", "epochs", "status", "epochs_run", "best_epoch",
+                 "val_loss", "val_cosine", "wall_s", "parameters", "size_mb")
+
+# Per-worker state, set by init_worker
+_dataset = None
+_history = None
+
+
+def init_worker(data_dir, threads, history):
+    """Pool initializer: split the cores between workers and map the dataset once per process."""
+    global _dataset, _history
+    torch.set_num_threads(threads)
+    _dataset = EmbeddingDataset(data_dir)
+    _history = history
+
+
+def should_prune(trial, epoch, val_cosine):
+    """Median stopping rule against the other trials' validation cosine at `epoch`."""
+    if epoch + 1 < PRUNE_AFTER:
+        return False
+    others = [cosine for t, e, cosine in list(_history) if e == epoch and t != trial]
+    return len(others) >= PRUNE_MIN_TRIALS and val_cosine < statistics.median(others)
+
+
+def run_trial(trial, config, prune=True):
+    """
+    Train one configuration in this worker.
+
+    Args:
+        trial (int): Trial number, used in the shared pruning history.
+        config (dict): lr, batch_size, hidden_dim and epochs.
+        prune (bool): Apply the median stopping rule.
+
+    Returns:
+        dict: One results row (see RESULT_FIELDS).
+    """
+    start = time.perf_counter()
+    torch.manual_seed(SPLIT_SEED)  # Same initialization scheme for every trial; only the config differs
+    train_rows, val_rows = split_indices(len(_dataset), VAL_FRACTION, seed=SPLIT_SEED)
+    # The pool already uses the cores: batches are gathered in-process from the memory maps
+    loader = make_loader(_dataset, config["batch_size"], shuffle=True, num_workers=0, indices=train_rows)
+    val_loader = make_loader(_dataset, VAL_BATCH_SIZE, shuffle=False, num_workers=0, indices=val_rows)
+
+    model = ResumeMLPAdapter(input_dim=_dataset.dim, hidden_dim=config["hidden_dim"], output_dim=_dataset.dim)
+    criterion = nn.CosineEmbeddingLoss()
+    optimizer = optim.Adam(model.parameters(), lr=config["lr"])
+
+    best_val_loss, best_val_cosine, best_epoch = float("inf"), float("nan"), -1
+    epochs_without_improvement = 0
+    status = "done"
+    epoch = -1  # epochs_run is 0 if the loop never runs
+    for epoch in range(config["epochs"]):
+        loader.sampler.set_epoch(epoch)
+        train_loss, _ = train_epoch(model, loader, criterion, optimizer, "cpu")
+        val_loss, val_cosine = evaluate(model, val_loader, criterion, "cpu")
+        if not (math.isfinite(train_loss) and math.isfinite(val_loss)):
+            status = "diverged"
+            break
+
+        if val_loss < best_val_loss - MIN_DELTA:
+            best_val_loss, best_val_cosine, best_epoch = val_loss, val_cosine, epoch
+            epochs_without_improvement = 0
+        else:
+            epochs_without_improvement += 1
+
+        _history.append((trial, epoch, val_cosine))
+        if prune and should_prune(trial, epoch, val_cosine):
+            status = "pruned"
+            break
+        if epochs_without_improvement >= PATIENCE:
+            status = "early-stopped"
+            break
+
+    parameters = sum(p.numel() for p in model.parameters())
+    return {
+        "trial": trial, **config, "status": status, "epochs_run": epoch + 1, "best_epoch": best_epoch + 1,
+        "val_loss": best_val_loss, "val_cosine": best_val_cosine, "wall_s": time.perf_counter() - start,
+        "parameters": parameters, "size_mb": parameters * 4 / 1e6,
+    }
+
+
+def sample_value(spec, rng):
+    """One draw from a list of choices or a {"low", "high", "log"} range."""
+    if isinstance(spec, list):
+        return rng.choice(spec)
+    low, high = spec["low"], spec["high"]
+    if spec.get("log"):
+        value = math.exp(rng.uniform(math.log(low), math.log(high)))
+    else:
+        value = rng.uniform(low, high)
+    return round(value) if isinstance(low, int) and isinstance(high, int) else value
+
+
+def _check_epochs(configs):
+    bad = sorted({config["epochs"] for config in configs if config["epochs"] < 1})
+    if bad:
+        raise ValueError(f"epochs must be at least 1, got {bad}")
+    return configs
+
+
+def build_configs(space, num_random=0, seed=0):
+    """Trial configurations: the full grid, or `num_random` random draws; defaults fill the gaps."""
+    unknown = set(space) - set(DEFAULTS)
+    if unknown:
+        raise ValueError(f"unknown parameters {sorted(unknown)}; expected {sorted(DEFAULTS)}")
+    if num_random:
+        rng = random.Random(seed)
+        return _check_epochs([{**DEFAULTS, **{name: sample_value(spec, rng) for name, spec in space.items()}}
+                              for _ in range(num_random)])
+    if not all(isinstance(spec, list) for spec in space.values()):
+        raise ValueError("ranges ({\"low\", \"high\"}) need random search (--random N)")
+    names = list(space)
+    configs = [{**DEFAULTS, **dict(zip(names, values))} for values in itertools.product(*space.values())]
+    return _check_epochs(configs)
+
+
+def write_results(path, results):
+    with open(path, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=RESULT_FIELDS)
+        writer.writeheader()
+        writer.writerows(results)
+
+
+def print_table(results):
+    print(f"\n{'trial':>5} | {'lr':>9} | {'batch':>5} | {'hidden':>6} | {'status':>13} | {'epochs':>6} | "
+          f"{'val loss':>8} | {'val cos':>8} | {'wall s':>7} | {'MB':>6}")
+    print("-" * 103)
+    for r in results:
+        print(f"{r['trial']:>5} | {r['lr']:>9.2e} | {r['batch_size']:>5} | {r['hidden_dim']:>6} | "
+              f"{r['status']:>13} | {r['epochs_run']:>6} | {r['val_loss']:>8.4f} | {r['val_cosine']:>8.4f} | "
+              f"{r['wall_s']:>7.1f} | {r['size_mb']:>6.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--space", help="JSON search space file (default: DEFAULT_SPACE)")
+    parser.add_argument("--random", type=int, default=0, metavar="N", help="Random search with N trials instead of the grid")
+    parser.add_argument("--seed", type=int, default=0, help="Random search seed")
+    parser.add_argument("--jobs", type=int, default=os.cpu_count() or 1, help="Trials run in parallel")
+    parser.add_argument("--no-prune", action="store_true", help="Run every trial to completion")
+    parser.add_argument("--output", default=RESULTS_PATH, help="Results CSV")
+    args = parser.parse_args()
+
+    if not os.path.exists(os.path.join(DATA_DIR, MANIFEST)):
+        print(f"Error: {DATA_DIR} not found. Run preprocess_embeddings.py first.")
+        return
+    if len(EmbeddingDataset(DATA_DIR)) < 2:
+        print("Error: need at least 2 pairs to hold out a validation split.")
+        return
+    space = DEFAULT_SPACE
+    if args.space:
+        with open(args.space) as f:
+            space = json.load(f)
+    try:
+        configs = build_configs(space, args.random, args.seed)
+    except ValueError as e:
+        print(f"Error: {e}")
+        return
+
+    jobs = max(1, min(args.jobs, len(configs)))
+    threads = max(1, (os.cpu_count() or 1) // jobs)
+    print(f"Running {len(configs)} trials, {jobs} at a time ({threads} threads each)...")
+
+    context = mp.get_context("spawn")  # Fresh interpreters; forking a process that has used torch can deadlock
+    results = []
+    with context.Manager() as manager:
+        history = manager.list()  # (trial, epoch, val cosine) reports shared for pruning
+        with ProcessPoolExecutor(jobs, mp_context=context, initializer=init_worker,
+                                 initargs=(DATA_DIR, threads, history)) as pool:
+            futures = {pool.submit(run_trial, trial, config, not args.no_prune): trial
+                       for trial, config in enumerate(configs, 1)}
+            for future in as_completed(futures):
+                try:
+                    result = future.result()
+                except Exception as e:
+                    print(f"Trial {futures[future]} failed: {e}")
+                    continue
+                results.append(result)
+                print(f"  [{len(results)}/{len(configs)}] trial {result['trial']} {result['status']} after "
+                      f"{result['epochs_run']} epochs: val cosine {result['val_cosine']:.4f}, {result['wall_s']:.1f} s")
+
+    if not results:
+        print("Error: every trial failed.")
+        return
+    # Best first; NaN (diverged before any validation) last
+    results.sort(key=lambda r: -r["val_cosine"] if math.isfinite(r["val_cosine"]) else math.inf)
+    write_results(args.output, results)
+    print_table(results)
+
+    best = results[0]
+    print(f"\nResults saved to {args.output}. Best configuration (trial {best['trial']}):")
+    print(f"  python train.py --lr {best['lr']:g} --batch-size {best['batch_size']} "
+          f"--hidden-dim {best['hidden_dim']} --epochs {best['epochs']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,8 @@
 """Test simplified prompt with complete example."""
-import requests
 import sys
+
+from ollama_transport import get_transport
+
 sys.stdout.reconfigure(encoding='utf-8')
 
 RESUME = """Ayush Kumar - Fintech Researcher
@@ -59,7 +61,7 @@ print("="*60)
 print("CHEF TEST - SIMPLIFIED PROMPT WITH EXAMPLE")
 print("="*60)
 
-resp = requests.post("http://localhost:11434/api/generate", json={
+resp = get_transport().post("/api/generate", {
     "model": "gemma:2b",
     "prompt": PROMPT.format(resume=RESUME, jd=JD),
     "stream": False,
@@ -1,18 +1,20 @@
 
-import requests
 import json
 import numpy as np
 
-BASE_URL = "http://localhost:11434"
+from ollama_transport import NO_RETRY, get_transport
+
+transport = get_transport()
 MODEL = "mxbai-embed-large"
 GEN_MODEL = "llama3"
 
-def test_endpoint(name, url, payload):
+def test_endpoint(name, path, payload):
     print(f"\n--- Testing {name} ---")
-    print(f"URL: {url}")
+    print(f"URL: {transport.base_url}{path}")
     print(f"Payload keys: {list(payload.keys())}")
     try:
-        resp = requests.post(url, json=payload, timeout=30)
+        # No retries: this script is probing which endpoints the server supports
+        resp = transport.post(path, payload, timeout=30, retry=NO_RETRY)
         print(f"Status Code: {resp.status_code}")
         if resp.status_code == 200:
             print("SUCCESS")
@@ -30,7 +32,7 @@ payload_new = {
     "input": "Hello world",
     "keep_alive": 0
 }
-test_endpoint("/api/embed (with keep_alive)", f"{BASE_URL}/api/embed", payload_new)
+test_endpoint("/api/embed (with keep_alive)", "/api/embed", payload_new)
 
 # 2. Test /api/embeddings (Legacy) with keep_alive
 payload_legacy = {
@@ -38,7 +40,7 @@ payload_legacy = {
     "prompt": "Hello world",
     "keep_alive": 0
 }
-test_endpoint("/api/embeddings (Legacy with keep_alive)", f"{BASE_URL}/api/embeddings", payload_legacy)
+test_endpoint("/api/embeddings (Legacy with keep_alive)", "/api/embeddings", payload_legacy)
 
 # 3. Test /api/generate (Llama3)
 payload_gen = {
@@ -47,4 +49,4 @@ payload_gen = {
     "stream": False,
     "keep_alive": 0
 }
-test_endpoint("/api/generate", f"{BASE_URL}/api/generate", payload_gen)
+test_endpoint("/api/generate", "/api/generate", payload_gen)
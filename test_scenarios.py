@@ -10,7 +10,7 @@ import numpy as np
 # Add current dir to path
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
-from ollama_module import LLMModel
+from ollama_module import LLMModel, CritiqueSession
 from adapter_model import ResumeMLPAdapter
 from decoder_module import ResumeDecoder
 from utils import extract_text_from_pdf
@@ -104,7 +104,7 @@ def cosine_similarity(a, b):
     """Calculate cosine similarity between two vectors."""
     return np.dot(a, b) / (np.linalg.norm(a) * np.linalg.norm(b))
 
-def run_scenario(name, jd_text, resume_text, ollama_client, mlp, decoder, device, use_skip):
+def run_scenario(name, jd_text, resume_text, ollama_client, mlp, decoder, device, use_skip, critique_session):
     """Run a single test scenario."""
     print("=" * 60)
     print(f"SCENARIO: {name}")
@@ -112,20 +112,22 @@ def run_scenario(name, jd_text, resume_text, ollama_client, mlp, decoder, device
     
     # Step 1: Generate embeddings
     print("[1/4] Generating embeddings...")
-    resume_vec = ollama_client.get_vector(resume_text)
-    jd_vec = ollama_client.get_vector(jd_text)
+    resume_doc, jd_doc = ollama_client.get_document_vectors([resume_text, jd_text])
     
-    if resume_vec is None or jd_vec is None:
+    if resume_doc is None or jd_doc is None:
         print("  [ERROR] Failed to generate embeddings")
         return
+    resume_vec, jd_vec = resume_doc.vector, jd_doc.vector
+    print(f"  Embedded {len(resume_doc.chunks)} resume chunks, {len(jd_doc.chunks)} JD chunks")
     
     original_similarity = cosine_similarity(resume_vec, jd_vec)
     print(f"  Original Alignment: {original_similarity:.2%}")
     
     # Step 2: Run MLP Adapter
     print("[2/4] Running MLP Adapter...")
-    resume_tensor = torch.tensor(resume_vec, dtype=torch.float32).to(device)
-    jd_tensor = torch.tensor(jd_vec, dtype=torch.float32).to(device)
+    # Document vectors are float32 on CPU: wrap them without copying
+    resume_tensor = torch.from_numpy(resume_vec)
+    jd_tensor = torch.from_numpy(jd_vec)
     
     with torch.no_grad():
         if use_skip:
@@ -139,13 +141,18 @@ def run_scenario(name, jd_text, resume_text, ollama_client, mlp, decoder, device
     
     # Step 3: Decode to text
     print("[3/4] Decoding to text...")
-    decoded_resume = decoder.decode(tailored_vec, resume_text)
+    decode_result = {}
+    decoded_resume = decoder.decode(tailored_vec, resume_text, result=decode_result)
+    reuse = decode_result.get("sentence_update", {"reused": 0, "embedded": 0})
+    print(f"  Sentences reused: {reuse['reused']}, newly embedded: {reuse['embedded']}")
     print(f"  Decoded Resume (first 500 chars):\n{decoded_resume[:500]}...")
     
     # Step 4: Generate Critique
     print("\n[4/4] Generating AI Consultant Critique (Gemma 2B on GPU)...")
-    critique = ollama_client.generate_critique(resume_text, jd_text)
+    critique = critique_session.critique(jd_text)
+    stats = critique_session.history[-1]
     print(f"\n--- CONSULTANT ADVICE ---\n{critique}\n")
+    print(f"  Prompt eval for this JD: {stats.get('prompt_eval_count', 0)} tokens in {stats.get('prompt_eval_s', 0.0):.2f}s")
     
     print("-" * 60)
     print()
@@ -170,9 +177,17 @@ def main():
     # Load models
     ollama_client, mlp, decoder, device, use_skip = load_models()
     
+    # One critique session: the resume prefill is paid once for all scenarios
+    critique_session = CritiqueSession(ollama_client, resume_text)
+
     # Run each scenario
     for name, jd_text in SCENARIOS.items():
-        run_scenario(name, jd_text, resume_text, ollama_client, mlp, decoder, device, use_skip)
+        run_scenario(name, jd_text, resume_text, ollama_client, mlp, decoder, device, use_skip, critique_session)
+
+    report = critique_session.prefill_report()
+    print(f"Resume prefill (paid once): {report['resume_prefill_tokens']} tokens in {report['resume_prefill_s']:.2f}s")
+    for name, jd_stats in zip(SCENARIOS, report["per_jd"]):
+        print(f"  {name}: {jd_stats['prompt_eval_count']} prompt tokens in {jd_stats['prompt_eval_s']:.2f}s")
     
     print("\n" + "=" * 60)
     print("All scenarios completed!")
@@ -1,9 +1,10 @@
 
-import requests
 import time
 import json
 
-BASE_URL = "http://localhost:11434"
+from ollama_transport import NO_RETRY, get_transport
+
+transport = get_transport()
 
 def step(name, func):
     print(f"\n STEP: {name}...")
@@ -18,12 +19,11 @@ def step(name, func):
 
 def load_embedding():
     # Simulate the MLP Adapter running
-    url = f"{BASE_URL}/api/embeddings"
     payload = {
         "model": "mxbai-embed-large:latest",
         "prompt": "This is a resume text to embed for the MLP.",
     }
-    resp = requests.post(url, json=payload)
+    resp = transport.post("/api/embeddings", payload)
     if resp.status_code != 200:
         raise Exception(f"Status {resp.status_code}: {resp.text}")
 
@@ -31,20 +31,18 @@ def force_unload():
     # The FIX: Tell Ollama to immediately dump the embedding model
     print("   (Sending unload signal...)")
     # Corrected: Use the embeddings endpoint for an embedding model
-    url = f"{BASE_URL}/api/embeddings"
     payload = {
         "model": "mxbai-embed-large:latest",
         "prompt": "unload",
         "keep_alive": 0
     }
     try:
-        requests.post(url, json=payload, timeout=5)
+        transport.post("/api/embeddings", payload, timeout=5, retry=NO_RETRY)
     except:
         pass
 
 def invoke_consultant():
     # Simulate the Consultant Button
-    url = f"{BASE_URL}/api/generate"
     payload = {
         "model": "gemma:2b",
         "prompt": "Are you working? Reply with YES.",
@@ -53,7 +51,7 @@ def invoke_consultant():
             "num_ctx": 2048 # Reduce context window to save VRAM
         }
     }
-    resp = requests.post(url, json=payload, timeout=120)
+    resp = transport.post("/api/generate", payload, timeout=120)
     if resp.status_code != 200:
         raise Exception(f"Status {resp.status_code}: {resp.text}")
     print(f"   Response: {resp.json().get('response')}")
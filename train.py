@@ -1,41 +1,198 @@
-
+import argparse
+import random
+import socket
 import torch
+import torch.distributed as dist
+import torch.multiprocessing as mp
 import torch.nn as nn
 import torch.optim as optim
+from torch.nn.parallel import DistributedDataParallel
 from adapter_model import ResumeMLPAdapter
+from embedding_dataset import MANIFEST, EmbeddingDataset, make_loader, split_indices
+from training_metrics import MetricsLog, StepTimer, format_summary, make_profiler
 import os
 from tqdm import tqdm
 
 # Configuration
-DATA_FILE = "dataset_tensors.pt"
+DATA_DIR = "dataset_embeddings"  # Sharded memory-mapped dataset from preprocess_embeddings.py
+LEGACY_DATA_FILE = "dataset_tensors.pt"
 MODEL_SAVE_PATH = "mlp_model.pth"
 EPOCHS = 50
-BATCH_SIZE = 16
+BATCH_SIZE = 16  # Per process; with --workers N each step averages N batches
 LEARNING_RATE = 1e-4
+HIDDEN_DIM = 2048
+NUM_WORKERS = 2  # DataLoader processes gathering batches from the memory maps
 
-def main():
-    if not os.path.exists(DATA_FILE):
-        print(f"Error: {DATA_FILE} not found. Run preprocess_embeddings.py first.")
-        return
+# Validation & early stopping
+VAL_FRACTION = 0.1  # Pairs held out for the per-epoch validation loss
+VAL_BATCH_SIZE = 256
+SPLIT_SEED = 0  # Fixed so a resumed run validates on the same pairs
+PATIENCE = 5  # Epochs without validation improvement before stopping
+MIN_DELTA = 1e-4  # Smallest validation loss decrease that counts as improvement
+
+# Checkpoints (model, optimizer, RNG and early-stopping state) for --resume
+CHECKPOINT_PATH = "train_checkpoint.pt"
+CHECKPOINT_EVERY = 1  # Epochs
+
+# Data-parallel CPU training (torch.distributed, gloo backend)
+DIST_BACKEND = "gloo"
+MASTER_ADDR = "127.0.0.1"  # Single-host rendezvous for --workers
+
+# Instrumentation (see training_metrics.py)
+METRICS_LOG = "train_metrics.jsonl"  # Run, epoch (and with --log-steps, step) records
+PROFILE_DIR = "profiler_traces"  # torch.profiler traces for --profile
+PROFILE_START_STEP = 10  # Skip start-up (DataLoader workers, allocator warm-up)
+PROFILE_STEPS = 5
+
+
+def save_atomic(obj, path):
+    """torch.save via a temporary file, so a crash mid-write never leaves a truncated file."""
+    tmp = f"{path}.tmp"
+    torch.save(obj, tmp)
+    os.replace(tmp, path)
+
+
+def rng_state():
+    state = {"torch": torch.get_rng_state(), "python": random.getstate()}
+    if torch.cuda.is_available():
+        state["cuda"] = torch.cuda.get_rng_state_all()
+    return state
+
+
+def set_rng_state(state):
+    torch.set_rng_state(state["torch"])
+    random.setstate(state["python"])
+    if "cuda" in state and torch.cuda.is_available():
+        torch.cuda.set_rng_state_all(state["cuda"])
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind((MASTER_ADDR, 0))
+        return s.getsockname()[1]
+
+
+def setup_distributed(rank, world_size):
+    """Join the process group; one process per rank, gloo over TCP (CPU tensors)."""
+    dist.init_process_group(DIST_BACKEND, rank=rank, world_size=world_size)
+    # Split the cores between ranks instead of every rank oversubscribing all of them
+    torch.set_num_threads(max(1, (os.cpu_count() or 1) // world_size))
+
+
+def train_epoch(model, loader, criterion, optimizer, device, timer=None, profiler=None):
+    """
+    One pass over `loader`. Under DistributedDataParallel, backward() averages
+    the gradients of all ranks, so every rank takes the same optimizer step.
+
+    Args:
+        timer (StepTimer): Collects per-phase step timing (reset at the start of the epoch).
+        profiler (torch.profiler.profile): Stepped after every training step.
+
+    Returns:
+        tuple[float, int]: Mean training loss on this rank and samples processed.
+    """
+    epoch_loss = 0
+    num_batches = 0
+    samples = 0
+
+    batch_size = loader.sampler.batch_size
+    timer = timer or StepTimer(device)
+    timer.reset()
+
+    # Target label for CosineEmbeddingLoss: 1 means inputs should be similar
+    # loss(x, y) = 1 - cos(x, y)
+    target_labels = torch.ones(batch_size).to(device)
+
+    for batch_r, batch_j in loader:
+        # Pinned batches (on CUDA) copy asynchronously
+        batch_r = batch_r.to(device, non_blocking=True) # Shape: (B, 1024)
+        batch_j = batch_j.to(device, non_blocking=True)
+
+        current_batch_size = len(batch_r)
+        if current_batch_size != batch_size:
+            target = torch.ones(current_batch_size).to(device)
+        else:
+            target = target_labels
+        timer.mark("data")
+
+        optimizer.zero_grad()
+
+        # Forward Pass: We pass BOTH Resume and JD to the adapter
+        # The adapter learns to "transform" the Resume given the context of JD
+        output = model(batch_r, batch_j, use_skip_connection=False) # Train the MLP weights
+
+        # Loss: Output should be similar to JD
+        loss = criterion(output, batch_j, target)
+        timer.mark("forward")
+
+        loss.backward()
+        timer.mark("backward")
+        optimizer.step()
+        timer.mark("optimizer")
+
+        epoch_loss += loss.item()
+        timer.mark("sync")
+        num_batches += 1
+        samples += current_batch_size
+        timer.step(current_batch_size)
+        if profiler is not None:
+            profiler.step()
+
+    return epoch_loss / max(num_batches, 1), samples
+
+
+def evaluate(model, loader, criterion, device):
+    """Mean validation loss and mean cosine(output, JD) over a loader."""
+    model.eval()
+    total_loss, total_cosine, rows = 0.0, 0.0, 0
+    with torch.no_grad():
+        for batch_r, batch_j in loader:
+            batch_r = batch_r.to(device, non_blocking=True)
+            batch_j = batch_j.to(device, non_blocking=True)
+            output = model(batch_r, batch_j, use_skip_connection=False)
+            target = torch.ones(len(batch_r), device=device)
+            total_loss += criterion(output, batch_j, target).item() * len(batch_r)
+            total_cosine += nn.functional.cosine_similarity(output, batch_j, dim=1).sum().item()
+            rows += len(batch_r)
+    model.train()
+    return total_loss / rows, total_cosine / rows
+
+
+def run(rank, world_size, args):
+    """
+    Train in this process: the whole job when world_size == 1, otherwise one
+    data-parallel rank. Only rank 0 logs, validates and writes files.
+    """
+    distributed = world_size > 1
+    is_main = rank == 0
+    if distributed:
+        setup_distributed(rank, world_size)
+    log = print if is_main else (lambda *a, **k: None)
 
     # Check Device
-    device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
-    print(f"Using device: {device}")
+    # Data-parallel ranks train on CPU (gloo); a single process still uses CUDA when present
+    device = torch.device("cuda" if torch.cuda.is_available() and not distributed else "cpu")
+    log(f"Using device: {device}" + (f", {world_size} data-parallel workers ({DIST_BACKEND})" if distributed else ""))
 
     # Load Data
-    print("Loading dataset...")
-    data = torch.load(DATA_FILE)
-    resume_emb = data['resume_embeddings'].to(device) # Shape: (N, 1024)
-    jd_emb = data['jd_embeddings'].to(device)     # Shape: (N, 1024)
-    
-    dataset_size = len(resume_emb)
-    input_dim = resume_emb.shape[1]
-    
-    print(f"Dataset Size: {dataset_size}, Embedding Dim: {input_dim}")
+    # Shards are memory-mapped, not read: batches stream from disk through worker processes
+    log("Loading dataset...")
+    dataset = EmbeddingDataset(DATA_DIR)
+    train_rows, val_rows = split_indices(len(dataset), VAL_FRACTION, seed=SPLIT_SEED)
+    # Each rank streams a disjoint share of the training batches
+    loader = make_loader(dataset, args.batch_size, shuffle=True, num_workers=NUM_WORKERS, indices=train_rows,
+                         num_replicas=world_size, rank=rank)
+    val_loader = make_loader(dataset, VAL_BATCH_SIZE, shuffle=False, num_workers=0, indices=val_rows)
+
+    dataset_size = len(dataset)
+    input_dim = dataset.dim
+
+    log(f"Dataset Size: {dataset_size} (train {len(train_rows)}, validation {len(val_rows)}), "
+        f"Embedding Dim: {input_dim}")
 
     # Initialize Model
-    model = ResumeMLPAdapter(input_dim=input_dim, hidden_dim=2048, output_dim=input_dim).to(device)
-    
+    model = ResumeMLPAdapter(input_dim=input_dim, hidden_dim=args.hidden_dim, output_dim=input_dim).to(device)
+
     # We want the output to be close to the JD embedding
     # CosineEmbeddingLoss takes (input1, input2, target)
     # But here:
@@ -43,58 +200,160 @@ def main():
     #   Target = JD
     # We want Distance(Input, Target) to be minimized (Similarity maximized)
     # So we can use CosineSimilarity directly in the loss or MSE.
-    
+
     # Loss Function: 1 - CosineSimilarity(Output, Target)
     criterion = nn.CosineEmbeddingLoss()
-    optimizer = optim.Adam(model.parameters(), lr=LEARNING_RATE)
+    optimizer = optim.Adam(model.parameters(), lr=args.lr)
 
-    model.train()
-    
-    # Target label for CosineEmbeddingLoss: 1 means inputs should be similar
-    # loss(x, y) = 1 - cos(x, y)
-    target_labels = torch.ones(BATCH_SIZE).to(device)
-
-    print("Starting Training...")
-    
-    for epoch in range(EPOCHS):
-        epoch_loss = 0
-        num_batches = 0
-        
-        permutation = torch.randperm(dataset_size)
-        
-        for i in range(0, dataset_size, BATCH_SIZE):
-            indices = permutation[i:i+BATCH_SIZE]
-            batch_r = resume_emb[indices]
-            batch_j = jd_emb[indices]
-            
-            current_batch_size = len(indices)
-            if current_batch_size != BATCH_SIZE:
-                target = torch.ones(current_batch_size).to(device)
+    # Early-stopping state
+    start_epoch = 0
+    best_val_loss = float("inf")
+    best_epoch = -1
+    epochs_without_improvement = 0
+
+    if args.resume:
+        # Every rank restores the same state, so the replicas start in sync
+        checkpoint = torch.load(CHECKPOINT_PATH, map_location=device, weights_only=False)
+        if checkpoint["dataset_size"] != dataset_size:
+            log(f"Warning: dataset has {dataset_size} pairs, checkpoint was trained on "
+                f"{checkpoint['dataset_size']}; the validation split will differ.")
+        model.load_state_dict(checkpoint["model"])
+        optimizer.load_state_dict(checkpoint["optimizer"])
+        set_rng_state(checkpoint["rng"])
+        start_epoch = checkpoint["epoch"] + 1
+        best_val_loss = checkpoint["best_val_loss"]
+        best_epoch = checkpoint["best_epoch"]
+        epochs_without_improvement = checkpoint["epochs_without_improvement"]
+        log(f"Resumed from {CHECKPOINT_PATH} at epoch {start_epoch + 1} "
+            f"(best validation loss {best_val_loss:.4f} at epoch {best_epoch + 1})")
+
+    # DDP broadcasts rank 0's weights on construction and all-reduces (averages) gradients in backward()
+    # skip_projection gets no gradient while training the MLP path, hence find_unused_parameters
+    train_model = DistributedDataParallel(model, find_unused_parameters=True) if distributed else model
+    train_model.train()
+
+    # Rank 0 logs its own timings; the other ranks run the same steps on their shard
+    metrics_log = MetricsLog(args.metrics_log) if is_main else None
+    timer = StepTimer(device, synchronize=args.sync_timing, log=metrics_log, log_every=args.log_steps)
+    profiler = None
+    if is_main:
+        metrics_log.write("run", device=str(device), world_size=world_size, dataset_size=dataset_size,
+                          start_epoch=start_epoch + 1, epochs=args.epochs, batch_size=args.batch_size,
+                          lr=args.lr, hidden_dim=args.hidden_dim, num_workers=NUM_WORKERS)
+        if args.profile:
+            profiler = make_profiler(args.profile_dir, args.profile_start, args.profile_steps, device)
+            profiler.start()
+
+    log("Starting Training...")
+
+    for epoch in range(start_epoch, args.epochs):
+        loader.sampler.set_epoch(epoch) # New shuffle every epoch
+        avg_loss, _ = train_epoch(train_model, loader, criterion, optimizer, device, timer, profiler)
+        timing = timer.summary()
+
+        stop = False
+        if is_main:
+            val_loss, val_cosine = evaluate(model, val_loader, criterion, device)
+            print(f"Epoch [{epoch+1}/{args.epochs}], Loss: {avg_loss:.4f}, "
+                  f"Val Loss: {val_loss:.4f}, Val Cosine: {val_cosine:.4f}")
+            print(format_summary(timing))
+            metrics_log.write("epoch", epoch=epoch + 1, train_loss=avg_loss, val_loss=val_loss,
+                              val_cosine=val_cosine, **timing)
+
+            # Keep the best weights as the model; the app never sees a worse later epoch
+            if val_loss < best_val_loss - MIN_DELTA:
+                best_val_loss = val_loss
+                best_epoch = epoch
+                epochs_without_improvement = 0
+                save_atomic(model.state_dict(), MODEL_SAVE_PATH)
             else:
-                target = target_labels
-
-            optimizer.zero_grad()
-            
-            # Forward Pass: We pass BOTH Resume and JD to the adapter
-            # The adapter learns to "transform" the Resume given the context of JD
-            output = model(batch_r, batch_j, use_skip_connection=False) # Train the MLP weights
-            
-            # Loss: Output should be similar to JD
-            loss = criterion(output, batch_j, target)
-            
-            loss.backward()
-            optimizer.step()
-            
-            epoch_loss += loss.item()
-            num_batches += 1
-            
-        avg_loss = epoch_loss / num_batches
-        if (epoch + 1) % 5 == 0:
-            print(f"Epoch [{epoch+1}/{EPOCHS}], Loss: {avg_loss:.4f}")
-
-    # Save Model
-    torch.save(model.state_dict(), MODEL_SAVE_PATH)
-    print(f"Training Complete. Model saved to {MODEL_SAVE_PATH}")
+                epochs_without_improvement += 1
+
+            stop = args.patience > 0 and epochs_without_improvement >= args.patience
+            if (epoch + 1) % CHECKPOINT_EVERY == 0 or stop or epoch + 1 == args.epochs:
+                save_atomic({
+                    "epoch": epoch,
+                    "model": model.state_dict(),
+                    "optimizer": optimizer.state_dict(),
+                    "rng": rng_state(),
+                    "best_val_loss": best_val_loss,
+                    "best_epoch": best_epoch,
+                    "epochs_without_improvement": epochs_without_improvement,
+                    "dataset_size": dataset_size,
+                }, CHECKPOINT_PATH)
+        if distributed:
+            # Rank 0 decides; everyone stops on the same epoch
+            flag = torch.tensor([int(stop)])
+            dist.broadcast(flag, src=0)
+            stop = bool(flag.item())
+        if stop:
+            log(f"Early stopping: no validation improvement for {args.patience} epochs.")
+            break
+
+    if profiler is not None:
+        profiler.stop()
+        log(f"Profiler trace (steps {args.profile_start}-{args.profile_start + args.profile_steps - 1}) "
+            f"written to {args.profile_dir}; view with `tensorboard --logdir {args.profile_dir}` or chrome://tracing.")
+    if metrics_log is not None:
+        metrics_log.close()
+        log(f"Metrics logged to {args.metrics_log}")
+    log(f"Training Complete. Best model (epoch {best_epoch + 1}, validation loss {best_val_loss:.4f}) "
+        f"saved to {MODEL_SAVE_PATH}")
+    if distributed:
+        dist.destroy_process_group()
+
+
+def spawn_workers(args):
+    """mp.spawn target: rendezvous env for this host, then train as rank `rank`."""
+    os.environ.setdefault("MASTER_ADDR", MASTER_ADDR)
+    os.environ["MASTER_PORT"] = os.environ.get("MASTER_PORT") or str(free_port())
+    mp.spawn(run, args=(args.workers, args), nprocs=args.workers, join=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Train the Resume MLP Adapter.",
+        epilog="Multi-host: start one process per rank with torchrun (it sets RANK, WORLD_SIZE, "
+               "MASTER_ADDR and MASTER_PORT), e.g. `torchrun --nnodes 2 --nproc-per-node 4 "
+               "--rdzv-endpoint host0:29500 train.py`.")
+    parser.add_argument("--resume", action="store_true", help=f"Continue from {CHECKPOINT_PATH}")
+    parser.add_argument("--epochs", type=int, default=EPOCHS, help="Maximum epochs")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE, help="Batch size per process")
+    parser.add_argument("--lr", type=float, default=LEARNING_RATE, help="Adam learning rate")
+    parser.add_argument("--hidden-dim", type=int, default=HIDDEN_DIM, help="Adapter MLP width")
+    parser.add_argument("--patience", type=int, default=PATIENCE, help="Early-stopping patience (0 disables)")
+    parser.add_argument("--workers", type=int, default=1, help="Data-parallel CPU processes on this host")
+    parser.add_argument("--metrics-log", default=METRICS_LOG, help="JSON-lines metrics file (appended)")
+    parser.add_argument("--log-steps", type=int, default=0, metavar="N", help="Also log every N-th step's timing")
+    parser.add_argument("--sync-timing", action="store_true",
+                        help="Synchronize CUDA at every phase boundary for exact per-phase times")
+    parser.add_argument("--profile", action="store_true", help="Record a torch.profiler trace to --profile-dir")
+    parser.add_argument("--profile-start", type=int, default=PROFILE_START_STEP, help="First profiled step")
+    parser.add_argument("--profile-steps", type=int, default=PROFILE_STEPS, help="Steps profiled")
+    parser.add_argument("--profile-dir", default=PROFILE_DIR)
+    args = parser.parse_args()
+
+    if not os.path.exists(os.path.join(DATA_DIR, MANIFEST)):
+        if os.path.exists(LEGACY_DATA_FILE):
+            print(f"Error: {DATA_DIR} not found. Convert {LEGACY_DATA_FILE} with "
+                  f"`python embedding_dataset.py convert {LEGACY_DATA_FILE} {DATA_DIR}`.")
+        else:
+            print(f"Error: {DATA_DIR} not found. Run preprocess_embeddings.py first.")
+        return
+    if len(EmbeddingDataset(DATA_DIR)) < 2:
+        print("Error: need at least 2 pairs to hold out a validation split.")
+        return
+    if args.resume and not os.path.exists(CHECKPOINT_PATH):
+        print(f"Error: --resume given but {CHECKPOINT_PATH} not found.")
+        return
+
+    if "WORLD_SIZE" in os.environ:
+        # Launched by torchrun (one process per rank, possibly across hosts)
+        run(int(os.environ["RANK"]), int(os.environ["WORLD_SIZE"]), args)
+    elif args.workers > 1:
+        spawn_workers(args)
+    else:
+        run(0, 1, args)
 
 if __name__ == "__main__":
     main()
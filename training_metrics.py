@@ -0,0 +1,196 @@
+"""
+Throughput instrumentation for train.py.
+
+`StepTimer` splits each training step into phases by wall-clock marks:
+    data       waiting on the DataLoader and copying the batch to the device
+    forward    adapter forward pass and loss
+    backward   loss.backward() (gradient all-reduce included under DDP)
+    optimizer  optimizer.step()
+    sync       loss.item(), the per-step device -> host synchronization
+and sums them per epoch with samples/s, step-time percentiles and peak
+memory. On CUDA, kernels run asynchronously, so without `synchronize=True`
+GPU time is charged to whichever phase next waits on the device (usually
+sync); with it every mark waits for the device, which is accurate but slower.
+
+`MetricsLog` appends one JSON object per line (run, step, epoch records), and
+`make_profiler` builds an opt-in torch.profiler window whose traces open in
+TensorBoard (`tensorboard --logdir <dir>`) or, being Chrome trace JSON, in
+chrome://tracing / Perfetto.
+"""
+import json
+import os
+import sys
+import time
+
+import numpy as np
+import torch
+
+PHASES = ("data", "forward", "backward", "optimizer", "sync")
+
+
+def peak_memory_mb(device=None):
+    """
+    Peak memory of this process so far.
+
+    Returns:
+        dict: "peak_rss_mb" (None where unavailable, e.g. Windows) and, on
+            CUDA, "peak_cuda_mb" since the last reset_peak_memory_stats().
+    """
+    rss_mb = None
+    try:
+        # VmHWM is this process's own high-water mark; ru_maxrss can carry a parent's over exec
+        with open("/proc/self/status") as f:
+            rss_mb = next(int(line.split()[1]) for line in f if line.startswith("VmHWM")) / 1024
+    except (OSError, StopIteration):
+        try:
+            import resource
+            maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            rss_mb = maxrss / 1024 ** 2 if sys.platform == "darwin" else maxrss / 1024
+        except ImportError:
+            pass
+    memory = {"peak_rss_mb": rss_mb}
+    if device is not None and torch.device(device).type == "cuda":
+        memory["peak_cuda_mb"] = torch.cuda.max_memory_allocated(device) / 1024 ** 2
+    return memory
+
+
+class MetricsLog:
+    def __init__(self, path):
+        """
+        Append-only JSON-lines metrics file; a resumed run appends to the same log.
+
+        Args:
+            path (str): Log file, created if missing.
+        """
+        self.path = path
+        self._file = open(path, "a", buffering=1)  # Line-buffered: every record is on disk once written
+
+    def write(self, event, **fields):
+        self._file.write(json.dumps({"event": event, "time": time.time(), **fields}) + "\n")
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class StepTimer:
+    def __init__(self, device=None, synchronize=False, log=None, log_every=0):
+        """
+        Per-step phase timer; train_epoch calls `reset`, then `mark` and `step` per step.
+
+        Args:
+            device (torch.device | str): Training device (for CUDA sync and peak memory).
+            synchronize (bool): Wait for the device at every mark (accurate CUDA phases).
+            log (MetricsLog): Where step records go.
+            log_every (int): Write every n-th step record to `log` (0: none).
+        """
+        self.device = torch.device(device or "cpu")
+        self.synchronize = synchronize and self.device.type == "cuda"
+        self.log = log
+        self.log_every = log_every
+        self.global_step = 0
+        self.reset()
+
+    def reset(self):
+        """Start a new epoch's totals."""
+        self.totals = dict.fromkeys(PHASES, 0.0)
+        self.step_times = []
+        self.samples = 0
+        self._epoch_start = time.perf_counter()
+        self._last = self._step_start = self._epoch_start
+        self._phases = dict.fromkeys(PHASES, 0.0)
+        if self.device.type == "cuda":
+            torch.cuda.reset_peak_memory_stats(self.device)
+
+    def mark(self, phase):
+        """Charge the time since the previous mark to `phase`."""
+        if self.synchronize:
+            torch.cuda.synchronize(self.device)
+        now = time.perf_counter()
+        self._phases[phase] += now - self._last
+        self._last = now
+
+    def step(self, samples):
+        """Close the current step of `samples` rows."""
+        step_time = self._last - self._step_start
+        for phase, seconds in self._phases.items():
+            self.totals[phase] += seconds
+        self.step_times.append(step_time)
+        self.samples += samples
+        self.global_step += 1
+        if self.log is not None and self.log_every and self.global_step % self.log_every == 0:
+            self.log.write("step", step=self.global_step, samples=samples, step_s=step_time,
+                           **{f"{phase}_s": seconds for phase, seconds in self._phases.items()})
+        self._phases = dict.fromkeys(PHASES, 0.0)
+        self._step_start = self._last
+
+    def summary(self):
+        """
+        This epoch's timing so far.
+
+        Returns:
+            dict: wall_s, steps, samples, samples_per_s, per-phase seconds
+                (`<phase>_s`) and shares (`<phase>_pct`), step p50/p99 in ms
+                and peak memory.
+        """
+        wall = time.perf_counter() - self._epoch_start
+        timed = sum(self.totals.values()) or 1.0
+        times = np.array(self.step_times or [0.0])
+        return {
+            "wall_s": wall,
+            "steps": len(self.step_times),
+            "samples": self.samples,
+            "samples_per_s": self.samples / wall if wall else 0.0,
+            **{f"{phase}_s": seconds for phase, seconds in self.totals.items()},
+            **{f"{phase}_pct": 100 * seconds / timed for phase, seconds in self.totals.items()},
+            "step_p50_ms": float(np.percentile(times, 50) * 1000),
+            "step_p99_ms": float(np.percentile(times, 99) * 1000),
+            **peak_memory_mb(self.device),
+        }
+
+
+def format_summary(summary):
+    """One console line for an epoch summary."""
+    phases = ", ".join(f"{phase} {summary[f'{phase}_pct']:.0f}%" for phase in PHASES)
+    line = (f"  {summary['samples_per_s']:.1f} samples/s, step p50 {summary['step_p50_ms']:.2f} ms "
+            f"p99 {summary['step_p99_ms']:.2f} ms ({phases})")
+    if summary.get("peak_rss_mb") is not None:
+        line += f", peak RSS {summary['peak_rss_mb']:.0f} MB"
+    if "peak_cuda_mb" in summary:
+        line += f", peak CUDA {summary['peak_cuda_mb']:.0f} MB"
+    return line
+
+
+def make_profiler(trace_dir, start_step, active_steps, device=None):
+    """
+    torch.profiler window over training steps `start_step` .. `start_step + active_steps - 1`
+    (counted from 0 across epochs; the step before the window is a warm-up).
+
+    Args:
+        trace_dir (str): Directory for the trace files (one per window, per process).
+        start_step (int): First profiled step.
+        active_steps (int): Steps recorded.
+        device (torch.device | str): Adds CUDA activity when training on CUDA.
+
+    Returns:
+        torch.profiler.profile: Not yet started; call `step()` after every training step.
+    """
+    from torch.profiler import ProfilerActivity, profile, schedule, tensorboard_trace_handler
+
+    os.makedirs(trace_dir, exist_ok=True)
+    activities = [ProfilerActivity.CPU]
+    if device is not None and torch.device(device).type == "cuda":
+        activities.append(ProfilerActivity.CUDA)
+    warmup = 1 if start_step > 0 else 0
+    return profile(
+        activities=activities,
+        schedule=schedule(wait=max(start_step - warmup, 0), warmup=warmup, active=active_steps, repeat=1),
+        on_trace_ready=tensorboard_trace_handler(trace_dir),
+        profile_memory=True,
+        record_shapes=True,
+    )